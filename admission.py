@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""Admission policies for the transformer cache, and offline replay of key traces
+
+A policy decides which transformed strings are written to the cache tiers:
+
+- ``always`` caches every string, as long as it is within the size limits
+- ``tinylfu`` caches a string only once it has been seen ``min_sightings``
+  times. The first sighting sets bits in a doorkeeper Bloom filter, and later
+  ones are counted in a count-min sketch of 4-bit counters. After
+  ``10 * width`` sightings every counter is halved and the doorkeeper cleared,
+  so old popularity fades.
+
+Rejected strings are still returned to the caller, but are kept in no tier, so
+one-off inputs never reach CacheEntry. Every sighting of a string that is not
+cached is a miss, and so reaches the policy. Both policies also refuse keys
+and values above a byte limit, and let inputs of at most ``bypass_max_chars``
+characters skip the cache entirely.
+
+A trace is a key list in the warm-up format, one looked-up string per line.
+The service writes one when CACHE_CACHE_TRACE_PATH is set. Replaying it
+against an LRU of the given capacity reports the hit ratio of each policy:
+
+    python admission.py trace.txt --capacity 10000 --min-sightings 2 3
+"""
+import argparse
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from content_store import key_hash
+from memory_cache import LRUCache
+from warmup import read_keys
+
+DEPTH = 4
+COUNTER_MAX = 15
+DECISIONS = ("admitted", "rejected", "too_large")
+
+
+def _indexes(hashed: int, count: int, mask: int) -> List[int]:
+    """``count`` table positions for one 64-bit hash, by double hashing"""
+    low = hashed & 0xFFFFFFFF
+    high = (hashed >> 32) & 0xFFFFFFFF | 1
+    return [(low + i * high) & mask for i in range(count)]
+
+
+class CountMinSketch:
+    """Approximate sighting counts in ``DEPTH`` rows of saturating 4-bit counters"""
+
+    def __init__(self, width: int = 65_536):
+        # A power of two, so positions are a mask instead of a modulo
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in range(DEPTH)]
+
+    def add(self, hashed: int) -> int:
+        """Count one sighting; returns the new estimate"""
+        estimate = COUNTER_MAX
+        for row, index in zip(self._rows, _indexes(hashed, DEPTH, self._mask)):
+            if row[index] < COUNTER_MAX:
+                row[index] += 1
+            estimate = min(estimate, row[index])
+        return estimate
+
+    def estimate(self, hashed: int) -> int:
+        return min(row[index] for row, index in zip(self._rows, _indexes(hashed, DEPTH, self._mask)))
+
+    def halve(self) -> None:
+        for row in self._rows:
+            row[:] = bytes(value >> 1 for value in row)
+
+
+class Doorkeeper:
+    """Bloom filter recording which strings have been seen at least once"""
+
+    def __init__(self, bits: int):
+        self.bits = 1 << max(bits - 1, 8).bit_length()
+        self._mask = self.bits - 1
+        self._array = bytearray(self.bits // 8)
+
+    def add(self, hashed: int) -> bool:
+        """Record a sighting; returns whether the string was (probably) seen before"""
+        seen = True
+        for index in _indexes(hashed, DEPTH, self._mask):
+            byte, bit = divmod(index, 8)
+            if not self._array[byte] & (1 << bit):
+                seen = False
+                self._array[byte] |= 1 << bit
+        return seen
+
+    def clear(self) -> None:
+        self._array[:] = bytes(len(self._array))
+
+
+class AdmissionPolicy:
+    """Admit every entry within the size limits"""
+
+    name = "always"
+
+    def __init__(
+        self,
+        max_key_bytes: Optional[int] = None,
+        max_value_bytes: Optional[int] = None,
+        bypass_max_chars: int = 0,
+    ):
+        self.max_key_bytes = max_key_bytes
+        self.max_value_bytes = max_value_bytes
+        self.bypass_max_chars = bypass_max_chars
+        self._lock = threading.Lock()
+        self.decisions = dict.fromkeys(DECISIONS, 0)
+        self.bypassed = 0
+        self.hits = 0
+        self.misses = 0
+
+    def bypass(self, key: str) -> bool:
+        """Whether ``key`` is cheaper to transform than to look up"""
+        return len(key) <= self.bypass_max_chars
+
+    def _fits(self, key: str, value: str) -> bool:
+        if self.max_key_bytes is not None and len(key.encode("utf-8")) > self.max_key_bytes:
+            return False
+        return self.max_value_bytes is None or len(value.encode("utf-8")) <= self.max_value_bytes
+
+    def _frequent(self, hashed: int) -> bool:
+        return True
+
+    def decide(self, key: str, value: str) -> str:
+        """Record a miss of ``key``; returns one of DECISIONS"""
+        hashed = key_hash(key) if self._fits(key, value) else None
+        with self._lock:
+            if hashed is None:
+                decision = "too_large"
+            else:
+                decision = "admitted" if self._frequent(hashed) else "rejected"
+            self.decisions[decision] += 1
+        return decision
+
+    def admit_many(self, entries: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """The entries to cache out of freshly transformed ones, and the count of each decision made"""
+        admitted = {}
+        counts: Dict[str, int] = {}
+        for key, value in entries.items():
+            decision = self.decide(key, value)
+            counts[decision] = counts.get(decision, 0) + 1
+            if decision == "admitted":
+                admitted[key] = value
+        return admitted, counts
+
+    def record_lookups(self, hits: int, misses: int, bypassed: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.bypassed += bypassed
+
+    def stats(self) -> Dict[str, object]:
+        """Decision counts and the hit ratio of the lookups this policy served"""
+        lookups = self.hits + self.misses
+        return {
+            "policy": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "bypassed": self.bypassed,
+            **self.decisions,
+        }
+
+
+class TinyLFUPolicy(AdmissionPolicy):
+    """Admit an entry once a doorkeeper and count-min sketch have seen it ``min_sightings`` times"""
+
+    name = "tinylfu"
+
+    def __init__(self, min_sightings: int = 2, width: int = 65_536, **limits):
+        super().__init__(**limits)
+        self.min_sightings = min_sightings
+        self.sketch = CountMinSketch(width)
+        self.doorkeeper = Doorkeeper(self.sketch.width * 8)
+        self.sample_size = 10 * self.sketch.width
+        self._sightings = 0
+
+    def _frequent(self, hashed: int) -> bool:
+        self._sightings += 1
+        if self._sightings >= self.sample_size:
+            self.sketch.halve()
+            self.doorkeeper.clear()
+            self._sightings = 0
+        if not self.doorkeeper.add(hashed):
+            return self.min_sightings <= 1
+        return 1 + self.sketch.add(hashed) >= self.min_sightings
+
+    def stats(self) -> Dict[str, object]:
+        return {**super().stats(), "min_sightings": self.min_sightings}
+
+
+def create_policy(
+    name: str,
+    min_sightings: int = 2,
+    width: int = 65_536,
+    max_key_bytes: Optional[int] = None,
+    max_value_bytes: Optional[int] = None,
+    bypass_max_chars: int = 0,
+) -> AdmissionPolicy:
+    """Build a policy by name with its options"""
+    limits = {"max_key_bytes": max_key_bytes, "max_value_bytes": max_value_bytes, "bypass_max_chars": bypass_max_chars}
+    if name == "always":
+        return AdmissionPolicy(**limits)
+    if name == "tinylfu":
+        return TinyLFUPolicy(min_sightings=min_sightings, width=width, **limits)
+    raise ValueError(f"Unknown admission policy '{name}'")
+
+
+class TraceRecorder:
+    """Append looked-up keys to a trace file, one per line; keys containing line breaks are left out"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def record(self, keys: Iterable[str]) -> None:
+        lines = "".join(f"{key}\n" for key in keys if key and "\n" not in key and "\r" not in key)
+        if lines:
+            with self._lock:
+                self._handle.write(lines)
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+def replay(
+    keys: Iterable[str],
+    policies: Dict[str, AdmissionPolicy],
+    capacity: int,
+    transform: Callable[[str], str] = str.upper,
+) -> Dict[str, Dict[str, object]]:
+    """Run a key trace through an LRU of ``capacity`` entries behind each policy"""
+    caches = {label: LRUCache(max_entries=capacity, max_bytes=2**62) for label in policies}
+    for key in keys:
+        value = None
+        for label, policy in policies.items():
+            if policy.bypass(key):
+                policy.record_lookups(0, 0, bypassed=1)
+                continue
+            cache = caches[label]
+            if cache.get(key) is not None:
+                policy.record_lookups(1, 0)
+                continue
+            policy.record_lookups(0, 1)
+            if value is None:
+                value = transform(key)
+            if policy.decide(key, value) == "admitted":
+                cache.set(key, value)
+    return {label: {**policy.stats(), "entries": len(caches[label])} for label, policy in policies.items()}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="Key trace, one looked-up string per line")
+    parser.add_argument("--capacity", type=int, default=10_000, help="Entries the simulated cache holds")
+    parser.add_argument(
+        "--min-sightings", type=int, nargs="+", default=[2], help="Sightings before tinylfu admits (one run each)"
+    )
+    parser.add_argument("--width", type=int, default=65_536, help="Counters per count-min sketch row")
+    parser.add_argument("--max-key-bytes", type=int, help="Largest key admitted")
+    parser.add_argument("--max-value-bytes", type=int, help="Largest value admitted")
+    parser.add_argument("--bypass-max-chars", type=int, default=0, help="Inputs this short skip the cache")
+    args = parser.parse_args()
+
+    options = {
+        "width": args.width,
+        "max_key_bytes": args.max_key_bytes,
+        "max_value_bytes": args.max_value_bytes,
+        "bypass_max_chars": args.bypass_max_chars,
+    }
+    policies: Dict[str, AdmissionPolicy] = {"always": create_policy("always", **options)}
+    for sightings in args.min_sightings:
+        policies[f"tinylfu/{sightings}"] = create_policy("tinylfu", min_sightings=sightings, **options)
+    results = replay(read_keys(args.trace), policies, args.capacity)
+
+    print(f"{'policy':>12}  {'hit ratio':>9}  {'hits':>9}  {'misses':>9}  {'admitted':>9}  {'rejected':>9}  {'too large':>9}  {'bypassed':>9}")
+    for label, row in results.items():
+        ratio = "-" if row["hit_ratio"] is None else f"{row['hit_ratio']:.2%}"
+        print(
+            f"{label:>12}  {ratio:>9}  {row['hits']:>9}  {row['misses']:>9}  {row['admitted']:>9}  "
+            f"{row['rejected']:>9}  {row['too_large']:>9}  {row['bypassed']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compare admission policies on a synthetic trace: Zipf-popular keys mixed with one-off keys
+
+The trace draws --hot-share of its lookups from a Zipf key space and the rest
+from keys that are never repeated. That second part is the traffic that fills
+CacheEntry with one-hit wonders. Each policy is replayed against an LRU of
+--capacity entries, and the hit ratio and entries admitted are reported. The
+trace can be written out and replayed with ``python admission.py`` for other
+settings.
+
+    python benchmarks/bench_admission.py --lookups 200000 --capacity 5000 --save trace.txt
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from admission import create_policy, replay  # noqa: E402
+from workloads import KeySampler  # noqa: E402
+
+
+def build_trace(lookups: int, hot_share: float, cardinality: int, zipf_s: float, seed: int):
+    hot = KeySampler(cardinality, "zipf", zipf_s=zipf_s, seed=seed)
+    once = KeySampler(distribution="unique", prefix="once")
+    chooser = random.Random(seed)
+    hot_count = sum(chooser.random() < hot_share for _ in range(lookups))
+    trace = hot.sample(hot_count) + once.sample(lookups - hot_count)
+    chooser.shuffle(trace)
+    return trace
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=200_000, help="Lookups in the trace")
+    parser.add_argument("--hot-share", type=float, default=0.6, help="Share of lookups drawn from the Zipf keys")
+    parser.add_argument("--cardinality", type=int, default=100_000, help="Distinct Zipf keys")
+    parser.add_argument("--zipf-s", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument("--capacity", type=int, default=5_000, help="Entries the simulated cache holds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Also write the trace to this file")
+    args = parser.parse_args()
+
+    trace = build_trace(args.lookups, args.hot_share, args.cardinality, args.zipf_s, args.seed)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            handle.writelines(f"{key}\n" for key in trace)
+
+    policies = {
+        "always": create_policy("always"),
+        "tinylfu/2": create_policy("tinylfu", min_sightings=2),
+        "tinylfu/3": create_policy("tinylfu", min_sightings=3),
+    }
+    print(f"{'policy':>10}  {'hit ratio':>9}  {'admitted':>9}  {'rejected':>9}  {'us/lookup':>9}")
+    for label, policy in policies.items():
+        start = time.perf_counter()
+        row = replay(trace, {label: policy}, args.capacity)[label]
+        per_lookup = (time.perf_counter() - start) / len(trace) * 1e6
+        print(f"{label:>10}  {row['hit_ratio']:>9.2%}  {row['admitted']:>9}  {row['rejected']:>9}  {per_lookup:>9.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Compare the CacheEntry layouts: unique index on input_text vs 64-bit hash rowid
+
+Both layouts are filled with the same rows. The script then reports the on-disk
+size of the table and its indexes (from the dbstat virtual table) and the
+latency of batched IN (...) lookups like the ones the service issues.
+
+    python benchmarks/bench_cache_index.py --rows 200000 --input-length 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from content_store import key_hash  # noqa: E402
+from database import create_sqlite_engine  # noqa: E402
+from models import CacheEntry  # noqa: E402
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE cacheentry (id INTEGER PRIMARY KEY, input_text VARCHAR NOT NULL UNIQUE, "
+    "transformed_text VARCHAR NOT NULL)"
+)
+
+
+def make_inputs(rows: int, length: int):
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz "
+    return [f"{i}:" + "".join(rng.choices(alphabet, k=length)) for i in range(rows)]
+
+
+def fill(engine, layout: str, inputs, batch: int = 5000) -> None:
+    with engine.begin() as connection:
+        if layout == "legacy":
+            connection.execute(text(LEGACY_SCHEMA))
+            statement = text("INSERT INTO cacheentry (input_text, transformed_text) VALUES (:input_text, :transformed_text)")
+        else:
+            SQLModel.metadata.create_all(connection, tables=[CacheEntry.__table__])
+            statement = text(
+                "INSERT INTO cacheentry (input_hash, input_text, transformed_text) "
+                "VALUES (:input_hash, :input_text, :transformed_text)"
+            )
+        for start in range(0, len(inputs), batch):
+            rows = [
+                {"input_hash": key_hash(value), "input_text": value, "transformed_text": value.upper()}
+                for value in inputs[start:start + batch]
+            ]
+            connection.execute(statement, rows)
+
+
+def object_sizes(engine):
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all()
+    return {name: size for name, size in rows if name != "sqlite_schema"}
+
+
+def lookup_latency(engine, layout: str, inputs, batch: int, rounds: int):
+    rng = random.Random(11)
+    timings = []
+    with engine.connect() as connection:
+        for _ in range(rounds):
+            keys = rng.sample(inputs, batch)
+            start = time.perf_counter()
+            if layout == "legacy":
+                params = {f"k{i}": key for i, key in enumerate(keys)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                query = f"SELECT input_text, transformed_text FROM cacheentry WHERE input_text IN ({placeholders})"
+                found = connection.execute(text(query), params).all()
+            else:
+                params = {f"k{i}": key_hash(key) for i, key in enumerate(keys)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                query = f"SELECT input_text, transformed_text FROM cacheentry WHERE input_hash IN ({placeholders})"
+                requested = set(keys)
+                found = [row for row in connection.execute(text(query), params) if row[0] in requested]
+            timings.append(time.perf_counter() - start)
+            assert len(found) == batch
+    return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95)]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Cache entries per layout")
+    parser.add_argument("--input-length", type=int, default=200, help="Characters per input string")
+    parser.add_argument("--batch", type=int, default=500, help="Keys per IN (...) lookup")
+    parser.add_argument("--rounds", type=int, default=200, help="Lookups to time")
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.rows, args.input_length)
+    print(f"{'layout':>7}  {'file MB':>8}  {'table MB':>9}  {'index MB':>9}  {'p50 ms':>7}  {'p95 ms':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("legacy", "hashed"):
+            engine = create_sqlite_engine(f"sqlite:///{tmp}/{layout}.db")
+            fill(engine, layout, inputs)
+            sizes = object_sizes(engine)
+            table_bytes = sizes.pop("cacheentry")
+            index_bytes = sum(sizes.values())
+            p50, p95 = lookup_latency(engine, layout, inputs, args.batch, args.rounds)
+            engine.dispose()
+            file_bytes = sum(path.stat().st_size for path in Path(tmp).glob(f"{layout}.db*"))
+            print(
+                f"{layout:>7}  {file_bytes / 1e6:>8.1f}  {table_bytes / 1e6:>9.1f}  {index_bytes / 1e6:>9.1f}  "
+                f"{p50 * 1000:>7.2f}  {p95 * 1000:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure bytes on the wire and server CPU per GET /payload/{id} for each content coding
+
+One payload of --pairs pairs is stored per mode, then read --requests times
+through the ASGI app with the matching Accept-Encoding. The response cache is
+off, so every request pays for its coding: "identity" sends the body as is,
+the others compress it on each read, and "stored gzip" serves the copy
+compressed at write time. "br" and "zstd" are listed only when brotli and
+zstandard are installed.
+
+    python benchmarks/bench_compression.py --pairs 2000 --requests 500
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import compression  # noqa: E402
+import main  # noqa: E402
+
+
+async def get_body_bytes(app, path: str, accept_encoding: str) -> int:
+    """Drive one GET through the ASGI app and count the body bytes it sends"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", accept_encoding.encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    received = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return received
+
+
+async def read_many(path: str, accept_encoding: str, requests: int):
+    """Return body bytes per request, CPU ms per request and wall ms per request"""
+    app = main.create_app()
+    await get_body_bytes(app, path, accept_encoding)
+    cpu, wall = time.process_time(), time.perf_counter()
+    size = 0
+    for _ in range(requests):
+        size = await get_body_bytes(app, path, accept_encoding)
+    return size, (time.process_time() - cpu) / requests * 1000, (time.perf_counter() - wall) / requests * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=2000, help="Pairs in each stored payload")
+    parser.add_argument("--requests", type=int, default=500, help="Reads per mode")
+    args = parser.parse_args()
+
+    main.settings.response_cache_max_entries = 0
+    modes = [("identity", "identity", None)]
+    modes += [(encoding, encoding, None) for encoding in ("gzip", "br", "zstd") if encoding in compression.CODECS]
+    modes.append(("stored gzip", "gzip", "gzip"))
+
+    list_1 = [f"hello world {i}" for i in range(args.pairs)]
+    list_2 = [f"interleaved string {i}" for i in range(args.pairs)]
+    print(f"{'mode':>12}  {'bytes/req':>10}  {'ratio':>6}  {'cpu ms/req':>10}  {'wall ms/req':>11}")
+    identity_size = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, (name, accept_encoding, store_encoding) in enumerate(modes):
+            main.settings.payload_store_encoding = store_encoding
+            main.init_resources(f"sqlite:///{tmp}/bench{index}.db")
+            main.build_payload("bench", list_1, list_2)
+            size, cpu_ms, wall_ms = asyncio.run(read_many("/payload/bench", accept_encoding, args.requests))
+            main.close_resources()
+            identity_size = identity_size or size
+            print(f"{name:>12}  {size:>10}  {identity_size / size:>5.1f}x  {cpu_ms:>10.3f}  {wall_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Measure POST /payload throughput as the number of concurrent clients grows
+
+The transformer is replaced with one that sleeps for --latency seconds, which
+stands in for the external service. With the blocking work offloaded to the
+worker pool, throughput should scale with concurrency instead of flattening out.
+
+    python benchmarks/bench_concurrency.py --latency 0.05 --requests 64
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import main  # noqa: E402
+
+
+async def run_level(concurrency: int, total_requests: int, run_id: int) -> float:
+    """Send total_requests cold payloads with the given concurrency; return requests/s"""
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                body = {"list_1": [f"r{run_id}-a{i}"], "list_2": [f"r{run_id}-b{i}"]}
+                response = await client.post("/payload", json=body)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        return total_requests / (time.perf_counter() - start)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated transformer latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    args = parser.parse_args()
+
+    def slow_transformer(text: str) -> str:
+        time.sleep(args.latency)
+        return text.upper()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.init_resources(f"sqlite:///{tmp}/bench.db")
+        main.transformer_function = slow_transformer
+
+        print(f"{'concurrency':>11}  {'req/s':>8}")
+        for run_id, level in enumerate(int(value) for value in args.levels.split(",")):
+            rps = asyncio.run(run_level(level, args.requests, run_id))
+            print(f"{level:>11}  {rps:>8.1f}")
+        main.close_resources()
+
+
+if __name__ == "__main__":
+    main_cli()
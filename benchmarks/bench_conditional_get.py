@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Measure repeat GET /payload/{id} polls: full reads, cached bodies and 304s
+
+One payload of --pairs pairs is stored, then polled --requests times in each
+mode: a plain read from SQLite, a read served by the response cache, and a
+conditional GET answered with 304 from the ETag index and from the response
+cache. Reported are requests/s and response bytes per request.
+
+    python benchmarks/bench_conditional_get.py --pairs 1000 --requests 2000
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import main  # noqa: E402
+
+
+async def poll(payload_id: str, requests: int, headers: dict, clear_cache: bool):
+    """GET one payload repeatedly; return requests/s and body bytes per request"""
+    transport = httpx.ASGITransport(app=main.app)
+    received = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if not clear_cache:
+            # Conditional GETs do not fill the cache; one full read does
+            await client.get(f"/payload/{payload_id}")
+        start = time.perf_counter()
+        for _ in range(requests):
+            if clear_cache:
+                main.response_cache.clear()
+            response = await client.get(f"/payload/{payload_id}", headers=headers)
+            received += len(response.content)
+        return requests / (time.perf_counter() - start), received / requests
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=1000, help="Pairs in the polled payload")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.init_resources(f"sqlite:///{tmp}/bench.db")
+        payload_id = f"bench-{args.pairs}"
+        main.build_payload(payload_id, [f"hello {i}" for i in range(args.pairs)], [f"world {i}" for i in range(args.pairs)])
+        etag = main.load_payload_etag(payload_id)
+
+        modes = [
+            ("database read", {}, True),
+            ("response cache", {}, False),
+            ("304 from index", {"If-None-Match": f'"{etag}"'}, True),
+            ("304 from cache", {"If-None-Match": f'"{etag}"'}, False),
+        ]
+        print(f"{'mode':>15}  {'req/s':>8}  {'bytes/req':>9}")
+        for name, headers, clear_cache in modes:
+            asyncio.run(poll(payload_id, 20, headers, clear_cache))
+            rps, size = asyncio.run(poll(payload_id, args.requests, headers, clear_cache))
+            print(f"{name:>15}  {rps:>8.0f}  {size:>9.0f}")
+        main.close_resources()
+
+
+if __name__ == "__main__":
+    main_cli()
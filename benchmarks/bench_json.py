@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measure JSON request decoding and response encoding, model path vs fast path
+
+"model" is what FastAPI does for a pydantic-typed endpoint: stdlib json.loads,
+PayloadRequest validation, and a PayloadOutput serialized through json.dumps.
+"fast" is what the service does now: fast_json.loads plus a shape check, and
+the stored output bytes framed as the response. Times are per request, the
+best of --repeat runs.
+
+    python benchmarks/bench_json.py --pairs 10,1000,100000
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import fast_json  # noqa: E402
+from main import PayloadOutput, PayloadRequest  # noqa: E402
+from payload_stream import output_document  # noqa: E402
+
+
+def per_call_us(function, repeat: int) -> float:
+    """Best-of-``repeat`` microseconds per call"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", default="10,1000,100000", help="Comma-separated list lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per measurement")
+    args = parser.parse_args()
+
+    print(f"JSON library: {'orjson ' + fast_json.orjson.__version__ if fast_json.orjson else 'stdlib json'}")
+    print(f"{'pairs':>7}  {'step':>7}  {'model us':>10}  {'fast us':>10}  {'speedup':>7}")
+    for pairs in (int(value) for value in args.pairs.split(",")):
+        list_1 = [f"hello world {i}" for i in range(pairs)]
+        list_2 = [f"grüße {i}" for i in range(pairs)]
+        body = json.dumps({"list_1": list_1, "list_2": list_2}).encode("utf-8")
+        output = ", ".join(item.upper() for pair in zip(list_1, list_2) for item in pair)
+        stored = output.encode("utf-8")
+        assert fast_json.is_json_ready(output)
+
+        def model_request():
+            PayloadRequest.model_validate(json.loads(body))
+
+        def fast_request():
+            fast_json.parse_list_pair(fast_json.loads(body))
+
+        def model_response():
+            JSONResponse(jsonable_encoder(PayloadOutput(output=stored.decode("utf-8"))))
+
+        def fast_response():
+            output_document(stored, json_ready=True)
+
+        assert json.loads(JSONResponse(jsonable_encoder(PayloadOutput(output=output))).body) == json.loads(
+            output_document(stored, json_ready=True)
+        )
+        for step, model, fast in (("request", model_request, fast_request), ("response", model_response, fast_response)):
+            model_us = per_call_us(model, args.repeat)
+            fast_us = per_call_us(fast, args.repeat)
+            print(f"{pairs:>7}  {step:>7}  {model_us:>10.1f}  {fast_us:>10.1f}  {model_us / fast_us:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
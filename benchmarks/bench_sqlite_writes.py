@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compare SQLite write throughput with the default settings and the tuned profile
+
+Several threads insert CacheEntry rows, committing after every row as the
+request path does. The default engine uses the rollback journal with
+synchronous=FULL; the tuned engine uses the service's SQLiteProfile.
+
+    python benchmarks/bench_sqlite_writes.py --threads 8 --rows 200
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from content_store import key_hash  # noqa: E402
+from database import SQLiteProfile, create_sqlite_engine  # noqa: E402
+from models import CacheEntry  # noqa: E402
+
+
+def run_writes(engine, threads: int, rows: int):
+    """Insert rows from several threads; return (rows/s, lock errors)"""
+    SQLModel.metadata.create_all(engine)
+    errors = []
+
+    def writer(worker: int):
+        for i in range(rows):
+            try:
+                with Session(engine) as session:
+                    text = f"w{worker}-{i}"
+                    session.add(CacheEntry(input_hash=key_hash(text), input_text=text, transformed_text=text.upper()))
+                    session.commit()
+            except OperationalError as error:
+                errors.append(error)
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return (threads * rows - len(errors)) / elapsed, len(errors)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent writer threads")
+    parser.add_argument("--rows", type=int, default=200, help="Rows committed per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            "default": create_engine(f"sqlite:///{tmp}/default.db", connect_args={"check_same_thread": False}),
+            "tuned": create_sqlite_engine(f"sqlite:///{tmp}/tuned.db", SQLiteProfile()),
+        }
+        print(f"{'profile':>8}  {'rows/s':>9}  {'lock errors':>11}")
+        for name, engine in engines.items():
+            rows_per_second, errors = run_writes(engine, args.threads, args.rows)
+            print(f"{name:>8}  {rows_per_second:>9.1f}  {errors:>11}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Measure cold-start cost: importing main, and spawning uvicorn until it serves requests
+
+For each worker count the server is started twice in a fresh directory: once
+on a new database (schema created) and once on the existing one (schema
+already stamped, so no DDL). Reported times are medians over --runs.
+
+    python benchmarks/bench_startup.py --workers 1,4 --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+READY_LINE = "Application startup complete"
+
+
+def service_env() -> dict:
+    return dict(os.environ, PYTHONPATH=str(ROOT))
+
+
+def import_seconds(cwd: str) -> float:
+    """Time ``import main`` in a fresh interpreter"""
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=service_env(), check=True, capture_output=True, text=True
+    )
+    return float(completed.stdout.strip())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_seconds(cwd: str, workers: int, timeout: float = 60.0):
+    """Start uvicorn; return seconds until the first request succeeds and until every worker is ready"""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=cwd,
+        env=service_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = []
+    all_ready = threading.Event()
+
+    def watch_log():
+        for line in server.stderr:
+            if READY_LINE in line:
+                ready.append(time.perf_counter() - start)
+                if len(ready) == workers:
+                    all_ready.set()
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    first_response = None
+    try:
+        deadline = time.monotonic() + timeout
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while first_response is None and time.monotonic() < deadline:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    if client.get("/").status_code == 200:
+                        first_response = time.perf_counter() - start
+                except httpx.TransportError:
+                    time.sleep(0.005)
+        if first_response is None or not all_ready.wait(max(deadline - time.monotonic(), 0)):
+            raise RuntimeError("uvicorn did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return first_response, ready[-1]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4", help="Comma-separated uvicorn worker counts")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        imports = [import_seconds(tmp) for _ in range(args.runs)]
+        created = sorted(os.listdir(tmp))
+    print(f"import main: median {statistics.median(imports) * 1000:.0f} ms, max {max(imports) * 1000:.0f} ms")
+    print(f"files created by the import: {', '.join(created) if created else 'none'}")
+    print()
+    print(f"{'workers':>7}  {'database':>8}  {'first 200 ms':>12}  {'all ready ms':>12}  {'max ms':>7}")
+    for workers in (int(value) for value in args.workers.split(",")):
+        for database in ("new", "existing"):
+            firsts, alls = [], []
+            for _ in range(args.runs):
+                with tempfile.TemporaryDirectory() as tmp:
+                    if database == "existing":
+                        spawn_seconds(tmp, 1)
+                    first, everyone = spawn_seconds(tmp, workers)
+                firsts.append(first)
+                alls.append(everyone)
+            print(
+                f"{workers:>7}  {database:>8}  {statistics.median(firsts) * 1000:>12.0f}  "
+                f"{statistics.median(alls) * 1000:>12.0f}  {max(alls) * 1000:>7.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
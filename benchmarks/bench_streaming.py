@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Measure peak RSS for concurrent reads of a large payload, buffered vs streamed
+
+The parent process writes one large payload to a temporary database; each
+mode then runs in a fresh child process that issues concurrent GET requests
+and reports its peak resident set size.
+
+    python benchmarks/bench_streaming.py --size-mb 20 --concurrency 8
+"""
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+async def get_discarding_body(app, path: str) -> int:
+    """Drive one GET through the ASGI app, counting body bytes without keeping them"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    received = 0
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return received
+
+
+def run_child(db_path: str, mode: str, concurrency: int) -> None:
+    import main
+
+    main.settings.stream_payloads = mode == "streamed"
+    main.init_resources(f"sqlite:///{db_path}")
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    async def read_all():
+        return await asyncio.gather(*(get_discarding_body(main.app, "/payload/large") for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    sizes = asyncio.run(read_all())
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:>9}  {elapsed:>8.3f}  {(peak_kb - baseline_kb) / 1024:>13.1f}  {sizes[0] / 1e6:>8.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=20, help="Size of the stored payload output")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent GET requests")
+    parser.add_argument("--child", nargs=2, metavar=("DB", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.concurrency)
+        return
+
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from main import Payload
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = f"{tmp}/bench.db"
+        engine = create_engine(f"sqlite:///{db_path}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            output = ", ".join(["TRANSFORMED STRING"] * (args.size_mb * 1024 * 1024 // 20))
+            session.add(Payload(id="large", output=output, created_at="bench"))
+            session.commit()
+        del output
+        engine.dispose()
+
+        print(f"{'mode':>9}  {'seconds':>8}  {'peak RSS +MB':>13}  {'body MB':>8}")
+        for mode in ("buffered", "streamed"):
+            subprocess.run(
+                [sys.executable, __file__, "--concurrency", str(args.concurrency), "--child", db_path, mode],
+                check=True,
+                stderr=subprocess.DEVNULL,
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Compare cold-cache transformation time across transformer backends
+
+Every mode transforms the same set of cold strings against a service that
+adds --latency seconds per call:
+
+  inline    one blocking call per string, as transformer_function does
+  parallel  the async client without batching, capped at --concurrency
+  batched   the async client with the batch API
+
+    python benchmarks/bench_transformer.py --strings 500 --latency 0.05
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from transformer_backends import FakeTransformerService, TransformerClient  # noqa: E402
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strings", type=int, default=500, help="Number of cold strings")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated service latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client concurrency cap")
+    parser.add_argument("--batch-size", type=int, default=100, help="Strings per batch call")
+    parser.add_argument("--skip-inline", action="store_true", help="Skip the slow sequential baseline")
+    args = parser.parse_args()
+
+    texts = [f"cold-{i}" for i in range(args.strings)]
+    print(f"{'mode':>9}  {'seconds':>8}  {'round-trips':>11}")
+
+    if not args.skip_inline:
+        start = time.perf_counter()
+        for text in texts:
+            time.sleep(args.latency)
+            text.upper()
+        print(f"{'inline':>9}  {time.perf_counter() - start:>8.3f}  {len(texts):>11}")
+
+    for mode, supports_batch in (("parallel", False), ("batched", True)):
+        backend = FakeTransformerService(latency=args.latency, supports_batch=supports_batch)
+        client = TransformerClient(backend, max_concurrency=args.concurrency, batch_size=args.batch_size)
+        start = time.perf_counter()
+        client.transform_many(texts)
+        elapsed = time.perf_counter() - start
+        client.close()
+        print(f"{mode:>9}  {elapsed:>8.3f}  {backend.calls:>11}")
+
+
+if __name__ == "__main__":
+    main_cli()
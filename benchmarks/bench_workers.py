@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure throughput as worker processes are added, with and without the shared hot-key cache
+
+For each worker count the service is started with ``python main.py --workers N``
+in a fresh directory, warmed with one pass over a Zipf-distributed key space,
+then loaded for --duration seconds. Each worker has its own L1, so without the
+shared table a key one worker resolved is a database lookup in every other
+worker until it has seen the key too. Reported are requests/s, p95 latency and
+the share of lookups answered by the shared table (from the worker that served
+the /cache/stats request).
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from cli import CacheCLI  # noqa: E402
+from workloads import KeySampler  # noqa: E402
+
+READY_LINE = "Application startup complete"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(cwd: str, port: int, workers: int, shared: bool, timeout: float = 60.0) -> subprocess.Popen:
+    """Run ``python main.py`` and wait until every worker has started"""
+    command = [sys.executable, str(ROOT / "main.py"), "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    if not shared:
+        command.append("--no-shared-cache")
+    server = subprocess.Popen(
+        command,
+        cwd=cwd,
+        env=dict(os.environ, PYTHONPATH=str(ROOT), CACHE_LOG_LEVEL="WARNING"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = []
+    all_ready = threading.Event()
+
+    def watch_log():
+        for line in server.stderr:
+            if READY_LINE in line:
+                ready.append(line)
+                if len(ready) == workers:
+                    all_ready.set()
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    if not all_ready.wait(timeout):
+        server.terminate()
+        server.wait(timeout=30)
+        raise RuntimeError("service did not become ready in time")
+    return server
+
+
+def run(workers: int, shared: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_service(tmp, port, workers, shared)
+        try:
+            cli = CacheCLI(f"http://127.0.0.1:{port}")
+            sampler = KeySampler(args.cardinality, "zipf", zipf_s=args.zipf_s, seed=1)
+            asyncio.run(cli.load(sampler, pairs=args.pairs, concurrency=args.concurrency, requests=args.warm_requests))
+            stats, elapsed = asyncio.run(
+                cli.load(sampler, pairs=args.pairs, concurrency=args.concurrency, duration=args.duration)
+            )
+            lookups = httpx.get(f"http://127.0.0.1:{port}/cache/stats").json().get("shared") or {}
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    summary = stats.summary(elapsed)
+    probes = lookups.get("hits", 0) + lookups.get("misses", 0)
+    summary["shared_hit_ratio"] = lookups.get("hits", 0) / probes if probes else None
+    return summary
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per configuration")
+    parser.add_argument("--warm-requests", type=int, default=200, help="Requests sent before measuring")
+    parser.add_argument("--pairs", type=int, default=100, help="Pairs per request")
+    parser.add_argument("--cardinality", type=int, default=100_000, help="Distinct keys")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7}  {'shared':>6}  {'req/s':>8}  {'p95 ms':>8}  {'shared hits':>11}")
+    for workers in (int(value) for value in args.workers.split(",")):
+        for shared in (False, True) if workers > 1 else (False,):
+            summary = run(workers, shared, args)
+            ratio = summary["shared_hit_ratio"]
+            print(
+                f"{workers:>7}  {'yes' if shared else 'no':>6}  {summary['requests_per_s']:>8.1f}  "
+                f"{summary['p95_ms']:>8.2f}  {'-' if ratio is None else f'{ratio:.1%}':>11}"
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Load-test suite: a fixed scenario matrix with machine-readable results
+
+Each scenario posts payloads drawn from a synthetic key space (see
+``workloads.KeySampler``) against a fresh database, either in-process through
+the ASGI app or over HTTP against a local uvicorn server. The matrix covers a
+cold cache, a pre-warmed cache, list lengths, key cardinalities, Zipf key
+popularity and client concurrency. For every scenario it reports throughput,
+p50/p95/p99 latency and the database size on disk, and writes the results as
+JSON so runs from different commits can be compared:
+
+    python benchmarks/suite.py --mode asgi --output before.json
+    python benchmarks/suite.py --mode asgi --output after.json --compare before.json
+
+``--compare`` exits non-zero when a scenario loses more than ``--tolerance``
+of its throughput or gains as much p95 latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from workloads import KeySampler  # noqa: E402
+
+# Keys per warm-up request (two lists of this many strings each)
+PRIME_PAIRS = 500
+
+
+@dataclass
+class Scenario:
+    name: str
+    pairs: int = 100
+    cardinality: int = 10_000
+    distribution: str = "uniform"
+    concurrency: int = 8
+    requests: int = 200
+    warm: bool = False
+
+
+SCENARIOS = [
+    Scenario("cold-pairs-10", pairs=10, distribution="unique"),
+    Scenario("cold-pairs-100", pairs=100, distribution="unique"),
+    Scenario("cold-pairs-1000", pairs=1000, distribution="unique", requests=50),
+    Scenario("warm-pairs-10", pairs=10, warm=True),
+    Scenario("warm-pairs-100", pairs=100, warm=True),
+    Scenario("warm-pairs-1000", pairs=1000, warm=True, requests=50),
+    Scenario("uniform-keys-1k", cardinality=1_000),
+    Scenario("uniform-keys-100k", cardinality=100_000),
+    Scenario("zipf-keys-1k", cardinality=1_000, distribution="zipf"),
+    Scenario("zipf-keys-100k", cardinality=100_000, distribution="zipf"),
+    Scenario("warm-clients-1", concurrency=1, warm=True),
+    Scenario("warm-clients-32", concurrency=32, warm=True),
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def database_bytes(directory: Path) -> int:
+    """Size of the service database including its WAL and shared-memory files"""
+    return sum(path.stat().st_size for path in directory.glob("cache.db*"))
+
+
+async def prime(client: httpx.AsyncClient, sampler: KeySampler) -> None:
+    """Resolve every key of the space once so the measured run sees only hits"""
+    keys = sampler.all_keys()
+    step = PRIME_PAIRS * 2
+    for start in range(0, len(keys), step):
+        batch = keys[start:start + step]
+        half = len(batch) // 2 or 1
+        response = await client.post("/payload", json={"list_1": batch[:half], "list_2": batch[half:] or batch[:half]})
+        response.raise_for_status()
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, seed: int) -> Dict[str, float]:
+    """Run one scenario against ``client`` and summarise the measured requests"""
+    sampler = KeySampler(scenario.cardinality, scenario.distribution, seed=seed)
+    if scenario.warm:
+        await prime(client, sampler)
+
+    # Bodies are generated up front so sampling cost stays out of the timings
+    bodies = iter([sampler.payload(scenario.pairs) for _ in range(scenario.requests)])
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for body in bodies:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/payload", json=body)
+                failed = response.status_code != 200
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_s": round(scenario.requests / elapsed, 2),
+        "keys_per_s": round(scenario.requests * scenario.pairs * 2 / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def service_env(transformer_latency: float) -> Dict[str, str]:
+    """Environment for a service process: quiet logs and an optional slow transformer"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), CACHE_LOG_LEVEL="WARNING")
+    if transformer_latency > 0:
+        env["CACHE_TRANSFORMER_BACKEND"] = "fake"
+        env["CACHE_TRANSFORMER_OPTIONS"] = json.dumps({"latency": transformer_latency})
+    return env
+
+
+def run_child(scenario: Scenario, seed: int) -> None:
+    """In-process mode: runs inside a fresh interpreter whose working directory holds the database"""
+    import main
+
+    main.init_resources()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await drive(client, scenario, seed)
+
+    summary = asyncio.run(run())
+    # Flushes buffered writes before the database is measured
+    main.close_resources()
+    summary["db_bytes"] = database_bytes(Path.cwd())
+    print(json.dumps(summary))
+
+
+def run_asgi(scenario: Scenario, seed: int, transformer_latency: float) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        completed = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", json.dumps(asdict(scenario)), "--seed", str(seed)],
+            cwd=tmp,
+            env=service_env(transformer_latency),
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not become ready in time")
+
+
+def run_uvicorn(scenario: Scenario, seed: int, transformer_latency: float) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp,
+            env=service_env(transformer_latency),
+        )
+
+        async def run():
+            await wait_until_ready(base_url, server)
+            limits = httpx.Limits(max_connections=scenario.concurrency, max_keepalive_connections=scenario.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+                return await drive(client, scenario, seed)
+
+        try:
+            summary = asyncio.run(run())
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        # Measured after shutdown so buffered writes have been flushed
+        summary["db_bytes"] = database_bytes(Path(tmp))
+        return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], mode: str, baseline_path: str, tolerance: float) -> bool:
+    """Print per-scenario deltas against a baseline file; return True if any regressed"""
+    report = json.loads(Path(baseline_path).read_text())
+    if report["meta"]["mode"] != mode:
+        print(f"\nwarning: baseline was recorded in {report['meta']['mode']} mode, this run used {mode}")
+    baseline = {entry["scenario"]: entry for entry in report["results"]}
+    regressed = False
+    print(f"\n{'scenario':<20} {'req/s Δ':>9} {'p95 Δ':>9}")
+    for entry in results:
+        before = baseline.get(entry["scenario"])
+        if before is None:
+            continue
+        rps_change = entry["requests_per_s"] / before["requests_per_s"] - 1 if before["requests_per_s"] else 0.0
+        p95_change = entry["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = rps_change < -tolerance or p95_change > tolerance
+        regressed |= flag
+        print(f"{entry['scenario']:<20} {rps_change:>+9.1%} {p95_change:>+9.1%}{'  REGRESSION' if flag else ''}")
+    return regressed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi", help="Drive the app in-process or over HTTP")
+    parser.add_argument("--scenarios", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every scenario's request count")
+    parser.add_argument("--transformer-latency", type=float, default=0.0, help="Simulated transformer latency per batch")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for the key samplers")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a previous JSON results file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression for --compare")
+    parser.add_argument("--list", action="store_true", help="List scenario names and exit")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(Scenario(**json.loads(args.child)), args.seed)
+        return
+    if args.list:
+        for scenario in SCENARIOS:
+            print(scenario.name)
+        return
+
+    scenarios = SCENARIOS
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        unknown = wanted - {scenario.name for scenario in SCENARIOS}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in SCENARIOS if scenario.name in wanted]
+
+    runner = run_asgi if args.mode == "asgi" else run_uvicorn
+    results = []
+    print(f"{'scenario':<20} {'req/s':>9} {'keys/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db MB':>7} {'err':>4}")
+    for scenario in scenarios:
+        scaled = Scenario(**dict(asdict(scenario), requests=max(1, int(scenario.requests * args.scale))))
+        summary = runner(scaled, args.seed, args.transformer_latency)
+        results.append({"scenario": scaled.name, **{f.name: getattr(scaled, f.name) for f in fields(Scenario)[1:]}, **summary})
+        print(
+            f"{scaled.name:<20} {summary['requests_per_s']:>9.1f} {summary['keys_per_s']:>10.0f} "
+            f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+            f"{summary['db_bytes'] / 1e6:>7.2f} {summary['errors']:>4}"
+        )
+
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "transformer_latency": args.transformer_latency,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nResults written to {args.output}")
+    if args.compare and compare(results, args.mode, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,317 @@
+"""Pluggable stores for transformed strings: the shared tier behind the in-process L1 cache
+
+``sqlite`` keeps entries in the local CacheEntry table, ``memory`` in a bounded
+per-process dict and ``redis`` on any server speaking the Redis protocol, so
+several workers or containers can share one warm cache.
+"""
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, col, select
+
+import metrics
+from content_store import key_hash
+from memory_cache import LRUCache
+from models import CacheEntry
+
+
+class CacheBackend:
+    """Base class for cache stores
+
+    ``get_many`` returns the entries it has for the requested keys and
+    ``set_many`` stores entries; both are blocking and called from worker
+    threads. Backends keeping their entries in the service's own database set
+    ``uses_database`` so write-behind, access stamps and eviction apply to them.
+    """
+
+    name = "base"
+    uses_database = False
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+def cache_rows(items: Dict[str, str], now: Optional[float] = None) -> List[dict]:
+    """CacheEntry rows for transformed strings, stamped as created and accessed now"""
+    now = time.time() if now is None else now
+    return [
+        {
+            "input_hash": key_hash(text),
+            "input_text": text,
+            "transformed_text": result,
+            "created_at": now,
+            "last_access": now,
+        }
+        for text, result in items.items()
+    ]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Entries in the CacheEntry table, looked up by 64-bit key hash with one IN (...) query per chunk"""
+
+    name = "sqlite"
+    uses_database = True
+
+    def __init__(self, get_engine: Callable[[], Engine], chunk_size: int = 500):
+        # Resolved per call, so the engine can be replaced after construction
+        self._get_engine = get_engine
+        self.chunk_size = chunk_size
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        results: Dict[str, str] = {}
+        with Session(self._get_engine()) as session:
+            for start in range(0, len(keys), self.chunk_size):
+                chunk = keys[start:start + self.chunk_size]
+                requested = set(chunk)
+                statement = select(CacheEntry.input_text, CacheEntry.transformed_text).where(
+                    col(CacheEntry.input_hash).in_({key_hash(text) for text in chunk})
+                )
+                for input_text, transformed_text in session.exec(statement):
+                    # A row stored for another string with the same hash is a miss
+                    if input_text not in requested:
+                        metrics.CACHE_HASH_COLLISIONS.inc()
+                        continue
+                    results[input_text] = transformed_text
+        return results
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        # ON CONFLICT DO NOTHING: another process may have stored the same string (or,
+        # very rarely, a different one with the same hash, which then stays uncached)
+        statement = sqlite_insert(CacheEntry).on_conflict_do_nothing(index_elements=["input_hash"])
+        with Session(self._get_engine()) as session:
+            session.execute(statement, cache_rows(items))
+            session.commit()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Entries in a bounded in-process LRU; nothing is shared or persisted"""
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: int = 1_000_000,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        results = {}
+        for key in keys:
+            value = self._cache.get(key)
+            if value is not None:
+                results[key] = value
+        return results
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        for key, value in items.items():
+            self._cache.set(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """Encode one command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class RespConnection:
+    """One blocking connection that sends commands in pipelines: all requests in one write, then all replies"""
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = 5.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """Send ``commands`` and return their replies; raises the first error reply after reading all"""
+        self._sock.sendall(b"".join(encode_command(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *args: Any) -> Any:
+        return self.pipeline([args])[0]
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the cache server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            return RedisError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the cache server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from the cache server: {line[:32]!r}")
+
+    def close(self) -> None:
+        self._reader.close()
+        self._sock.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Entries on a Redis-protocol server, read with pipelined MGET and written with pipelined MSET
+
+    A batch costs one round trip however many chunks it spans. Entries expire
+    after ``ttl_seconds`` when set; size bounds are left to the server's
+    ``maxmemory`` policy. Connections are pooled per process.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        key_prefix: str = "cache:",
+        ttl_seconds: Optional[float] = None,
+        timeout: Optional[float] = 5.0,
+        chunk_size: int = 500,
+        max_idle_connections: int = 16,
+    ):
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL scheme '{parts.scheme}'")
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.password = unquote(parts.password) if parts.password else None
+        self.username = unquote(parts.username) if parts.username else None
+        self.key_prefix = key_prefix
+        self.ttl_ms = int(ttl_seconds * 1000) if ttl_seconds is not None else None
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_idle_connections = max_idle_connections
+        self._idle: List[RespConnection] = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.round_trips = 0
+
+    def _connect(self) -> RespConnection:
+        connection = RespConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password is not None:
+                auth = ["AUTH", self.password] if self.username is None else ["AUTH", self.username, self.password]
+                connection.execute(*auth)
+            if self.db:
+                connection.execute("SELECT", self.db)
+        except BaseException:
+            connection.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """Run commands in one round trip on a pooled connection"""
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            replies = connection.pipeline(commands)
+        except RedisError:
+            # The connection read every reply and is still in sync
+            self._release(connection)
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection)
+        with self._lock:
+            self.round_trips += 1
+        return replies
+
+    def _release(self, connection: RespConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle_connections:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _key(self, text: str) -> bytes:
+        return (self.key_prefix + text).encode("utf-8")
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        chunks = [keys[start:start + self.chunk_size] for start in range(0, len(keys), self.chunk_size)]
+        replies = self.pipeline([["MGET", *map(self._key, chunk)] for chunk in chunks])
+        return {
+            key: value.decode("utf-8")
+            for chunk, values in zip(chunks, replies)
+            for key, value in zip(chunk, values)
+            if value is not None
+        }
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        # Values are deterministic, so overwriting a concurrent writer's entry is harmless
+        if self.ttl_ms is None:
+            pairs = list(items.items())
+            commands = [
+                ["MSET", *(part for key, value in pairs[start:start + self.chunk_size] for part in (self._key(key), value))]
+                for start in range(0, len(pairs), self.chunk_size)
+            ]
+        else:
+            commands = [["SET", self._key(key), value, "PX", self.ttl_ms] for key, value in items.items()]
+        self.pipeline(commands)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "round_trips": self.round_trips,
+                "connections_opened": self.connections_opened,
+                "idle_connections": len(self._idle),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
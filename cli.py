@@ -2,18 +2,107 @@
 """CLI tool for testing the FastAPI Caching Service"""
 
 import argparse
+import asyncio
 import json
 import sys
+import time
 import httpx
-from typing import Optional, TextIO
+from bisect import bisect_left
+from typing import List, Optional, TextIO, Tuple
 from pathlib import Path
 
+import fast_json
+from workloads import DISTRIBUTIONS, KeySampler
+
+# Upper bounds (ms) of the load-mode latency histogram rows
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+HISTOGRAM_WIDTH = 40
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Ids per GET /payloads request, keeping the URL well under server line limits
+BATCH_GET_IDS = 200
+
+# Payloads per POST /payloads:batch request, the server's default batch_max_payloads
+BATCH_POST_PAYLOADS = 1000
+
+class LoadStats:
+    """Latencies and failures collected by the load mode"""
+    
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+    
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+    
+    def percentile(self, fraction: float) -> float:
+        """Nearest-rank percentile in milliseconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+        return ordered[index] * 1000
+    
+    def summary(self, elapsed: float) -> dict:
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "requests_per_s": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(max(self.latencies, default=0.0) * 1000, 3),
+        }
+    
+    def histogram(self) -> List[Tuple[str, int]]:
+        """Request counts per latency bucket, labelled by upper bound"""
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for seconds in self.latencies:
+            counts[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        labels = [f"<= {bound} ms" for bound in LATENCY_BUCKETS_MS] + [f"> {LATENCY_BUCKETS_MS[-1]} ms"]
+        return list(zip(labels, counts))
+    
+    def report(self, elapsed: float, output_file: TextIO):
+        """Print the latency histogram followed by the throughput summary"""
+        rows = self.histogram()
+        peak = max((count for _, count in rows), default=0) or 1
+        output_file.write("Latency histogram:\n")
+        for label, count in rows:
+            if count:
+                bar = "#" * max(1, count * HISTOGRAM_WIDTH // peak)
+                output_file.write(f"  {label:>12}  {count:>8}  {bar}\n")
+        summary = self.summary(elapsed)
+        output_file.write(
+            f"\nRequests: {summary['requests']}  Errors: {summary['errors']}  "
+            f"Duration: {summary['seconds']:.2f}s  Throughput: {summary['requests_per_s']:.1f} req/s\n"
+            f"Latency p50: {summary['p50_ms']:.2f} ms  p95: {summary['p95_ms']:.2f} ms  "
+            f"p99: {summary['p99_ms']:.2f} ms  max: {summary['max_ms']:.2f} ms\n"
+        )
+
 class CacheCLI:
     """Command-line interface for the caching service"""
     
     def __init__(self, host: str = "http://localhost:8000"):
         self.host = host.rstrip('/')
         self.base_url = f"{self.host}/payload"
+        self._client: Optional[httpx.Client] = None
+    
+    @property
+    def client(self) -> httpx.Client:
+        """Shared client so repeated calls reuse one keep-alive connection"""
+        if self._client is None:
+            self._client = httpx.Client()
+        return self._client
+    
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
     
     def create_payload(self, list_1: list, list_2: list) -> dict:
         """Create a new payload"""
@@ -23,10 +112,9 @@ class CacheCLI:
         }
         
         try:
-            with httpx.Client() as client:
-                response = client.post(self.base_url, json=payload_data)
-                response.raise_for_status()
-                return response.json()
+            response = self.client.post(self.base_url, json=payload_data)
+            response.raise_for_status()
+            return response.json()
         except httpx.RequestError as e:
             print(f"Error creating payload: {e}", file=sys.stderr)
             sys.exit(1)
@@ -34,14 +122,92 @@ class CacheCLI:
     def get_payload(self, payload_id: str) -> dict:
         """Retrieve a payload by ID"""
         try:
-            with httpx.Client() as client:
-                response = client.get(f"{self.base_url}/{payload_id}")
-                response.raise_for_status()
-                return response.json()
+            response = self.client.get(f"{self.base_url}/{payload_id}")
+            response.raise_for_status()
+            return fast_json.loads(response.content)
         except httpx.RequestError as e:
             print(f"Error retrieving payload: {e}", file=sys.stderr)
             sys.exit(1)
     
+    @staticmethod
+    def error_detail(response: httpx.Response) -> str:
+        """The server's error message for a failed response"""
+        try:
+            return str(fast_json.loads(response.content)["detail"])
+        except (ValueError, KeyError, TypeError):
+            return response.text or response.reason_phrase
+    
+    def create_payload_batch(self, payloads: list) -> list:
+        """Create many payloads, up to BATCH_POST_PAYLOADS per request; returns their ids in order"""
+        payload_ids = []
+        try:
+            for start in range(0, len(payloads), BATCH_POST_PAYLOADS):
+                chunk = payloads[start:start + BATCH_POST_PAYLOADS]
+                response = self.client.post(f"{self.host}/payloads:batch", json={"payloads": chunk})
+                response.raise_for_status()
+                payload_ids.extend(response.json()["ids"])
+            return payload_ids
+        except httpx.HTTPStatusError as e:
+            print(
+                f"Error creating payload batch: HTTP {e.response.status_code}: {self.error_detail(e.response)}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        except httpx.RequestError as e:
+            print(f"Error creating payload batch: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    def get_payloads(self, payload_ids: list) -> dict:
+        """Retrieve many payloads by ID, a few hundred per request"""
+        result = {"payloads": [], "missing": []}
+        try:
+            for start in range(0, len(payload_ids), BATCH_GET_IDS):
+                chunk = payload_ids[start:start + BATCH_GET_IDS]
+                response = self.client.get(f"{self.host}/payloads", params={"ids": ",".join(chunk)})
+                response.raise_for_status()
+                data = fast_json.loads(response.content)
+                result["payloads"].extend(data["payloads"])
+                result["missing"].extend(data["missing"])
+            return result
+        except httpx.HTTPStatusError as e:
+            print(
+                f"Error retrieving payloads: HTTP {e.response.status_code}: {self.error_detail(e.response)}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        except httpx.RequestError as e:
+            print(f"Error retrieving payloads: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    @staticmethod
+    def validate_batch_input(data) -> list:
+        """Accept a JSON array of payload objects or an object with a 'payloads' array"""
+        if isinstance(data, dict) and "payloads" in data:
+            data = data["payloads"]
+        if not isinstance(data, list):
+            print("Error: Batch input must be an array of payload objects", file=sys.stderr)
+            sys.exit(1)
+        for index, item in enumerate(data):
+            if not isinstance(item, dict) or not isinstance(item.get("list_1"), list) or not isinstance(item.get("list_2"), list):
+                print(f"Error: Payload {index} must contain 'list_1' and 'list_2' arrays", file=sys.stderr)
+                sys.exit(1)
+            if len(item["list_1"]) != len(item["list_2"]):
+                print(f"Error: Payload {index}: 'list_1' and 'list_2' must have the same length", file=sys.stderr)
+                sys.exit(1)
+        return data
+    
+    def process_batch_file(self, input_file: TextIO) -> list:
+        """Process batch input from file or stdin"""
+        try:
+            content = input_file.read().strip()
+            if not content:
+                print("Error: Empty input", file=sys.stderr)
+                sys.exit(1)
+            return self.validate_batch_input(json.loads(content))
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON: {e}", file=sys.stderr)
+            sys.exit(1)
+    
     def process_input_file(self, input_file: TextIO) -> dict:
         """Process input from file or stdin"""
         try:
@@ -75,20 +241,23 @@ class CacheCLI:
     
     def write_output(self, data: dict, output_file: TextIO):
         """Write output to file or stdout"""
-        json.dump(data, output_file, indent=2)
+        output_file.write(fast_json.dumps(data, indent=True).decode("utf-8"))
         output_file.write('\n')
     
     def run(self, args):
         """Main CLI execution"""
+        batch = getattr(args, 'batch', False)
+        process = self.process_batch_file if batch else self.process_input_file
+        
         # Determine input source
         if hasattr(args, 'json') and args.json:
             # Handle JSON input directly
             input_data = args.json
         elif args.input == '-':
-            input_data = self.process_input_file(sys.stdin)
+            input_data = process(sys.stdin)
         else:
             with open(args.input, 'r') as f:
-                input_data = self.process_input_file(f)
+                input_data = process(f)
         
         # Determine output destination
         if args.output == '-':
@@ -102,12 +271,17 @@ class CacheCLI:
                 if args.repeat > 1:
                     print(f"--- Iteration {i + 1}/{args.repeat} ---", file=sys.stderr)
                 
-                # Create payload
-                result = self.create_payload(input_data["list_1"], input_data["list_2"])
-                payload_id = result["id"]
-                
-                # Retrieve payload
-                payload_output = self.get_payload(payload_id)
+                if batch:
+                    # Create and retrieve all payloads with batch requests
+                    payload_ids = self.create_payload_batch(input_data)
+                    payload_output = self.get_payloads(payload_ids)
+                else:
+                    # Create payload
+                    result = self.create_payload(input_data["list_1"], input_data["list_2"])
+                    payload_id = result["id"]
+                    
+                    # Retrieve payload
+                    payload_output = self.get_payload(payload_id)
                 
                 # Write output
                 self.write_output(payload_output, output_file)
@@ -116,8 +290,87 @@ class CacheCLI:
                     output_file.write('\n')
         
         finally:
+            self.close()
             if args.output != '-':
                 output_file.close()
+    
+    async def load(
+        self,
+        sampler: KeySampler,
+        pairs: int,
+        concurrency: int,
+        requests: Optional[int] = None,
+        duration: Optional[float] = None,
+        http2: bool = False,
+        read_back: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> Tuple[LoadStats, float]:
+        """Send generated payloads from ``concurrency`` workers over one pooled client
+        
+        Stops after ``requests`` requests or ``duration`` seconds. With
+        ``read_back`` each created payload is also fetched, and the pair counts
+        as one request.
+        """
+        stats = LoadStats()
+        remaining = requests
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        
+        async with httpx.AsyncClient(
+            base_url=self.host, limits=limits, http2=http2, timeout=60.0, transport=transport
+        ) as client:
+            start = time.perf_counter()
+            deadline = start + duration if duration is not None else None
+            
+            async def worker():
+                nonlocal remaining
+                while True:
+                    if remaining is not None:
+                        if remaining <= 0:
+                            return
+                        remaining -= 1
+                    elif time.perf_counter() >= deadline:
+                        return
+                    
+                    # Encoded up front with the fast encoder, so client-side JSON work stays out of the timings
+                    body = fast_json.dumps(sampler.payload(pairs))
+                    sent = time.perf_counter()
+                    try:
+                        response = await client.post("/payload", content=body, headers=JSON_HEADERS)
+                        ok = response.status_code == 200
+                        if ok and read_back:
+                            response = await client.get(f"/payload/{fast_json.loads(response.content)['id']}")
+                            ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    stats.record(time.perf_counter() - sent, ok)
+            
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return stats, time.perf_counter() - start
+    
+    def run_load(self, args):
+        """Load-generation mode: report latency and throughput instead of payload outputs"""
+        sampler = KeySampler(args.cardinality, args.distribution, zipf_s=args.zipf_s, seed=args.seed)
+        requests = None if args.duration is not None else (args.requests or 1000)
+        try:
+            stats, elapsed = asyncio.run(self.load(
+                sampler,
+                pairs=args.pairs,
+                concurrency=args.concurrency,
+                requests=requests,
+                duration=args.duration,
+                http2=args.http2,
+                read_back=args.read_back,
+            ))
+        except ImportError as e:
+            # httpx needs the optional h2 package for HTTP/2
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        
+        if args.output == '-':
+            stats.report(elapsed, sys.stdout)
+        else:
+            with open(args.output, 'w') as output_file:
+                stats.report(elapsed, output_file)
 
 def main():
     """Main entry point"""
@@ -137,6 +390,12 @@ Examples:
   
   # Test with stdin/stdout
   echo '{"list_1": ["a"], "list_2": ["b"]}' | cache-cli --input - --output -
+  
+  # Create and fetch many payloads with the batch endpoints
+  cache-cli --batch --json '[{"list_1": ["a"], "list_2": ["b"]}, {"list_1": ["c"], "list_2": ["d"]}]'
+  
+  # Load test: 32 concurrent clients for 30 seconds over Zipf-distributed keys
+  cache-cli --load --concurrency 32 --duration 30 --distribution zipf
         """
     )
     
@@ -170,10 +429,108 @@ Examples:
         help='Output file path ("-" for stdout, default: stdout)'
     )
     
+    parser.add_argument(
+        '-b', '--batch',
+        action='store_true',
+        help='Input is an array of payload objects sent through the batch endpoints'
+    )
+    
+    load_group = parser.add_argument_group('load mode')
+    
+    load_group.add_argument(
+        '--load',
+        action='store_true',
+        help='Generate concurrent load and print latency and throughput statistics'
+    )
+    
+    load_group.add_argument(
+        '-c', '--concurrency',
+        type=int,
+        default=10,
+        help='Concurrent workers sharing one connection pool (default: 10)'
+    )
+    
+    limit = load_group.add_mutually_exclusive_group()
+    
+    limit.add_argument(
+        '-n', '--requests',
+        type=int,
+        help='Total requests to send (default: 1000)'
+    )
+    
+    limit.add_argument(
+        '-d', '--duration',
+        type=float,
+        help='Seconds to keep sending requests'
+    )
+    
+    load_group.add_argument(
+        '--distribution',
+        choices=DISTRIBUTIONS,
+        default='uniform',
+        help='Key popularity: uniform random, zipf or unique (all misses) (default: uniform)'
+    )
+    
+    load_group.add_argument(
+        '--cardinality',
+        type=int,
+        default=10000,
+        help='Number of distinct keys to draw from (default: 10000)'
+    )
+    
+    load_group.add_argument(
+        '--zipf-s',
+        type=float,
+        default=1.1,
+        help='Zipf exponent; larger values concentrate load on fewer keys (default: 1.1)'
+    )
+    
+    load_group.add_argument(
+        '--pairs',
+        type=int,
+        default=10,
+        help='Strings per list in each generated payload (default: 10)'
+    )
+    
+    load_group.add_argument(
+        '--seed',
+        type=int,
+        help='Random seed for reproducible key sequences'
+    )
+    
+    load_group.add_argument(
+        '--http2',
+        action='store_true',
+        help='Use HTTP/2 (requires the h2 package)'
+    )
+    
+    load_group.add_argument(
+        '--read-back',
+        action='store_true',
+        help='Also GET every created payload'
+    )
+    
     args = parser.parse_args()
     
+    if args.load:
+        if args.concurrency < 1 or args.pairs < 1 or args.cardinality < 1:
+            print("Error: Concurrency, pairs and cardinality must be at least 1", file=sys.stderr)
+            sys.exit(1)
+        if (args.requests is not None and args.requests < 1) or (args.duration is not None and args.duration <= 0):
+            print("Error: Requests and duration must be positive", file=sys.stderr)
+            sys.exit(1)
+        cli = CacheCLI(args.host)
+        cli.run_load(args)
+        return
+    
     # Handle JSON input
-    if args.json:
+    if args.json and args.batch:
+        try:
+            args.json = CacheCLI.validate_batch_input(json.loads(args.json))
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.json:
         try:
             input_data = json.loads(args.json)
             if not isinstance(input_data, dict):
@@ -0,0 +1,121 @@
+"""Content-Encoding negotiation and compressors for payload responses
+
+gzip comes from the standard library; "br" and "zstd" are offered only when
+the optional brotli and zstandard packages are installed. Every codec is used
+through the same incremental interface, so whole bodies and streamed
+responses share one code path.
+"""
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_LEVELS = {"gzip": 6, "br": 5, "zstd": 3}
+
+
+class Compressor:
+    """Incremental compressor: ``compress`` each chunk in order, then ``flush`` once"""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int):
+        # wbits 31: a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+CODECS: Dict[str, Callable[[int], Compressor]] = {"gzip": GzipCompressor}
+if brotli is not None:
+    CODECS["br"] = BrotliCompressor
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCompressor
+
+
+def available(encodings: Iterable[str]) -> List[str]:
+    """The configured encodings that can be produced here, in preference order"""
+    return [encoding for encoding in encodings if encoding in CODECS]
+
+
+def compressor(encoding: str, levels: Optional[Dict[str, int]] = None) -> Compressor:
+    """A fresh compressor for ``encoding`` at its configured or default level"""
+    level = (levels or {}).get(encoding, DEFAULT_LEVELS[encoding])
+    return CODECS[encoding](level)
+
+
+def compress(data: bytes, encoding: str, levels: Optional[Dict[str, int]] = None) -> bytes:
+    """Compress a whole body"""
+    codec = compressor(encoding, levels)
+    return codec.compress(data) + codec.flush()
+
+
+def negotiate(accept_encoding: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """Pick the offered encoding the client prefers, or None for identity
+
+    Follows the q-values of an Accept-Encoding header. ``*`` covers encodings
+    not named, and ties go to the earlier entry of ``offered``.
+    """
+    if not accept_encoding or not offered:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in offered:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
@@ -0,0 +1,156 @@
+"""Runtime settings for the FastAPI Caching Service"""
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Service settings, overridable through CACHE_* environment variables"""
+
+    model_config = SettingsConfigDict(env_prefix="CACHE_")
+
+    # SQLite performance profile, applied to every connection
+    sqlite_journal_mode: Optional[str] = "WAL"
+    sqlite_synchronous: Optional[str] = "NORMAL"
+    sqlite_mmap_size: Optional[int] = 256 * 1024 * 1024
+    sqlite_cache_size: Optional[int] = -64_000
+    sqlite_temp_store: Optional[str] = "MEMORY"
+    sqlite_busy_timeout_ms: Optional[int] = 5_000
+    sqlite_auto_vacuum: Optional[str] = "INCREMENTAL"
+    db_pool_size: int = 10
+    db_max_overflow: int = 30
+    db_pool_timeout: float = 30.0
+
+    # In-process L1 tier in front of the CacheEntry table
+    l1_max_entries: int = 10_000
+    l1_max_bytes: int = 64 * 1024 * 1024
+    l1_ttl_seconds: Optional[float] = None
+
+    # Cross-process hot-key tier between L1 and the shared tier: a fixed-size hash
+    # table in a memory-mapped file that every worker on the host maps, so a string
+    # resolved by one worker is a hit for the others without a database round trip.
+    # Entries larger than a slot are not kept. "python main.py --workers N" sets a
+    # path under /dev/shm when none is configured.
+    shared_cache_path: Optional[str] = None
+    shared_cache_slots: int = 65_536
+    shared_cache_slot_bytes: int = 256
+
+    # Which transformed strings are written to the cache tiers: "always" caches
+    # every one, "tinylfu" only those a doorkeeper and count-min sketch have seen
+    # cache_admission_min_sightings times, so one-off inputs stay out of CacheEntry.
+    # Keys or values above the byte limits are never cached, and inputs of at most
+    # cache_bypass_max_chars characters are transformed without a lookup. With
+    # cache_trace_path every looked-up key is appended to that file for offline
+    # replay ("python admission.py trace.txt").
+    cache_admission_policy: Literal["always", "tinylfu"] = "always"
+    cache_admission_min_sightings: int = 2
+    cache_admission_sketch_width: int = 65_536
+    cache_admission_max_key_bytes: Optional[int] = None
+    cache_admission_max_value_bytes: Optional[int] = None
+    cache_bypass_max_chars: int = 0
+    cache_trace_path: Optional[str] = None
+
+    # Shared tier behind L1: "sqlite" keeps entries in the local CacheEntry table,
+    # "memory" in a per-process LRU bounded by cache_max_rows/cache_max_bytes, and
+    # "redis" on a Redis-protocol server shared by every worker and container
+    cache_backend: Literal["sqlite", "memory", "redis"] = "sqlite"
+    redis_url: str = "redis://localhost:6379/0"
+    redis_key_prefix: str = "cache:"
+    redis_timeout: float = 5.0
+
+    # Startup warm-up, run in the background while requests are served: load the
+    # warmup_top_n most used CacheEntry rows into L1, import a snapshot file and
+    # transform the strings listed one per line in warmup_keys_path. With
+    # warmup_snapshot_on_shutdown the L1 contents are saved to the snapshot on exit.
+    warmup_top_n: int = 0
+    warmup_snapshot_path: Optional[str] = None
+    warmup_snapshot_on_shutdown: bool = False
+    warmup_keys_path: Optional[str] = None
+    warmup_concurrency: int = 4
+    warmup_batch_size: int = 500
+
+    # Worker processes started by "python main.py"
+    workers: int = 1
+
+    # Bounded thread pool for blocking database and transformer work
+    worker_threads: int = 40
+
+    # Transformer backend: "inline" calls transformer_function per miss; otherwise
+    # a registry name ("local", "fake") or "module:ClassName" driven asynchronously
+    transformer_backend: str = "inline"
+    transformer_options: Dict[str, Any] = {}
+    transformer_max_concurrency: int = 16
+    transformer_timeout: float = 5.0
+    transformer_retries: int = 2
+    transformer_backoff: float = 0.1
+    transformer_batch_size: int = 100
+
+    # Store each distinct payload output once and reference it from payload ids
+    payload_dedup: bool = False
+
+    # GET /payload/{id} streams outputs of at least stream_min_bytes straight
+    # from SQLite in fixed-size chunks
+    stream_payloads: bool = True
+    stream_min_bytes: int = 1024 * 1024
+    stream_chunk_bytes: int = 64 * 1024
+
+    # Stored payloads never change, so GET /payload/{id} responses carry a strong
+    # ETag and "Cache-Control: public, max-age=..., immutable". Encoded bodies of
+    # non-streamed reads are kept in an in-process LRU keyed by payload id (0
+    # entries disables it); entries leave it only by eviction or payload retention.
+    payload_max_age_seconds: int = 365 * 24 * 3600
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # Content-Encoding negotiation for GET /payload/{id}: bodies of at least
+    # compression_min_bytes are compressed with the first of compression_encodings
+    # the client accepts (equal q-values follow this order; an empty list turns
+    # compression off). "br" and "zstd" need the optional brotli and zstandard
+    # packages and are skipped without them. compression_levels overrides the
+    # per-encoding defaults. With payload_store_encoding, outputs of that size are
+    # also stored compressed when written, so reads in that encoding skip compression.
+    compression_encodings: List[str] = ["zstd", "br", "gzip"]
+    compression_min_bytes: int = 1024
+    compression_levels: Dict[str, int] = {}
+    payload_store_encoding: Optional[Literal["gzip", "br", "zstd"]] = None
+
+    # Pairs resolved and stored per chunk by POST /payload/stream
+    ingest_chunk_pairs: int = 1000
+
+    # Most payloads accepted by POST /payloads:batch or fetched by GET /payloads
+    batch_max_payloads: int = 1000
+
+    # Logging: one structured record per request; per-key debug records are
+    # only emitted at DEBUG level for the sampled fraction of lookups
+    log_level: str = "INFO"
+    log_format: Literal["json", "text"] = "json"
+    log_debug_sample_rate: float = 0.0
+
+    # Record hot-path metrics and serve them on /metrics
+    metrics_enabled: bool = True
+
+    # Write durability: "immediate" commits each write before responding; "group"
+    # and "deferred" queue writes for a background group commit, with "group"
+    # still waiting for that commit before responding
+    write_durability: Literal["immediate", "group", "deferred"] = "immediate"
+    write_flush_rows: int = 500
+    write_flush_interval_ms: int = 50
+
+    # Persistent cache bounds and payload retention, enforced by the background
+    # maintenance task; None disables a bound. Size-based eviction removes the
+    # least recently ("lru") or least frequently ("lfu") used entries first;
+    # cache_max_bytes bounds the UTF-8 size of CacheEntry's keys and values.
+    cache_ttl_seconds: Optional[float] = None
+    cache_max_rows: Optional[int] = None
+    cache_max_bytes: Optional[int] = None
+    cache_eviction_policy: Literal["lru", "lfu"] = "lru"
+    payload_ttl_seconds: Optional[float] = None
+    # Chunks of a streamed payload with no header and no chunk newer than this
+    # belong to an ingest that died part-way
+    payload_orphan_grace_seconds: float = 3600.0
+    maintenance_interval_seconds: float = 30.0
+    maintenance_batch_rows: int = 500
+    maintenance_vacuum_pages: int = 1000
+
+
+settings = Settings()
@@ -0,0 +1,39 @@
+"""Digests for content-addressed payload storage"""
+import hashlib
+from typing import List
+
+DIGEST_SIZE = 16
+
+
+def content_hasher():
+    """Incremental form of content_digest, fed the UTF-8 bytes of an output in order"""
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def content_digest(output: str) -> str:
+    """BLAKE2b digest of an interleaved payload output"""
+    hasher = content_hasher()
+    hasher.update(output.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def key_hash(text: str) -> int:
+    """Signed 64-bit BLAKE2b hash of a cache key, used as the CacheEntry rowid"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8, person=b"cache-key")
+    return int.from_bytes(digest.digest(), "little", signed=True)
+
+
+def request_digest(list_1: List[str], list_2: List[str]) -> str:
+    """BLAKE2b digest identifying a list pair
+
+    Every list and string is length-prefixed so that different inputs can
+    never encode to the same byte stream.
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE, person=b"payload-request")
+    for items in (list_1, list_2):
+        digest.update(len(items).to_bytes(8, "little"))
+        for item in items:
+            encoded = item.encode("utf-8")
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+    return digest.hexdigest()
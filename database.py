@@ -0,0 +1,116 @@
+"""SQLite engine construction with a tuned, per-connection performance profile"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Union
+
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import create_engine
+
+
+@dataclass
+class SQLiteProfile:
+    """PRAGMA settings applied to every new SQLite connection
+
+    Any field set to None leaves SQLite's default in place.
+    """
+
+    journal_mode: Optional[str] = "WAL"
+    synchronous: Optional[str] = "NORMAL"
+    mmap_size: Optional[int] = 256 * 1024 * 1024
+    cache_size: Optional[int] = -64_000  # negative values are KiB
+    temp_store: Optional[str] = "MEMORY"
+    busy_timeout_ms: Optional[int] = 5_000
+    # Only takes effect on a database without tables (or after a full VACUUM)
+    auto_vacuum: Optional[str] = None
+
+    def pragmas(self):
+        """PRAGMA statements for this profile, in the order they must run"""
+        statements = []
+        if self.auto_vacuum is not None:
+            statements.append(f"PRAGMA auto_vacuum={self.auto_vacuum}")
+        if self.journal_mode is not None:
+            statements.append(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous is not None:
+            statements.append(f"PRAGMA synchronous={self.synchronous}")
+        if self.mmap_size is not None:
+            statements.append(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        if self.cache_size is not None:
+            statements.append(f"PRAGMA cache_size={int(self.cache_size)}")
+        if self.temp_store is not None:
+            statements.append(f"PRAGMA temp_store={self.temp_store}")
+        if self.busy_timeout_ms is not None:
+            statements.append(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return statements
+
+
+def apply_sqlite_profile(engine: Engine, profile: SQLiteProfile) -> None:
+    """Run the profile's PRAGMAs on each connection the engine opens"""
+    statements = profile.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def create_sqlite_engine(
+    url: str,
+    profile: Optional[SQLiteProfile] = None,
+    pool_size: int = 10,
+    max_overflow: int = 30,
+    pool_timeout: float = 30.0,
+) -> Engine:
+    """Create a pooled SQLite engine that can be shared by the worker threads
+
+    Connections are handed between threads by the pool, so ``check_same_thread``
+    is disabled; each uvicorn worker process gets its own engine and pool.
+    """
+    engine = create_engine(
+        url,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+    )
+    if profile is not None:
+        apply_sqlite_profile(engine, profile)
+    return engine
+
+
+@contextmanager
+def transaction(bind: Union[Engine, Connection]) -> Iterator[Connection]:
+    """A connection inside a transaction: a new one from an engine, or a connection the caller already manages"""
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.begin() as connection:
+            yield connection
+
+
+def add_missing_columns(bind: Union[Engine, Connection], table: Table) -> List[str]:
+    """Bring an existing table up to its model: add new columns and indexes
+
+    ``create_all`` skips tables that already exist, so columns added to a model
+    later are appended with ``ALTER TABLE ... ADD COLUMN``. Such columns need a
+    constant server default when they are NOT NULL. Returns the added column names.
+    """
+    added = []
+    with transaction(bind) as connection:
+        existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        if not existing:
+            return added
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                added.append(column.name)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    return added
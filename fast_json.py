@@ -0,0 +1,96 @@
+"""JSON encoding and request-body checks for the hot endpoints
+
+orjson is used when it is installed and the standard library otherwise; both
+produce compact UTF-8 documents. Request bodies are checked for their shape
+(objects with lists of strings) without building a model object per element,
+and failures are reported in the same form as FastAPI's own validation errors.
+"""
+import json
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The only characters a JSON string has to escape (non-ASCII is written as UTF-8)
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+
+ListPair = Tuple[List[str], List[str]]
+
+
+def dumps(value: Any, indent: bool = False) -> bytes:
+    """Encode ``value`` as UTF-8 JSON, optionally indented by two spaces"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document; raises ValueError on malformed input"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def is_json_ready(text: str) -> bool:
+    """Whether the UTF-8 bytes of ``text`` are already its JSON string encoding"""
+    return _NEEDS_ESCAPE.search(text) is None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through ``dumps``"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ShapeError(ValueError):
+    """A request body that does not have the documented shape"""
+
+    def __init__(self, loc: Sequence[Any], msg: str, error_type: str):
+        super().__init__(msg)
+        self.loc = tuple(loc)
+        self.msg = msg
+        self.error_type = error_type
+
+    def errors(self) -> List[Dict[str, Any]]:
+        return [{"type": self.error_type, "loc": ("body", *self.loc), "msg": self.msg}]
+
+
+def check_string_list(document: dict, field: str, loc: Tuple[Any, ...]) -> List[str]:
+    """Return ``document[field]`` after checking it is a list of strings"""
+    if field not in document:
+        raise ShapeError((*loc, field), "Field required", "missing")
+    value = document[field]
+    if type(value) is not list:
+        raise ShapeError((*loc, field), "Input should be a valid list", "list_type")
+    # One C-level pass over the element types; the slow loop only runs to report an error
+    if value and set(map(type, value)) != {str}:
+        index = next(index for index, item in enumerate(value) if type(item) is not str)
+        raise ShapeError((*loc, field, index), "Input should be a valid string", "string_type")
+    return value
+
+
+def parse_list_pair(document: Any, loc: Tuple[Any, ...] = ()) -> ListPair:
+    """Check a ``{"list_1": [...], "list_2": [...]}`` object and return both lists"""
+    if type(document) is not dict:
+        raise ShapeError(loc, "Input should be a valid dictionary", "dict_type")
+    return check_string_list(document, "list_1", loc), check_string_list(document, "list_2", loc)
+
+
+def parse_list_pairs(document: Any) -> List[ListPair]:
+    """Check a ``{"payloads": [{"list_1": ..., "list_2": ...}, ...]}`` object"""
+    if type(document) is not dict:
+        raise ShapeError((), "Input should be a valid dictionary", "dict_type")
+    if "payloads" not in document:
+        raise ShapeError(("payloads",), "Field required", "missing")
+    payloads = document["payloads"]
+    if type(payloads) is not list:
+        raise ShapeError(("payloads",), "Input should be a valid list", "list_type")
+    return [parse_list_pair(item, ("payloads", index)) for index, item in enumerate(payloads)]
@@ -0,0 +1,88 @@
+"""Structured, sampled and non-blocking logging for the service
+
+Records are handed to a ``QueueHandler`` and written by a ``QueueListener``
+thread, so log I/O never runs on the event loop or in request workers.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Optional
+
+PREVIEW_CHARS = 32
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_debug_sample_rate = 0.0
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, merging ``extra={"fields": {...}}``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable formatter that appends structured fields as key=value pairs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", debug_sample_rate: float = 0.0) -> None:
+    """Route all records through a queue to a background writer thread"""
+    global _listener, _debug_sample_rate
+    shutdown_logging()
+    _debug_sample_rate = debug_sample_rate
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter() if fmt == "json" else TextFormatter())
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Drain the queue and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def debug_sampled(logger: logging.Logger) -> bool:
+    """Whether to emit a per-key debug record; cheap when debug logging is off"""
+    return _debug_sample_rate > 0 and logger.isEnabledFor(logging.DEBUG) and random.random() < _debug_sample_rate
+
+
+def preview(text: str) -> str:
+    """Shortened form of user text for debug records"""
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "…"
@@ -1,36 +1,183 @@
-from fastapi import FastAPI, HTTPException
-from sqlmodel import SQLModel, Field, create_engine, Session, select
-from typing import List, Optional
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from sqlmodel import SQLModel, Session, select, col
+from sqlalchemy import delete, insert, text as sql_text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine, make_url
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+import anyio
+import atexit
+import itertools
 import uuid
 import logging
-from datetime import datetime
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from admission import AdmissionPolicy, TraceRecorder, create_policy
+from cache_backends import (
+    CacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+    cache_rows,
+)
+import compression
+from config import settings
+from content_store import content_digest, content_hasher, key_hash, request_digest
+from database import SQLiteProfile, create_sqlite_engine
+from fast_json import FastJSONResponse, ShapeError, is_json_ready, parse_list_pair, parse_list_pairs
+import fast_json
+from log_config import configure_logging, debug_sampled, preview, shutdown_logging
+from maintenance import (
+    AccessTracker,
+    MaintenanceWorker,
+    acquire_process_lock,
+    checkpoint,
+    delete_in_batches,
+    incremental_vacuum,
+    text_bytes_sql,
+)
+import metrics
+from memory_cache import LRUCache, ResponseCache
+from migrations import ensure_schema
+from models import CacheEntry, ChunkedPayload, Payload, PayloadBlob, PayloadChunk, PayloadDigest, PayloadRef
+from ndjson_ingest import IngestError, Pair, iter_pair_chunks
+from payload_stream import JSON_PREFIX, JSON_SUFFIX, BlobReader, ChunkReader, output_document
+from shared_cache import SharedHotCache
+from single_flight import SingleFlight
+from warmup import WarmupTask, hot_entries, iter_batches, read_keys, read_snapshot, write_snapshot
+from write_behind import WriteBehindBuffer
+
+if TYPE_CHECKING:
+    from transformer_backends import TransformerClient
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="FastAPI Caching Service", version="1.0.0")
+T = TypeVar("T")
+
+# Routes are registered here and mounted by create_app()
+router = APIRouter()
 
-# Database setup
 DATABASE_URL = "sqlite:///./cache.db"
-engine = create_engine(DATABASE_URL, echo=False)
 
-# Create tables - ensure all models are defined first
-def create_tables():
-    SQLModel.metadata.create_all(engine)
+# Keep IN (...) lookups well under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
 
-# Call after all models are defined
+def iter_chunks(items: Sequence[T], size: int = LOOKUP_CHUNK_SIZE) -> Iterator[Sequence[T]]:
+    """Split a sequence into slices small enough for one IN (...) query"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-# SQLModel tables
-class Payload(SQLModel, table=True):
-    id: Optional[str] = Field(primary_key=True)
-    output: str
-    created_at: str
+# Process-wide resources. Importing this module builds none of them:
+# init_resources() does when the application starts, or when a test or script
+# that calls the functions below directly asks for it.
+engine: Optional[Engine] = None
+
+# In-process L1 tier in front of the shared cache backend
+l1_cache: Optional[LRUCache] = None
+
+# Hot-key tier shared by the worker processes of a host, between L1 and the backend
+shared_cache: Optional[SharedHotCache] = None
+
+# Encoded GET /payload/{id} bodies of hot payloads, keyed by payload id
+response_cache: Optional[ResponseCache] = None
+
+# Content codings offered for payload responses, in preference order
+response_encodings: List[str] = []
+
+# Shared tier between L1 and the transformer
+cache_backend: Optional[CacheBackend] = None
+
+# Decides which transformed strings the cache tiers keep
+admission: Optional[AdmissionPolicy] = None
+
+# Appends looked-up keys to settings.cache_trace_path for offline admission replay
+trace_recorder: Optional[TraceRecorder] = None
+
+# Optional async transformer backend; None calls transformer_function inline
+transformer_client: Optional["TransformerClient"] = None
+
+# Content-addressed storage: payload ids reference one stored copy of each output
+payload_dedup = settings.payload_dedup
 
-class CacheEntry(SQLModel, table=True):
-    id: Optional[int] = Field(primary_key=True)
-    input_text: str = Field(unique=True)
-    transformed_text: str
+# Durability of writes: "immediate" commits before responding, "group" waits for
+# the next group commit, "deferred" responds as soon as rows are queued
+write_durability = settings.write_durability
+write_buffer: Optional[WriteBehindBuffer] = None
+
+# Size-bounded eviction and the hot-row warm-up order entries by access stamps,
+# collected in memory and written back in batches by the maintenance task
+access_tracker: Optional[AccessTracker] = None
+
+# Background eviction, retention and compaction
+maintenance: Optional[MaintenanceWorker] = None
+
+# Several worker processes share one database; only the one holding the
+# maintenance lock evicts, compacts and saves the shutdown snapshot
+maintenance_lock: Optional[int] = None
+owns_maintenance = False
+
+# Background warm-up; requests are served while it runs
+warmup: Optional[WarmupTask] = None
+
+# Coalesces concurrent misses on the same string into one transformer call
+cache_flights = SingleFlight()
+
+def create_cache_backend() -> CacheBackend:
+    """Build the shared cache tier selected by settings.cache_backend"""
+    if settings.cache_backend == "memory":
+        return MemoryCacheBackend(
+            max_entries=settings.cache_max_rows or 1_000_000,
+            max_bytes=settings.cache_max_bytes or 1024 * 1024 * 1024,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.redis_url,
+            key_prefix=settings.redis_key_prefix,
+            ttl_seconds=settings.cache_ttl_seconds,
+            timeout=settings.redis_timeout,
+            chunk_size=LOOKUP_CHUNK_SIZE,
+            max_idle_connections=settings.worker_threads,
+        )
+    # Looks up the module-level engine on every call, so it can be swapped
+    return SQLiteCacheBackend(lambda: engine, LOOKUP_CHUNK_SIZE)
+
+def create_transformer_client() -> Optional["TransformerClient"]:
+    """Build the async transformer client, or None to transform inline"""
+    if settings.transformer_backend == "inline":
+        return None
+    # Imported on demand: backends may pull in their own client libraries
+    from transformer_backends import TransformerClient, load_backend
+    return TransformerClient(
+        load_backend(settings.transformer_backend, **settings.transformer_options),
+        max_concurrency=settings.transformer_max_concurrency,
+        timeout=settings.transformer_timeout,
+        retries=settings.transformer_retries,
+        backoff=settings.transformer_backoff,
+        batch_size=settings.transformer_batch_size,
+    )
+
+# Bounded worker pool for blocking database and transformer work, so the
+# event loop never waits on a query or commit
+_worker_limiter: Optional[anyio.CapacityLimiter] = None
+
+def get_worker_limiter() -> anyio.CapacityLimiter:
+    """Return the shared worker-pool limiter, creating it on first use"""
+    global _worker_limiter
+    if _worker_limiter is None:
+        _worker_limiter = anyio.CapacityLimiter(settings.worker_threads)
+    return _worker_limiter
+
+async def run_blocking(func: Callable[..., T], *args) -> T:
+    """Run a blocking callable in the bounded worker pool"""
+    return await anyio.to_thread.run_sync(func, *args, limiter=get_worker_limiter())
 
 # Pydantic models for API
 class PayloadRequest(SQLModel):
@@ -43,88 +190,1381 @@ class PayloadResponse(SQLModel):
 class PayloadOutput(SQLModel):
     output: str
 
-# Create tables after all models are defined
-create_tables()
+class PayloadBatchResponse(SQLModel):
+    ids: List[str]
+
+class PayloadItem(SQLModel):
+    id: str
+    output: str
+
+class PayloadBatchOutput(SQLModel):
+    payloads: List[PayloadItem]
+    missing: List[str]
+
+def flush_buffered_rows(payload_rows: List[dict], cache_rows: List[dict]) -> None:
+    """Group-commit rows queued by the write-behind buffer in one transaction"""
+    with Session(engine) as session:
+        if payload_rows:
+            session.execute(sqlite_insert(Payload).on_conflict_do_nothing(index_elements=["id"]), payload_rows)
+        if cache_rows:
+            session.execute(
+                sqlite_insert(CacheEntry).on_conflict_do_nothing(index_elements=["input_hash"]), cache_rows
+            )
+        session.commit()
+    logger.info("group commit", extra={"fields": {"payloads": len(payload_rows), "cache_entries": len(cache_rows)}})
+
+def wait_for_durability(flushed) -> None:
+    """Block until buffered rows are committed when running in group mode"""
+    if write_durability == "group":
+        flushed.result()
 
 def transformer_function(text: str) -> str:
     """Simulates external service call for string transformation"""
     return text.upper()
 
+def transform_texts(texts: List[str]) -> List[str]:
+    """Transform cache misses through the configured backend, or inline one by one"""
+    with metrics.TRANSFORMER_SECONDS.time():
+        if transformer_client is None:
+            return [transformer_function(text) for text in texts]
+        return transformer_client.transform_many(texts)
+
+@dataclass
+class ResolveStats:
+    """Per-request counts of where resolved strings came from"""
+    bypassed: int = 0
+    l1_hits: int = 0
+    shared_hits: int = 0
+    buffered_hits: int = 0
+    db_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+def get_cached_results(
+    texts: Iterable[str], stats: Optional[ResolveStats] = None, preload: bool = False
+) -> Dict[str, str]:
+    """Resolve many strings at once: L1 tier, one batched backend lookup, then transform the misses
+    
+    With ``preload`` (the warm-up key list) new strings are cached whatever the
+    admission policy says, and the lookups are not traced.
+    """
+    # Deduplicate while preserving first-seen order
+    pending = list(dict.fromkeys(texts))
+    results: Dict[str, str] = {}
+    if trace_recorder is not None and not preload:
+        trace_recorder.record(pending)
+
+    # Inputs cheaper to transform than to look up skip every tier
+    bypassed = 0
+    if admission.bypass_max_chars:
+        cheap = [text for text in pending if admission.bypass(text)]
+        if cheap:
+            results.update(zip(cheap, transform_texts(cheap)))
+            pending = [text for text in pending if text not in results]
+            bypassed = len(cheap)
+            metrics.CACHE_LOOKUPS.inc("bypass", "hit", amount=bypassed)
+
+    # Check the in-process tier first to skip the database round-trip
+    remaining = []
+    # Keys found in a cache tier; only these count as accesses for eviction
+    served = []
+    for text in pending:
+        cached_text = l1_cache.get(text)
+        if cached_text is not None:
+            if debug_sampled(logger):
+                logger.debug("l1 cache hit: %s", preview(text))
+            results[text] = cached_text
+            served.append(text)
+        else:
+            remaining.append(text)
+    l1_hits = len(served)
+    metrics.CACHE_LOOKUPS.inc("l1", "hit", amount=l1_hits)
+    metrics.CACHE_LOOKUPS.inc("l1", "miss", amount=len(remaining))
+    
+    # Entries other worker processes resolved
+    shared_hits = 0
+    if remaining and shared_cache is not None:
+        found = shared_cache.get_many(remaining)
+        for input_text, transformed_text in found.items():
+            l1_cache.set(input_text, transformed_text)
+            results[input_text] = transformed_text
+        served.extend(found)
+        shared_hits = len(found)
+        if found:
+            remaining = [text for text in remaining if text not in found]
+        metrics.CACHE_LOOKUPS.inc("shared", "hit", amount=shared_hits)
+        metrics.CACHE_LOOKUPS.inc("shared", "miss", amount=len(remaining))
+
+    # Rows queued for a group commit are not in the table yet
+    if remaining and write_buffer is not None and cache_backend.uses_database:
+        for text in remaining:
+            pending_text = write_buffer.pending_cache_entry(text)
+            if pending_text is not None:
+                results[text] = pending_text
+                served.append(text)
+        remaining = [text for text in remaining if text not in results]
+    buffered_hits = len(results) - bypassed - l1_hits - shared_hits
+    metrics.CACHE_LOOKUPS.inc("buffer", "hit", amount=buffered_hits)
+
+    if remaining:
+        with metrics.DB_QUERY_SECONDS.time("cache_lookup"):
+            found = cache_backend.get_many(remaining)
+        for input_text, transformed_text in found.items():
+            if debug_sampled(logger):
+                logger.debug("%s cache hit: %s", cache_backend.name, preview(input_text))
+            l1_cache.set(input_text, transformed_text)
+            results[input_text] = transformed_text
+        served.extend(found)
+        if shared_cache is not None and found:
+            shared_cache.set_many(found)
+    if access_tracker is not None and served:
+        access_tracker.touch(served)
+
+    # Transform the misses; concurrent callers missing the same strings share one computation
+    misses = [text for text in remaining if text not in results]
+    metrics.CACHE_LOOKUPS.inc("db", "hit", amount=len(remaining) - len(misses))
+    metrics.CACHE_LOOKUPS.inc("db", "miss", amount=len(misses))
+    coalesced = 0
+    if misses:
+        owned, waiting = cache_flights.claim(misses)
+        coalesced = len(waiting)
+        metrics.CACHE_COALESCED.inc(amount=coalesced)
+        if owned:
+            try:
+                computed = transform_and_store(owned, admit_all=preload)
+            except BaseException as error:
+                cache_flights.fail(owned, error)
+                raise
+            cache_flights.complete(computed)
+            results.update(computed)
+        for text, future in waiting.items():
+            results[text] = future.result()
+    if not preload:
+        admission.record_lookups(len(pending) - len(misses), len(misses), bypassed)
+
+    if stats is not None:
+        stats.bypassed += bypassed
+        stats.l1_hits += l1_hits
+        stats.shared_hits += shared_hits
+        stats.buffered_hits += buffered_hits
+        stats.db_hits += len(remaining) - len(misses)
+        stats.misses += len(misses)
+        stats.coalesced += coalesced
+    return results
+
+def transform_and_store(texts: List[str], admit_all: bool = False) -> Dict[str, str]:
+    """Transform strings this caller owns and upsert them in a single transaction"""
+    results: Dict[str, str] = {}
+    misses = []
+    for text in texts:
+        # A previous flight may have finished between our lookup and our claim;
+        # peek, as get_cached_results already counted this lookup as a miss
+        cached_text = l1_cache.peek(text)
+        if cached_text is not None:
+            results[text] = cached_text
+            continue
+        if debug_sampled(logger):
+            logger.debug("cache miss: %s", preview(text))
+        misses.append(text)
+
+    computed = dict(zip(misses, transform_texts(misses)))
+    results.update(computed)
+    
+    # Strings the admission policy turns away are returned but kept in no tier
+    if admit_all:
+        admitted = computed
+    else:
+        admitted, decisions = admission.admit_many(computed)
+        for decision, count in decisions.items():
+            metrics.CACHE_ADMISSIONS.inc(admission.name, decision, amount=count)
+
+    if admitted and write_buffer is not None and cache_backend.uses_database:
+        for text, result in admitted.items():
+            l1_cache.set(text, result)
+        wait_for_durability(write_buffer.add_cache_entries(cache_rows(admitted)))
+    elif admitted:
+        with metrics.DB_QUERY_SECONDS.time("cache_insert"):
+            cache_backend.set_many(admitted)
+        for text, result in admitted.items():
+            l1_cache.set(text, result)
+
+    if shared_cache is not None and admitted:
+        shared_cache.set_many(admitted)
+    metrics.CACHE_INSERTS.inc(amount=len(admitted))
+    return results
+
 def get_cached_result(text: str) -> str:
     """Get cached transformation result or compute and cache it"""
+    return get_cached_results([text])[text]
+
+def interleave_outputs(list_1: List[str], list_2: List[str], stats: Optional[ResolveStats] = None) -> str:
+    """Resolve every string through the cache and join the interleaved results"""
+    # Resolve every distinct string in one batch, then transform and interleave
+    resolved = get_cached_results(list_1 + list_2, stats)
+    return join_interleaved(list_1, list_2, resolved)
+
+def join_interleaved(list_1: List[str], list_2: List[str], resolved: Dict[str, str]) -> str:
+    """Interleave already resolved strings of a list pair into the payload output"""
+    transformed_list_1 = [resolved[text] for text in list_1]
+    transformed_list_2 = [resolved[text] for text in list_2]
+    
+    # Interleave the transformed strings
+    interleaved = []
+    for i in range(len(transformed_list_1)):
+        interleaved.extend([transformed_list_1[i], transformed_list_2[i]])
+    
+    return ", ".join(interleaved)
+
+def output_columns(output: str) -> Dict[str, object]:
+    """Columns derived from an output when it is written: its JSON flag and, with
+    settings.payload_store_encoding, the response document compressed once"""
+    json_ready = is_json_ready(output)
+    columns = {"json_ready": json_ready, "compressed": None, "compressed_encoding": None}
+    encoding = settings.payload_store_encoding
+    if encoding in compression.CODECS:
+        encoded = output.encode("utf-8")
+        if len(encoded) >= settings.compression_min_bytes:
+            document = output_document(encoded, json_ready)
+            columns["compressed"] = compression.compress(document, encoding, settings.compression_levels)
+            columns["compressed_encoding"] = encoding
+    return columns
+
+def build_payload(payload_id: str, list_1: List[str], list_2: List[str]) -> None:
+    """Resolve, interleave and store a payload (blocking; runs in the worker pool)"""
+    if payload_dedup:
+        build_deduplicated_payload(payload_id, list_1, list_2)
+        return
+    
+    stats = ResolveStats()
+    output = interleave_outputs(list_1, list_2, stats)
+    metrics.PAYLOAD_CHARACTERS.observe(len(output))
+    created_at = datetime.now().isoformat()
+    if write_buffer is not None:
+        wait_for_durability(write_buffer.add_payload({
+            "id": payload_id,
+            "output": output,
+            "created_at": created_at,
+            "etag": content_digest(output),
+            **output_columns(output),
+        }))
+    else:
+        # Store payload in database
+        with metrics.DB_QUERY_SECONDS.time("payload_insert"), Session(engine) as session:
+            payload = Payload(
+                id=payload_id,
+                output=output,
+                created_at=created_at,
+                etag=content_digest(output),
+                **output_columns(output)
+            )
+            session.add(payload)
+            session.commit()
+    
+    storage = "buffered" if write_buffer is not None else "table"
+    log_payload_created(payload_id, len(list_1), stats, len(output), storage)
+
+def log_payload_created(payload_id: str, pairs: int, stats: Optional[ResolveStats], output_chars: int, storage: str) -> None:
+    """Emit the single summary record for a created payload"""
+    fields = {"payload_id": payload_id, "pairs": pairs, "output_chars": output_chars, "storage": storage}
+    if stats is not None:
+        fields.update(asdict(stats))
+    logger.info("payload created", extra={"fields": fields})
+
+def build_deduplicated_payload(payload_id: str, list_1: List[str], list_2: List[str]) -> None:
+    """Store a payload as a reference to a content-addressed output blob"""
+    request_hash = request_digest(list_1, list_2)
     with Session(engine) as session:
-        # Check if cached
-        statement = select(CacheEntry).where(CacheEntry.input_text == text)
-        cached = session.exec(statement).first()
-        
-        if cached:
-            logger.info(f"🎯 CACHE HIT: '{text}' -> '{cached.transformed_text}'")
-            return cached.transformed_text
-        
-        # Transform and cache
-        logger.info(f"🔄 CACHE MISS: Transforming '{text}'")
-        result = transformer_function(text)
-        cache_entry = CacheEntry(input_text=text, transformed_text=result)
-        session.add(cache_entry)
+        known = session.get(PayloadDigest, request_hash)
+        content_hash = known.content_hash if known is not None else None
+    
+    ref_row = {"id": payload_id, "content_hash": content_hash, "created_at": datetime.now().isoformat()}
+    if content_hash is not None:
+        with Session(engine) as session:
+            evicted = insert_payload_refs(session, [ref_row])
+            session.commit()
+        if not evicted:
+            log_payload_created(payload_id, len(list_1), None, 0, "dedup_hit")
+            return
+    
+    # First sighting of this list pair (or its blob was evicted): interleave once and store the blob
+    stats = ResolveStats()
+    output = interleave_outputs(list_1, list_2, stats)
+    metrics.PAYLOAD_CHARACTERS.observe(len(output))
+    ref_row["content_hash"] = content_digest(output)
+    with Session(engine) as session:
+        session.execute(
+            sqlite_insert(PayloadBlob).on_conflict_do_nothing(index_elements=["content_hash"]),
+            [{"content_hash": ref_row["content_hash"], "output": output, **output_columns(output)}],
+        )
+        session.execute(
+            sqlite_insert(PayloadDigest).on_conflict_do_nothing(index_elements=["request_hash"]),
+            [{"request_hash": request_hash, "content_hash": ref_row["content_hash"]}],
+        )
+        session.execute(insert(PayloadRef), [ref_row])
         session.commit()
-        logger.info(f"💾 CACHED: '{text}' -> '{result}'")
+    
+    log_payload_created(payload_id, len(list_1), stats, len(output), "new_blob")
+
+def insert_payload_refs(session: Session, rows: List[dict]) -> List[dict]:
+    """Insert references to known blobs; returns the rows whose blob was evicted meanwhile
+    
+    The existence check and the insert are one statement, so a concurrent
+    maintenance pass cannot remove the blob in between.
+    """
+    statement = sql_text(
+        f"INSERT INTO {PayloadRef.__tablename__} (id, content_hash, created_at) "
+        f"SELECT :id, :content_hash, :created_at WHERE EXISTS "
+        f"(SELECT 1 FROM {PayloadBlob.__tablename__} WHERE content_hash = :content_hash)"
+    )
+    return [row for row in rows if session.execute(statement, row).rowcount == 0]
+
+def resolve_many(pairs: Sequence[Tuple[List[str], List[str]]], stats: ResolveStats) -> Dict[str, str]:
+    """Resolve the union of the strings of many list pairs in one cache pass"""
+    return get_cached_results(
+        itertools.chain.from_iterable(itertools.chain(list_1, list_2) for list_1, list_2 in pairs), stats
+    )
+
+def build_payload_batch(payload_ids: List[str], pairs: List[Tuple[List[str], List[str]]]) -> None:
+    """Resolve and store many payloads at once (blocking; runs in the worker pool)"""
+    if payload_dedup:
+        build_deduplicated_batch(payload_ids, pairs)
+        return
+    
+    stats = ResolveStats()
+    resolved = resolve_many(pairs, stats)
+    created_at = datetime.now().isoformat()
+    rows = []
+    for payload_id, (list_1, list_2) in zip(payload_ids, pairs):
+        output = join_interleaved(list_1, list_2, resolved)
+        metrics.PAYLOAD_CHARACTERS.observe(len(output))
+        rows.append({
+            "id": payload_id,
+            "output": output,
+            "created_at": created_at,
+            "etag": content_digest(output),
+            **output_columns(output),
+        })
+    
+    if rows and write_buffer is not None:
+        wait_for_durability(write_buffer.add_payloads(rows))
+    elif rows:
+        # All payload rows go into one transaction
+        with metrics.DB_QUERY_SECONDS.time("payload_insert"), Session(engine) as session:
+            session.execute(insert(Payload), rows)
+            session.commit()
+    
+    storage = "buffered" if write_buffer is not None else "table"
+    log_payload_batch_created(pairs, stats, sum(len(row["output"]) for row in rows), storage)
+
+def build_deduplicated_batch(payload_ids: List[str], pairs: List[Tuple[List[str], List[str]]]) -> None:
+    """Store many payloads as references, resolving only list pairs not seen before"""
+    request_hashes = [request_digest(list_1, list_2) for list_1, list_2 in pairs]
+    content_hashes: Dict[str, str] = {}
+    with Session(engine) as session:
+        for chunk in iter_chunks(list(set(request_hashes))):
+            statement = select(PayloadDigest.request_hash, PayloadDigest.content_hash).where(
+                col(PayloadDigest.request_hash).in_(chunk)
+            )
+            for request_hash, content_hash in session.exec(statement):
+                content_hashes[request_hash] = content_hash
+    
+    # Repeats within the batch are resolved once as well
+    new_pairs = {
+        request_hash: pair for request_hash, pair in zip(request_hashes, pairs) if request_hash not in content_hashes
+    }
+    stats = None
+    output_chars = 0
+    blob_rows = []
+    digest_rows = []
+    if new_pairs:
+        stats = ResolveStats()
+        resolved = resolve_many(list(new_pairs.values()), stats)
+        for request_hash, (list_1, list_2) in new_pairs.items():
+            output = join_interleaved(list_1, list_2, resolved)
+            output_chars += len(output)
+            metrics.PAYLOAD_CHARACTERS.observe(len(output))
+            content_hash = content_digest(output)
+            content_hashes[request_hash] = content_hash
+            blob_rows.append({"content_hash": content_hash, "output": output, **output_columns(output)})
+            digest_rows.append({"request_hash": request_hash, "content_hash": content_hash})
+    
+    created_at = datetime.now().isoformat()
+    new_refs = []
+    known_refs = []
+    for payload_id, request_hash in zip(payload_ids, request_hashes):
+        row = {"id": payload_id, "content_hash": content_hashes[request_hash], "created_at": created_at}
+        (new_refs if request_hash in new_pairs else known_refs).append(row)
+    with Session(engine) as session:
+        if blob_rows:
+            session.execute(
+                sqlite_insert(PayloadBlob).on_conflict_do_nothing(index_elements=["content_hash"]), blob_rows
+            )
+            session.execute(
+                sqlite_insert(PayloadDigest).on_conflict_do_nothing(index_elements=["request_hash"]), digest_rows
+            )
+        if new_refs:
+            session.execute(insert(PayloadRef), new_refs)
+        evicted = insert_payload_refs(session, known_refs)
+        session.commit()
+    
+    log_payload_batch_created(pairs, stats, output_chars, f"dedup:{len(blob_rows)}_new_blobs")
+    if evicted:
+        # Their digests went with the blobs, so these are now resolved from scratch
+        evicted_ids = {row["id"] for row in evicted}
+        retry = [(payload_id, pair) for payload_id, pair in zip(payload_ids, pairs) if payload_id in evicted_ids]
+        build_deduplicated_batch([payload_id for payload_id, _ in retry], [pair for _, pair in retry])
+
+def log_payload_batch_created(pairs: List[Tuple[List[str], List[str]]], stats: Optional[ResolveStats], output_chars: int, storage: str) -> None:
+    """Emit the single summary record for a batch of created payloads"""
+    fields = {
+        "payloads": len(pairs),
+        "pairs": sum(len(list_1) for list_1, _ in pairs),
+        "output_chars": output_chars,
+        "storage": storage,
+    }
+    if stats is not None:
+        fields.update(asdict(stats))
+    logger.info("payload batch created", extra={"fields": fields})
+
+def load_payload_output(payload_id: str) -> Optional[str]:
+    """Fetch a stored payload output (blocking; runs in the worker pool)"""
+    # Payloads still waiting for a group commit are served from memory
+    if write_buffer is not None:
+        pending = write_buffer.pending_payload(payload_id)
+        if pending is not None:
+            return pending["output"]
+    
+    plain = select(Payload.output).where(Payload.id == payload_id)
+    referenced = (
+        select(PayloadBlob.output)
+        .join(PayloadRef, col(PayloadRef.content_hash) == col(PayloadBlob.content_hash))
+        .where(PayloadRef.id == payload_id)
+    )
+    # Look where new payloads are written first; the other layout may hold older rows
+    statements = (referenced, plain) if payload_dedup else (plain, referenced)
+    with metrics.DB_QUERY_SECONDS.time("payload_select"), Session(engine) as session:
+        for statement in statements:
+            output = session.exec(statement).first()
+            if output is not None:
+                return output
         
-        return result
+        if session.get(ChunkedPayload, payload_id) is not None:
+            chunks = select(PayloadChunk.output).where(PayloadChunk.payload_id == payload_id).order_by(PayloadChunk.seq)
+            return "".join(session.exec(chunks))
+    return None
 
-@app.post("/payload", response_model=PayloadResponse)
-async def create_payload(request: PayloadRequest):
+def load_payload_outputs(payload_ids: List[str]) -> Dict[str, str]:
+    """Fetch many stored payload outputs with chunked IN (...) queries (blocking)"""
+    results: Dict[str, str] = {}
+    if write_buffer is not None:
+        for payload_id in payload_ids:
+            pending = write_buffer.pending_payload(payload_id)
+            if pending is not None:
+                results[payload_id] = pending["output"]
+    remaining = [payload_id for payload_id in payload_ids if payload_id not in results]
+    
+    def plain(chunk):
+        return select(Payload.id, Payload.output).where(col(Payload.id).in_(chunk))
+    
+    def referenced(chunk):
+        return (
+            select(PayloadRef.id, PayloadBlob.output)
+            .join(PayloadBlob, col(PayloadRef.content_hash) == col(PayloadBlob.content_hash))
+            .where(col(PayloadRef.id).in_(chunk))
+        )
+    
+    queries = (referenced, plain) if payload_dedup else (plain, referenced)
+    with metrics.DB_QUERY_SECONDS.time("payload_select"), Session(engine) as session:
+        for query in queries:
+            if not remaining:
+                break
+            for chunk in iter_chunks(remaining):
+                for payload_id, output in session.exec(query(chunk)):
+                    results[payload_id] = output
+            remaining = [payload_id for payload_id in remaining if payload_id not in results]
+        
+        # Streamed payloads are reassembled from their chunk rows
+        for chunk in iter_chunks(remaining):
+            published = session.exec(select(ChunkedPayload.id).where(col(ChunkedPayload.id).in_(chunk))).all()
+            if not published:
+                continue
+            statement = (
+                select(PayloadChunk.payload_id, PayloadChunk.output)
+                .where(col(PayloadChunk.payload_id).in_(published))
+                .order_by(PayloadChunk.payload_id, PayloadChunk.seq)
+            )
+            for payload_id, parts in itertools.groupby(session.exec(statement), key=lambda row: row[0]):
+                results[payload_id] = "".join(part for _, part in parts)
+    return results
+
+def load_payload_etag(payload_id: str) -> Optional[str]:
+    """Fetch a stored payload's ETag without reading its output (blocking)
+    
+    None when the payload is unknown or was stored before ETags existed.
+    """
+    if write_buffer is not None:
+        pending = write_buffer.pending_payload(payload_id)
+        if pending is not None:
+            return pending["etag"]
+    
+    # Answered from the (id, etag) covering index and the small reference and header
+    # rows; without statistics SQLite would pick the primary key index and read the row
+    plain = f"SELECT etag FROM {Payload.__tablename__} INDEXED BY ix_payload_id_etag WHERE id = :id"
+    referenced = f"SELECT content_hash FROM {PayloadRef.__tablename__} WHERE id = :id"
+    chunked = f"SELECT etag FROM {ChunkedPayload.__tablename__} WHERE id = :id"
+    statements = (referenced, plain, chunked) if payload_dedup else (plain, referenced, chunked)
+    with metrics.DB_QUERY_SECONDS.time("payload_etag"), engine.connect() as connection:
+        for statement in statements:
+            row = connection.execute(sql_text(statement), {"id": payload_id}).first()
+            if row is not None:
+                return row[0]
+    return None
+
+def load_compressed_document(payload_id: str, encoding: str) -> Optional[Tuple[Optional[str], bytes]]:
+    """Fetch the ETag and response document a payload was stored with in ``encoding``, if any (blocking)"""
+    if write_buffer is not None:
+        pending = write_buffer.pending_payload(payload_id)
+        if pending is not None:
+            return (pending["etag"], pending["compressed"]) if pending["compressed_encoding"] == encoding else None
+    
+    plain = (
+        f"SELECT etag, compressed FROM {Payload.__tablename__} "
+        f"WHERE id = :id AND compressed_encoding = :encoding"
+    )
+    referenced = (
+        f"SELECT b.content_hash, b.compressed FROM {PayloadBlob.__tablename__} AS b "
+        f"JOIN {PayloadRef.__tablename__} AS r ON r.content_hash = b.content_hash "
+        f"WHERE r.id = :id AND b.compressed_encoding = :encoding"
+    )
+    statements = (referenced, plain) if payload_dedup else (plain, referenced)
+    with metrics.DB_QUERY_SECONDS.time("payload_select"), engine.connect() as connection:
+        for statement in statements:
+            row = connection.execute(sql_text(statement), {"id": payload_id, "encoding": encoding}).first()
+            if row is not None:
+                return row[0], row[1]
+    return None
+
+def load_payload_document(payload_id: str) -> Optional[Tuple[Optional[str], bytes]]:
+    """Fetch a stored payload as its ETag and encoded PayloadOutput document (blocking)"""
+    output = load_payload_output(payload_id)
+    if output is None:
+        return None
+    return load_payload_etag(payload_id), fast_json.dumps({"output": output})
+
+def open_payload_reader(payload_id: str) -> Optional[Tuple[Union[BlobReader, ChunkReader], Optional[str]]]:
+    """Locate a stored payload and open its output for chunked reads (blocking); returns the reader and ETag"""
+    plain = (Payload.__tablename__, f"SELECT rowid, json_ready, etag FROM {Payload.__tablename__} WHERE id = ?")
+    referenced = (
+        PayloadBlob.__tablename__,
+        f"SELECT b.rowid, b.json_ready, b.content_hash FROM {PayloadBlob.__tablename__} AS b "
+        f"JOIN {PayloadRef.__tablename__} AS r ON r.content_hash = b.content_hash WHERE r.id = ?",
+    )
+    locations = (referenced, plain) if payload_dedup else (plain, referenced)
+    
+    with metrics.DB_QUERY_SECONDS.time("payload_open"):
+        raw_connection = engine.raw_connection()
+        try:
+            cursor = raw_connection.cursor()
+            try:
+                for table, query in locations:
+                    row = cursor.execute(query, (payload_id,)).fetchone()
+                    if row is not None:
+                        reader = BlobReader(
+                            raw_connection, table, "output", row[0], settings.stream_chunk_bytes, bool(row[1])
+                        )
+                        return reader, row[2]
+            
+                header = cursor.execute(
+                    f"SELECT chunk_count, total_bytes, etag FROM {ChunkedPayload.__tablename__} WHERE id = ?",
+                    (payload_id,),
+                ).fetchone()
+                if header is not None:
+                    return ChunkReader(raw_connection, PayloadChunk.__tablename__, payload_id, *header[:2]), header[2]
+            finally:
+                cursor.close()
+        except BaseException:
+            raw_connection.close()
+            raise
+        raw_connection.close()
+        return None
+
+async def stream_payload_json(reader: Union[BlobReader, ChunkReader]):
+    """Yield a PayloadOutput JSON document chunk by chunk straight from storage"""
+    try:
+        yield JSON_PREFIX
+        while (chunk := await run_blocking(reader.read_json_chunk)) is not None:
+            yield chunk
+        yield JSON_SUFFIX
+    finally:
+        await run_blocking(reader.close)
+
+def json_body(schema: dict) -> dict:
+    """OpenAPI extra documenting the body of an endpoint that decodes and checks it itself"""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+async def read_json_body(request: Request, parse: Callable[[object], T]) -> T:
+    """Decode a request body and check its shape, failing like FastAPI's own validation
+    
+    Bodies are large lists of strings: checking element types in one pass is far
+    cheaper than building a model object per element.
+    """
+    body = await request.body()
+    try:
+        return parse(fast_json.loads(body))
+    except ShapeError as error:
+        raise RequestValidationError(error.errors(), body=body) from None
+    except ValueError as error:
+        errors = [{"type": "json_invalid", "loc": ("body", 0), "msg": "JSON decode error", "ctx": {"error": str(error)}}]
+        raise RequestValidationError(errors, body=body) from None
+
+PAYLOAD_BATCH_SCHEMA = {
+    "type": "object",
+    "required": ["payloads"],
+    "properties": {"payloads": {"type": "array", "items": PayloadRequest.model_json_schema()}},
+}
+
+@router.post("/payload", response_model=PayloadResponse, openapi_extra=json_body(PayloadRequest.model_json_schema()))
+async def create_payload(request: Request):
     """Create a new payload by interleaving transformed strings"""
-    if len(request.list_1) != len(request.list_2):
+    list_1, list_2 = await read_json_body(request, parse_list_pair)
+    if len(list_1) != len(list_2):
         raise HTTPException(status_code=400, detail="Lists must have the same length")
     
     # Generate payload ID
     payload_id = str(uuid.uuid4())
     
-    # Transform and interleave strings
-    transformed_list_1 = [get_cached_result(text) for text in request.list_1]
-    transformed_list_2 = [get_cached_result(text) for text in request.list_2]
+    await run_blocking(build_payload, payload_id, list_1, list_2)
     
-    # Interleave the transformed strings
-    interleaved = []
-    for i in range(len(transformed_list_1)):
-        interleaved.extend([transformed_list_1[i], transformed_list_2[i]])
+    return FastJSONResponse({"id": payload_id})
+
+@router.post("/payloads:batch", response_model=PayloadBatchResponse, openapi_extra=json_body(PAYLOAD_BATCH_SCHEMA))
+async def create_payload_batch(request: Request):
+    """Create many payloads with one cache pass and one transaction"""
+    pairs = await read_json_body(request, parse_list_pairs)
+    if len(pairs) > settings.batch_max_payloads:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_payloads} payloads per batch")
+    for index, (list_1, list_2) in enumerate(pairs):
+        if len(list_1) != len(list_2):
+            raise HTTPException(status_code=400, detail=f"Lists of payload {index} must have the same length")
+    
+    payload_ids = [str(uuid.uuid4()) for _ in pairs]
+    await run_blocking(build_payload_batch, payload_ids, pairs)
+    
+    return FastJSONResponse({"ids": payload_ids})
+
+@router.get("/payloads", response_model=PayloadBatchOutput)
+async def get_payloads(ids: List[str] = Query(default=[], description="Payload ids, repeated or comma-separated")):
+    """Retrieve many payloads by id; unknown ids are listed as missing"""
+    payload_ids = list(dict.fromkeys(payload_id for value in ids for payload_id in value.split(",") if payload_id))
+    if not payload_ids:
+        raise HTTPException(status_code=400, detail="At least one payload id is required")
+    if len(payload_ids) > settings.batch_max_payloads:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_payloads} ids per request")
     
-    output = ", ".join(interleaved)
+    outputs = await run_blocking(load_payload_outputs, payload_ids)
+    logger.info("payload batch read", extra={"fields": {"requested": len(payload_ids), "found": len(outputs)}})
+    return FastJSONResponse({
+        "payloads": [{"id": payload_id, "output": outputs[payload_id]} for payload_id in payload_ids if payload_id in outputs],
+        "missing": [payload_id for payload_id in payload_ids if payload_id not in outputs],
+    })
+
+def store_payload_chunk(payload_id: str, seq: int, pairs: List[Pair], stats: ResolveStats, hasher) -> int:
+    """Resolve one chunk of streamed pairs and store its output (blocking); returns its size in bytes
     
-    # Store payload in database
-    logger.info(f"💾 DB INSERT: Storing payload '{payload_id}'")
+    ``hasher`` is fed the chunk's bytes, building the payload's ETag as chunks arrive.
+    """
+    output = interleave_outputs([pair[0] for pair in pairs], [pair[1] for pair in pairs], stats)
+    if seq > 0:
+        output = ", " + output
     with Session(engine) as session:
-        payload = Payload(
+        session.add(PayloadChunk(payload_id=payload_id, seq=seq, output=output, created_at=datetime.now().isoformat()))
+        session.commit()
+    encoded = output.encode("utf-8")
+    hasher.update(encoded)
+    return len(encoded)
+
+def finish_chunked_payload(payload_id: str, chunk_count: int, total_bytes: int, etag: str) -> None:
+    """Publish a streamed payload once all of its chunks are stored (blocking)"""
+    with Session(engine) as session:
+        session.add(ChunkedPayload(
             id=payload_id,
-            output=output,
-            created_at=datetime.now().isoformat()
-        )
-        session.add(payload)
+            chunk_count=chunk_count,
+            total_bytes=total_bytes,
+            created_at=datetime.now().isoformat(),
+            etag=etag
+        ))
         session.commit()
-        logger.info(f"✅ DB INSERT: Successfully stored payload '{payload_id}'")
-    
-    return PayloadResponse(id=payload_id)
 
-@app.get("/payload/{payload_id}", response_model=PayloadOutput)
-async def get_payload(payload_id: str):
-    """Retrieve a payload by its ID"""
-    logger.info(f"📖 DB RETRIEVAL: Looking up payload '{payload_id}'")
+def discard_chunked_payload(payload_id: str) -> None:
+    """Remove the chunks of a streamed payload that failed part-way (blocking)"""
     with Session(engine) as session:
-        statement = select(Payload).where(Payload.id == payload_id)
-        payload = session.exec(statement).first()
-        
-        if not payload:
-            logger.warning(f"❌ DB RETRIEVAL: Payload '{payload_id}' not found")
-            raise HTTPException(status_code=404, detail="Payload not found")
-        
-        logger.info(f"✅ DB RETRIEVAL: Found payload '{payload_id}'")
-        return PayloadOutput(output=payload.output)
+        session.execute(delete(PayloadChunk).where(PayloadChunk.payload_id == payload_id))
+        session.commit()
 
-@app.get("/")
+@router.post("/payload/stream", response_model=PayloadResponse)
+async def create_payload_stream(request: Request):
+    """Create a payload from an NDJSON body of ``["list_1 item", "list_2 item"]`` lines
+    
+    Pairs are parsed, resolved and stored in pipelined chunks, so memory use does
+    not depend on the length of the lists.
+    """
+    payload_id = str(uuid.uuid4())
+    stats = ResolveStats()
+    pair_count = 0
+    # A one-slot channel lets the next chunk be parsed while the previous one is stored
+    send_chunks, receive_chunks = anyio.create_memory_object_stream(1)
+    chunk_count = 0
+    total_bytes = 0
+    hasher = content_hasher()
+    
+    async def parse_body():
+        async with send_chunks:
+            async for pairs in iter_pair_chunks(request.stream(), settings.ingest_chunk_pairs):
+                await send_chunks.send(pairs)
+    
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(parse_body)
+            async with receive_chunks:
+                async for pairs in receive_chunks:
+                    total_bytes += await run_blocking(
+                        store_payload_chunk, payload_id, chunk_count, pairs, stats, hasher
+                    )
+                    chunk_count += 1
+                    pair_count += len(pairs)
+        await run_blocking(finish_chunked_payload, payload_id, chunk_count, total_bytes, hasher.hexdigest())
+    except BaseException as error:
+        # Clean up even when the request was cancelled by a client disconnect
+        with anyio.CancelScope(shield=True):
+            await run_blocking(discard_chunked_payload, payload_id)
+        if isinstance(error, IngestError):
+            logger.warning("stream rejected", extra={"fields": {"payload_id": payload_id, "error": str(error)}})
+            raise HTTPException(status_code=400, detail=str(error)) from None
+        raise
+    
+    log_payload_created(payload_id, pair_count, stats, total_bytes, f"chunked:{chunk_count}")
+    return FastJSONResponse({"id": payload_id})
+
+def payload_headers(etag: Optional[str], encoding: Optional[str] = None) -> Dict[str, str]:
+    """Caching and content-coding headers of a stored payload: it never changes once written
+    
+    Each content coding is a representation of its own, so it gets its own ETag.
+    """
+    headers = {"Cache-Control": f"public, max-age={settings.payload_max_age_seconds}, immutable"}
+    if etag is not None:
+        headers["ETag"] = f'"{etag}-{encoding}"' if encoding is not None else f'"{etag}"'
+    if response_encodings:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+def matching_etag(if_none_match: str, etag: str) -> Optional[str]:
+    """The entity tag in If-None-Match naming ``etag`` in any content coding (weak comparison, as conditional GETs use)"""
+    if if_none_match.strip() == "*":
+        return f'"{etag}"'
+    for candidate in if_none_match.split(","):
+        tag = candidate.strip().removeprefix("W/")
+        if tag == f'"{etag}"' or (tag.startswith(f'"{etag}-') and tag.endswith('"')):
+            return tag
+    return None
+
+@router.get("/payload/{payload_id}", response_model=PayloadOutput)
+async def get_payload(payload_id: str, request: Request):
+    """Retrieve a payload by its ID
+    
+    A request whose If-None-Match names the stored ETag is answered with 304
+    without reading the output; hot bodies are served from the response cache.
+    Larger bodies are compressed in the encoding negotiated from Accept-Encoding.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    encoding = compression.negotiate(request.headers.get("accept-encoding"), response_encodings)
+    cache_key = payload_id if encoding is None else f"{payload_id}:{encoding}"
+    cached = response_cache.get(cache_key) if response_cache is not None else None
+    if cached is not None:
+        etag, applied, body = cached
+        tag = matching_etag(if_none_match, etag) if if_none_match is not None and etag is not None else None
+        if tag is not None:
+            return not_modified(payload_id, tag, "response_cache")
+        log_payload_read(payload_id, len(body), streamed=False, source="response_cache")
+        return Response(body, media_type="application/json", headers=payload_headers(etag, applied))
+    
+    if if_none_match is not None:
+        etag = await run_blocking(load_payload_etag, payload_id)
+        tag = matching_etag(if_none_match, etag) if etag is not None else None
+        if tag is not None:
+            return not_modified(payload_id, tag, "database")
+    
+    if encoding is not None and encoding == settings.payload_store_encoding:
+        stored = await run_blocking(load_compressed_document, payload_id, encoding)
+        if stored is not None:
+            etag, body = stored
+            log_payload_read(payload_id, len(body), streamed=False, source="stored_compressed")
+            if response_cache is not None:
+                response_cache.set(cache_key, (etag, encoding, body))
+            return Response(body, media_type="application/json", headers=payload_headers(etag, encoding))
+    
+    pending = write_buffer is not None and write_buffer.pending_payload(payload_id) is not None
+    if settings.stream_payloads and not pending:
+        return await stream_payload(payload_id, encoding, cache_key)
+    loaded = await run_blocking(load_payload_document, payload_id)
+    
+    log_payload_read(payload_id, len(loaded[1]) if loaded is not None else None, streamed=False)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Payload not found")
+    
+    etag, document = loaded
+    return await document_response(cache_key, etag, document, encoding)
+
+async def document_response(cache_key: str, etag: Optional[str], document: bytes, encoding: Optional[str]) -> Response:
+    """Compress a whole document if it is large enough, keep it in the response cache and respond"""
+    applied = None
+    if encoding is not None and len(document) >= settings.compression_min_bytes:
+        document = await run_blocking(compression.compress, document, encoding, settings.compression_levels)
+        applied = encoding
+    if response_cache is not None:
+        response_cache.set(cache_key, (etag, applied, document))
+    return Response(document, media_type="application/json", headers=payload_headers(etag, applied))
+
+def not_modified(payload_id: str, tag: str, source: str) -> Response:
+    """304 for a conditional GET whose client already holds the current body"""
+    log_payload_read(payload_id, 0, streamed=False, source=f"{source}_not_modified")
+    headers = payload_headers(None)
+    headers["ETag"] = tag
+    return Response(status_code=304, headers=headers)
+
+def log_payload_read(payload_id: str, size: Optional[int], streamed: bool, source: str = "database") -> None:
+    """Emit the single summary record for a payload read and count where it was served from"""
+    metrics.PAYLOAD_READS.inc(source if size is not None else "not_found")
+    fields = {"payload_id": payload_id, "found": size is not None, "size": size, "streamed": streamed, "source": source}
+    logger.info("payload read", extra={"fields": fields})
+
+async def stream_payload(payload_id: str, encoding: Optional[str] = None, cache_key: Optional[str] = None):
+    """Serve a stored payload, streaming outputs above the configured size"""
+    opened = await run_blocking(open_payload_reader, payload_id)
+    if opened is None:
+        log_payload_read(payload_id, None, streamed=False)
+        raise HTTPException(status_code=404, detail="Payload not found")
+    
+    reader, etag = opened
+    streamed = reader.size >= settings.stream_min_bytes
+    log_payload_read(payload_id, reader.size, streamed)
+    if not streamed:
+        try:
+            document = await run_blocking(reader.read_document)
+        finally:
+            await run_blocking(reader.close)
+        return await document_response(cache_key or payload_id, etag, document, encoding)
+    
+    body = stream_payload_json(reader)
+    applied = encoding if encoding is not None and reader.size >= settings.compression_min_bytes else None
+    if applied is not None:
+        body = compress_stream(body, compression.compressor(applied, settings.compression_levels))
+    return StreamingResponse(body, media_type="application/json", headers=payload_headers(etag, applied))
+
+async def compress_stream(chunks, compressor: compression.Compressor):
+    """Compress a streamed body chunk by chunk, off the event loop"""
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            compressed = await run_blocking(compressor.compress, chunk)
+            if compressed:
+                yield compressed
+    yield await run_blocking(compressor.flush)
+
+# Columns whose UTF-8 size counts against cache_max_bytes
+CACHE_ENTRY_TEXT_COLUMNS = ("input_text", "transformed_text")
+
+def flush_access_stamps() -> int:
+    """Write collected access stamps back to CacheEntry, one transaction per batch"""
+    if access_tracker is None:
+        return 0
+    rows = [
+        {"key": key_hash(key), "stamp": stamp, "count": count}
+        for key, (stamp, count) in access_tracker.drain().items()
+    ]
+    statement = sql_text(
+        f"UPDATE {CacheEntry.__tablename__} SET last_access = MAX(last_access, :stamp), hits = hits + :count "
+        f"WHERE input_hash = :key"
+    )
+    for chunk in iter_chunks(rows, settings.maintenance_batch_rows):
+        with engine.begin() as connection:
+            connection.execute(statement, list(chunk))
+    return len(rows)
+
+def evict_cache_entries() -> Dict[str, int]:
+    """Drop expired entries, then the least recently or frequently used ones above the size bounds"""
+    table = CacheEntry.__tablename__
+    batch = settings.maintenance_batch_rows
+    order = "last_access" if settings.cache_eviction_policy == "lru" else "hits, last_access"
+    
+    expired = 0
+    if settings.cache_ttl_seconds is not None:
+        expired = delete_in_batches(
+            engine,
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE created_at < :cutoff LIMIT :batch)",
+            {"cutoff": time.time() - settings.cache_ttl_seconds},
+            batch,
+        )
+    
+    # Each statement measures the excess itself, so passes running at the same
+    # time (one per worker process) never delete more than the bound requires
+    evicted = 0
+    if settings.cache_max_rows is not None:
+        evicted += delete_in_batches(
+            engine,
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY {order} "
+            f"LIMIT max(0, min(:batch, (SELECT COUNT(*) FROM {table}) - :cap)))",
+            {"cap": settings.cache_max_rows},
+            batch,
+        )
+    if settings.cache_max_bytes is not None:
+        # Only the entries themselves count: payload tables never trigger cache
+        # eviction. Victims are the shortest prefix, in eviction order, whose
+        # entries add up to the excess.
+        size = text_bytes_sql(CACHE_ENTRY_TEXT_COLUMNS)
+        evicted += delete_in_batches(
+            engine,
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM ("
+            f"SELECT rowid, {size} AS size, SUM({size}) OVER (ORDER BY {order}, rowid) AS running FROM {table}"
+            f") WHERE running - size < (SELECT COALESCE(SUM({size}), 0) FROM {table}) - :cap LIMIT :batch)",
+            {"cap": settings.cache_max_bytes},
+            batch,
+        )
+    
+    metrics.STORAGE_EVICTIONS.inc(table, "ttl", amount=expired)
+    metrics.STORAGE_EVICTIONS.inc(table, "size", amount=evicted)
+    return {"cache_expired": expired, "cache_evicted": evicted}
+
+def expire_payloads() -> int:
+    """Delete payloads older than the retention period, in batches"""
+    if settings.payload_ttl_seconds is None:
+        return 0
+    cutoff = (datetime.now() - timedelta(seconds=settings.payload_ttl_seconds)).isoformat()
+    batch = settings.maintenance_batch_rows
+    deleted = 0
+    for model in (Payload, PayloadRef):
+        table = model.__tablename__
+        deleted += delete_in_batches(
+            engine,
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE created_at < :cutoff LIMIT :batch)",
+            {"cutoff": cutoff},
+            batch,
+        )
+    
+    # Streamed payloads go header and chunks together
+    while True:
+        with engine.begin() as connection:
+            expired_ids = connection.execute(
+                select(ChunkedPayload.id).where(ChunkedPayload.created_at < cutoff).limit(batch)
+            ).scalars().all()
+            if expired_ids:
+                connection.execute(delete(ChunkedPayload).where(col(ChunkedPayload.id).in_(expired_ids)))
+                connection.execute(delete(PayloadChunk).where(col(PayloadChunk.payload_id).in_(expired_ids)))
+        deleted += len(expired_ids)
+        if len(expired_ids) < batch:
+            break
+    
+    metrics.STORAGE_EVICTIONS.inc(Payload.__tablename__, "ttl", amount=deleted)
+    # Cached bodies must not outlive their rows
+    if deleted and response_cache is not None:
+        response_cache.clear()
+    return deleted
+
+def sweep_orphan_chunks() -> int:
+    """Delete chunks of streamed payloads whose ingest stopped without publishing a header
+    
+    A failed ingest normally discards its own chunks; this catches the ones left
+    by a worker that died part-way. An ingest counts as abandoned once none of
+    its chunks is newer than the grace period, so slow streams are left alone.
+    """
+    chunks = PayloadChunk.__tablename__
+    headers = ChunkedPayload.__tablename__
+    cutoff = (datetime.now() - timedelta(seconds=settings.payload_orphan_grace_seconds)).isoformat()
+    swept = delete_in_batches(
+        engine,
+        f"DELETE FROM {chunks} WHERE rowid IN (SELECT rowid FROM {chunks} AS c WHERE c.created_at < :cutoff"
+        f" AND NOT EXISTS (SELECT 1 FROM {headers} AS h WHERE h.id = c.payload_id)"
+        f" AND NOT EXISTS (SELECT 1 FROM {chunks} AS n WHERE n.payload_id = c.payload_id AND n.created_at >= :cutoff)"
+        f" LIMIT :batch)",
+        {"cutoff": cutoff},
+        settings.maintenance_batch_rows,
+    )
+    metrics.STORAGE_EVICTIONS.inc(chunks, "orphaned", amount=swept)
+    return swept
+
+def collect_orphan_blobs() -> int:
+    """Delete content-addressed outputs no payload references any more, with their digests"""
+    blobs = PayloadBlob.__tablename__
+    refs = PayloadRef.__tablename__
+    digests = PayloadDigest.__tablename__
+    batch = settings.maintenance_batch_rows
+    unreferenced = f"NOT EXISTS (SELECT 1 FROM {refs} AS r WHERE r.content_hash = {blobs}.content_hash)"
+    collected = 0
+    while True:
+        with engine.begin() as connection:
+            candidates = connection.execute(
+                sql_text(f"SELECT content_hash FROM {blobs} WHERE {unreferenced} LIMIT :batch"), {"batch": batch}
+            ).scalars().all()
+            if not candidates:
+                break
+            # Re-checked inside the write so a reference added meanwhile keeps its blob
+            deleted = connection.execute(
+                delete(PayloadBlob).where(col(PayloadBlob.content_hash).in_(candidates), sql_text(unreferenced))
+            ).rowcount
+            connection.execute(delete(PayloadDigest).where(
+                col(PayloadDigest.content_hash).in_(candidates),
+                sql_text(f"NOT EXISTS (SELECT 1 FROM {blobs} AS b WHERE b.content_hash = {digests}.content_hash)"),
+            ))
+        collected += deleted
+        if len(candidates) < batch:
+            break
+    
+    metrics.STORAGE_EVICTIONS.inc(blobs, "unreferenced", amount=collected)
+    return collected
+
+def run_maintenance() -> Dict[str, int]:
+    """One maintenance pass (blocking; runs on the maintenance thread)"""
+    # Every worker writes back the access stamps it collected; the rest is done once
+    result = {"access_stamps": flush_access_stamps()}
+    if not owns_maintenance:
+        return result
+    result.update(evict_cache_entries())
+    result["payloads_expired"] = expire_payloads()
+    result["blobs_collected"] = collect_orphan_blobs() if result["payloads_expired"] else 0
+    result["chunks_orphaned"] = sweep_orphan_chunks()
+    result["pages_vacuumed"] = incremental_vacuum(engine, settings.maintenance_vacuum_pages)
+    result["wal_frames_checkpointed"] = checkpoint(engine)
+    return result
+
+def preload_hot_entries(task: WarmupTask) -> None:
+    """Load the most used CacheEntry rows into L1"""
+    entries = hot_entries(engine, min(settings.warmup_top_n, settings.l1_max_entries))
+    for batch in iter_chunks(entries, settings.warmup_batch_size):
+        if task.stopped:
+            return
+        for input_text, transformed_text in batch:
+            l1_cache.set(input_text, transformed_text)
+        task.report("hot_rows", len(batch))
+
+def import_cache_snapshot(task: WarmupTask) -> None:
+    """Load the warm-up snapshot into L1 and the cache backend"""
+    path = settings.warmup_snapshot_path
+    if not os.path.exists(path):
+        logger.info("no cache snapshot to import", extra={"fields": {"path": path}})
+        return
+    for batch in iter_batches(read_snapshot(path), settings.warmup_batch_size):
+        if task.stopped:
+            return
+        entries = dict(batch)
+        cache_backend.set_many(entries)
+        for input_text, transformed_text in entries.items():
+            l1_cache.set(input_text, transformed_text)
+        task.report("snapshot", len(entries))
+
+def precompute_keys(task: WarmupTask) -> None:
+    """Resolve every string in the key list, transforming those no tier has yet, in parallel batches"""
+    def warm(batch: List[str]) -> None:
+        if task.stopped:
+            return
+        stats = ResolveStats()
+        get_cached_results(batch, stats, preload=True)
+        task.report("keys", len(batch))
+        task.report("keys_transformed", stats.misses)
+    
+    batches = iter_batches(read_keys(settings.warmup_keys_path), settings.warmup_batch_size)
+    with ThreadPoolExecutor(settings.warmup_concurrency, thread_name_prefix="warmup") as pool:
+        for _ in pool.map(warm, batches):
+            pass
+
+def save_cache_snapshot() -> int:
+    """Write the L1 contents to the warm-up snapshot for the next start"""
+    count = write_snapshot(settings.warmup_snapshot_path, l1_cache.items())
+    logger.info("saved cache snapshot", extra={"fields": {"path": settings.warmup_snapshot_path, "entries": count}})
+    return count
+
+def create_warmup() -> Optional[WarmupTask]:
+    """Build the warm-up task from the configured sources, or None if there are none"""
+    steps = []
+    if settings.warmup_top_n > 0 and cache_backend.uses_database:
+        steps.append(("hot_rows", preload_hot_entries))
+    if settings.warmup_snapshot_path is not None:
+        steps.append(("snapshot", import_cache_snapshot))
+    if settings.warmup_keys_path is not None:
+        steps.append(("keys", precompute_keys))
+    if not steps:
+        return None
+    return WarmupTask(steps, lambda source, count: metrics.WARMUP_ENTRIES.inc(source, amount=count))
+
+# Occupancy gauges, read at scrape time
+metrics.RESOURCE_GAUGE.set_function(
+    lambda: engine.pool.checkedout() if engine is not None else 0, "db_connections_checked_out"
+)
+metrics.RESOURCE_GAUGE.set_function(
+    lambda: _worker_limiter.borrowed_tokens if _worker_limiter is not None else 0, "worker_threads_busy"
+)
+metrics.RESOURCE_GAUGE.set_function(
+    lambda: write_buffer.pending_rows() if write_buffer is not None else 0, "write_behind_pending_rows"
+)
+metrics.RESOURCE_GAUGE.set_function(lambda: len(l1_cache) if l1_cache is not None else 0, "l1_entries")
+metrics.RESOURCE_GAUGE.set_function(lambda: l1_cache.stats()["bytes"] if l1_cache is not None else 0, "l1_bytes")
+metrics.RESOURCE_GAUGE.set_function(lambda: len(response_cache) if response_cache is not None else 0, "response_cache_entries")
+metrics.RESOURCE_GAUGE.set_function(
+    lambda: response_cache.stats()["bytes"] if response_cache is not None else 0, "response_cache_bytes"
+)
+metrics.RESOURCE_GAUGE.set_function(lambda: cache_flights.stats()["in_flight"], "single_flight_in_flight")
+metrics.RESOURCE_GAUGE.set_function(
+    lambda: 1 if warmup is not None and warmup.state == "running" else 0, "warmup_running"
+)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text exposition of cache, latency and occupancy metrics"""
+    if not metrics.registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Counters for the in-process cache tier and miss coalescing"""
+    stats = {
+        "l1": l1_cache.stats(),
+        "shared": shared_cache.stats() if shared_cache is not None else None,
+        "admission": admission.stats() if admission is not None else None,
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "backend": {"name": cache_backend.name, **cache_backend.stats()},
+        "single_flight": cache_flights.stats(),
+    }
+    if transformer_client is not None:
+        stats["transformer"] = transformer_client.stats()
+    if write_buffer is not None:
+        stats["write_behind"] = write_buffer.stats()
+    if maintenance is not None:
+        stats["maintenance"] = maintenance.stats()
+    if warmup is not None:
+        stats["warmup"] = warmup.stats()
+    return stats
+
+@router.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "FastAPI Caching Service is running"}
 
-if __name__ == "__main__":
+def sqlite_profile() -> SQLiteProfile:
+    """Connection PRAGMAs from the CACHE_SQLITE_* settings"""
+    return SQLiteProfile(
+        journal_mode=settings.sqlite_journal_mode,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size=settings.sqlite_cache_size,
+        temp_store=settings.sqlite_temp_store,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        auto_vacuum=settings.sqlite_auto_vacuum,
+    )
+
+def migrate_database(database_url: str = DATABASE_URL) -> None:
+    """Create or upgrade the schema with the service's profile, so a new file gets its auto_vacuum mode"""
+    schema_engine = create_sqlite_engine(database_url, sqlite_profile())
+    try:
+        ensure_schema(schema_engine)
+    finally:
+        schema_engine.dispose()
+
+def maintenance_lock_path(database_url: str) -> Optional[str]:
+    """Lock file next to a database file; None for in-memory databases, which no other process can open"""
+    database = make_url(database_url).database
+    if not database or database == ":memory:":
+        return None
+    return f"{database}-maintenance.lock"
+
+def init_resources(database_url: str = DATABASE_URL) -> None:
+    """Build the engine, cache tiers and background workers from settings and bring the schema up to date
+
+    Blocking. The application's lifespan calls it at startup; tests and scripts
+    that use this module's functions without serving the app call it themselves.
+    Background workers are created here but started by the lifespan.
+    """
+    global engine, l1_cache, response_cache, cache_backend, transformer_client, payload_dedup, write_durability
+    global write_buffer, access_tracker, maintenance, warmup, response_encodings, shared_cache, admission, trace_recorder
+    global maintenance_lock, owns_maintenance
+    # Recording stops entirely when metrics are disabled
+    metrics.registry.enabled = settings.metrics_enabled
+    
+    engine = create_sqlite_engine(
+        database_url,
+        sqlite_profile(),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    # A no-op for a database already at the current schema version
+    ensure_schema(engine)
+    
+    l1_cache = LRUCache(
+        max_entries=settings.l1_max_entries,
+        max_bytes=settings.l1_max_bytes,
+        # Entries expiring from the table should not outlive it in memory
+        ttl_seconds=settings.l1_ttl_seconds if settings.l1_ttl_seconds is not None else settings.cache_ttl_seconds,
+    )
+    admission = create_policy(
+        settings.cache_admission_policy,
+        min_sightings=settings.cache_admission_min_sightings,
+        width=settings.cache_admission_sketch_width,
+        max_key_bytes=settings.cache_admission_max_key_bytes,
+        max_value_bytes=settings.cache_admission_max_value_bytes,
+        bypass_max_chars=settings.cache_bypass_max_chars,
+    )
+    trace_recorder = TraceRecorder(settings.cache_trace_path) if settings.cache_trace_path is not None else None
+    shared_cache = None
+    if settings.shared_cache_path is not None:
+        shared_cache = SharedHotCache(
+            settings.shared_cache_path,
+            slots=settings.shared_cache_slots,
+            slot_bytes=settings.shared_cache_slot_bytes,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    response_encodings = compression.available(settings.compression_encodings)
+    if settings.payload_store_encoding is not None and settings.payload_store_encoding not in compression.CODECS:
+        logger.warning("Cannot store payloads as %s: its package is not installed", settings.payload_store_encoding)
+    response_cache = None
+    if settings.response_cache_max_entries > 0:
+        response_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries, max_bytes=settings.response_cache_max_bytes
+        )
+    cache_backend = create_cache_backend()
+    transformer_client = create_transformer_client()
+    
+    payload_dedup = settings.payload_dedup
+    write_durability = settings.write_durability
+    write_buffer = None
+    if write_durability != "immediate":
+        write_buffer = WriteBehindBuffer(
+            flush_buffered_rows,
+            max_rows=settings.write_flush_rows,
+            max_delay_ms=settings.write_flush_interval_ms,
+        )
+    
+    access_tracker = None
+    if cache_backend.uses_database and (
+        settings.cache_max_rows is not None or settings.cache_max_bytes is not None or settings.warmup_top_n > 0
+    ):
+        access_tracker = AccessTracker()
+    
+    maintenance_lock = None
+    lock_path = maintenance_lock_path(database_url)
+    if lock_path is not None:
+        maintenance_lock = acquire_process_lock(lock_path)
+    owns_maintenance = lock_path is None or maintenance_lock is not None
+    maintenance = None
+    if settings.maintenance_interval_seconds > 0:
+        maintenance = MaintenanceWorker(run_maintenance, settings.maintenance_interval_seconds)
+    warmup = create_warmup()
+    
+    # Buffered writes must be durable even if the process exits without a shutdown
+    atexit.unregister(close_resources)
+    atexit.register(close_resources)
+
+def close_resources() -> None:
+    """Stop background workers, flush buffered writes and release connections (blocking, idempotent)"""
+    global engine, l1_cache, response_cache, cache_backend, transformer_client, write_buffer, access_tracker
+    global maintenance, warmup, shared_cache, admission, trace_recorder, maintenance_lock, owns_maintenance
+    if warmup is not None:
+        warmup.close()
+    if (
+        settings.warmup_snapshot_on_shutdown
+        and settings.warmup_snapshot_path is not None
+        and l1_cache is not None
+        and owns_maintenance
+    ):
+        save_cache_snapshot()
+    if maintenance is not None:
+        maintenance.close()
+    # Buffered writes must be durable before the process exits
+    if write_buffer is not None:
+        write_buffer.close()
+    if transformer_client is not None:
+        transformer_client.close()
+    if cache_backend is not None:
+        cache_backend.close()
+    if shared_cache is not None:
+        shared_cache.close()
+    if trace_recorder is not None:
+        trace_recorder.close()
+    if engine is not None:
+        engine.dispose()
+    if maintenance_lock is not None:
+        os.close(maintenance_lock)
+    maintenance_lock = None
+    owns_maintenance = False
+    engine = l1_cache = response_cache = cache_backend = transformer_client = write_buffer = None
+    access_tracker = maintenance = warmup = shared_cache = admission = trace_recorder = None
+
+def create_app(database_url: str = DATABASE_URL) -> FastAPI:
+    """Application factory: resources are built when the app starts, not when it is created
+
+    Resources that already exist (set up by a test, say) are used as they are
+    and left open on shutdown. Run with ``uvicorn main:app`` or
+    ``uvicorn --factory main:create_app``.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Structured records written off the request path
+        configure_logging(settings.log_level, settings.log_format, settings.log_debug_sample_rate)
+        owns_resources = engine is None
+        if owns_resources:
+            started = time.perf_counter()
+            await anyio.to_thread.run_sync(init_resources, database_url)
+            if maintenance is not None:
+                maintenance.start()
+            if warmup is not None:
+                warmup.start()
+            logger.info("startup complete", extra={"fields": {"seconds": round(time.perf_counter() - started, 4)}})
+        yield
+        if owns_resources:
+            await anyio.to_thread.run_sync(close_resources)
+        shutdown_logging()
+    
+    application = FastAPI(title="FastAPI Caching Service", version="1.0.0", lifespan=lifespan)
+    application.add_middleware(metrics.MetricsMiddleware)
+    application.include_router(router)
+    return application
+
+app = create_app()
+
+def shared_cache_file() -> str:
+    """A fresh path for the hot-key table, in RAM-backed /dev/shm where there is one"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"fastapi-cache-{os.getpid()}-{uuid.uuid4().hex[:8]}.shm")
+
+def main_cli():
+    """Serve the app; with --workers N, N uvicorn processes share one port and one hot-key table"""
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    parser = argparse.ArgumentParser(description="Run the FastAPI Caching Service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.workers, help="Worker processes")
+    parser.add_argument(
+        "--no-shared-cache", action="store_true", help="Do not create a hot-key table shared by the workers"
+    )
+    args = parser.parse_args()
+    
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port)
+        return
+    
+    # Migrate once here rather than racing in every worker's startup
+    migrate_database(DATABASE_URL)
+    
+    # Workers read settings from the environment, so this reaches all of them
+    created = None
+    if settings.shared_cache_path is None and not args.no_shared_cache:
+        created = os.environ["CACHE_SHARED_CACHE_PATH"] = shared_cache_file()
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if created is not None and os.path.exists(created):
+            os.remove(created)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,185 @@
+"""Background maintenance for the SQLite store: access stamps, eviction, vacuum and checkpoints
+
+Every step works in short transactions of at most a batch of rows, so a pass
+never holds the write lock long enough to stall request handlers.
+"""
+import fcntl
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MaintenanceTask = Callable[[], Dict[str, int]]
+
+
+class AccessTracker:
+    """Collects cache hits in memory so access stamps are written in batches, not per read
+
+    Keys beyond ``max_keys`` between two drains are not tracked, which keeps
+    memory bounded at the cost of a slightly less exact LRU/LFU order.
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.time):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[float]] = {}
+        self.dropped = 0
+
+    def touch(self, keys: Iterable[str]) -> None:
+        """Record one access for each key"""
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                entry = self._pending.get(key)
+                if entry is not None:
+                    entry[0] = now
+                    entry[1] += 1
+                elif len(self._pending) < self.max_keys:
+                    self._pending[key] = [now, 1]
+                else:
+                    self.dropped += 1
+
+    def drain(self) -> Dict[str, Tuple[float, int]]:
+        """Return and forget the accesses recorded since the last drain"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return {key: (stamp, int(count)) for key, (stamp, count) in pending.items()}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+def acquire_process_lock(path: str) -> Optional[int]:
+    """Take an exclusive lock on ``path`` without waiting; returns its descriptor, or None if another process holds it
+
+    The lock lasts until the descriptor is closed or the process exits.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def delete_in_batches(
+    engine: Engine,
+    statement: str,
+    params: Optional[dict] = None,
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    pause: float = 0.005,
+) -> int:
+    """Repeat a ``DELETE ... LIMIT :batch`` statement, one short transaction per batch
+
+    Stops when a batch deletes fewer rows than requested or ``limit`` rows are
+    gone. The pause between batches lets waiting writers take the lock.
+    """
+    total = 0
+    while limit is None or total < limit:
+        batch = batch_size if limit is None else min(batch_size, limit - total)
+        with engine.begin() as connection:
+            deleted = connection.execute(text(statement), {**(params or {}), "batch": batch}).rowcount
+        total += deleted
+        if deleted < batch:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def text_bytes_sql(columns: Iterable[str]) -> str:
+    """SQL expression for the UTF-8 size of a row's text columns"""
+    return " + ".join(f"length(CAST({column} AS BLOB))" for column in columns)
+
+
+def table_text_bytes(engine: Engine, table: str, columns: Iterable[str]) -> int:
+    """UTF-8 bytes held in the given text columns over all rows of ``table``"""
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT COALESCE(SUM({text_bytes_sql(columns)}), 0) FROM {table}")).scalar()
+
+
+def incremental_vacuum(engine: Engine, pages: int) -> int:
+    """Return up to ``pages`` free pages to the filesystem; returns how many were released
+
+    Only has an effect on databases created with ``auto_vacuum=INCREMENTAL``.
+    """
+    with engine.connect() as connection:
+        before = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if not before or connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            return 0
+        connection.exec_driver_sql(f"PRAGMA incremental_vacuum({int(pages)})")
+        connection.commit()
+        after = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return before - after
+
+
+def checkpoint(engine: Engine, mode: str = "PASSIVE") -> int:
+    """Copy WAL frames back into the database without waiting for readers or writers
+
+    Returns the number of frames checkpointed (0 outside WAL mode).
+    """
+    with engine.connect() as connection:
+        row = connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return max(row[2], 0) if row is not None else 0
+
+
+class MaintenanceWorker:
+    """Runs a maintenance task on a daemon thread every ``interval`` seconds"""
+
+    def __init__(self, task: MaintenanceTask, interval: float = 30.0):
+        self._task = task
+        self.interval = interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.errors = 0
+        self.totals: Dict[str, int] = {}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+            self._thread.start()
+
+    def run_once(self) -> Dict[str, int]:
+        """Run one pass now and add its counts to the running totals"""
+        with self._lock:
+            try:
+                result = self._task()
+            except Exception:
+                self.errors += 1
+                raise
+            self.runs += 1
+            for key, value in result.items():
+                self.totals[key] = self.totals.get(key, 0) + value
+            return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.run_once()
+            except Exception:
+                logger.exception("Maintenance pass failed")
+                continue
+            if any(result.values()):
+                logger.info("maintenance pass", extra={"fields": result})
+
+    def close(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {"runs": self.runs, "errors": self.errors, **self.totals}
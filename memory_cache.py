@@ -0,0 +1,124 @@
+"""In-process LRU/TTL cache used as the L1 tier in front of CacheEntry"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and byte size, with optional TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, size in bytes, expiry timestamp or None)
+        self._entries: "OrderedDict[str, Tuple[str, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value and mark it most recently used, or None on miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[str]:
+        """Return an unexpired value without counting a hit or miss or changing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[2] is not None and entry[2] <= self._clock()):
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Insert or replace a value, evicting least recently used entries as needed"""
+        size = self._entry_size(key, value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Unexpired entries from least to most recently used, without touching their order"""
+        now = self._clock()
+        with self._lock:
+            return [
+                (key, value)
+                for key, (value, _, expires_at) in self._entries.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the cache counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+
+class ResponseCache(LRUCache):
+    """LRU of encoded response bodies; values are ``(etag, content coding or None, body bytes)``"""
+
+    @staticmethod
+    def _entry_size(key: str, value: Tuple[Optional[str], Optional[str], bytes]) -> int:
+        etag, _, body = value
+        return len(key) + len(etag or "") + len(body)
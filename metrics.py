@@ -0,0 +1,231 @@
+"""Minimal Prometheus-style metrics registry and the service's hot-path metrics
+
+Metrics are recorded only while ``registry.enabled`` is set; when it is off
+every ``inc``/``observe``/``time`` call returns immediately.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class holding the name, help text and label names of a metric family"""
+
+    kind = "untyped"
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram(Metric):
+    """Cumulative bucketed distribution per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def _timer(self, labels: LabelValues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def time(self, *labels: str):
+        """Context manager observing the elapsed wall time of its block"""
+        if not self._registry.enabled:
+            return nullcontext()
+        return self._timer(labels)
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_label = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """Point-in-time value read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._callbacks: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set_function(self, callback: Callable[[], float], *labels: str) -> None:
+        self._callbacks[labels] = callback
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, callback in sorted(self._callbacks.items(), key=lambda item: item[0]):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(callback())}")
+        return lines
+
+
+class Registry:
+    """Collection of metric families rendered in the Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+CACHE_LOOKUPS = Counter(
+    registry, "cache_lookups_total", "Cache lookups by tier and result", ["tier", "result"]
+)
+CACHE_INSERTS = Counter(registry, "cache_inserts_total", "Transformed strings written to the cache")
+CACHE_HASH_COLLISIONS = Counter(
+    registry, "cache_hash_collisions_total", "Lookups whose key hash matched a row for a different string"
+)
+CACHE_ADMISSIONS = Counter(
+    registry, "cache_admissions_total", "Transformed strings by admission decision", ["policy", "decision"]
+)
+CACHE_COALESCED = Counter(registry, "cache_coalesced_total", "Misses that waited on an in-flight computation")
+DB_QUERY_SECONDS = Histogram(
+    registry, "db_query_duration_seconds", "Time spent in database operations", ["operation"]
+)
+TRANSFORMER_SECONDS = Histogram(
+    registry, "transformer_call_duration_seconds", "Time spent transforming a batch of cache misses"
+)
+REQUEST_SECONDS = Histogram(
+    registry, "http_request_duration_seconds", "End-to-end request handling time", ["method", "route", "status"]
+)
+PAYLOAD_CHARACTERS = Histogram(
+    registry, "payload_output_characters", "Length of stored payload outputs", buckets=SIZE_BUCKETS
+)
+STORAGE_EVICTIONS = Counter(
+    registry, "storage_evictions_total", "Rows removed by background maintenance", ["table", "reason"]
+)
+WARMUP_ENTRIES = Counter(
+    registry, "cache_warmup_entries_total", "Entries loaded or precomputed by the startup warm-up", ["source"]
+)
+PAYLOAD_READS = Counter(
+    registry, "payload_reads_total", "GET /payload/{id} responses by where they were served from", ["source"]
+)
+RESOURCE_GAUGE = Gauge(registry, "service_resource_usage", "Pool, queue and cache occupancy", ["resource"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request from arrival to the last body chunk"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+            )
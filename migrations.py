@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Schema setup and migrations for cache.db files created by earlier versions
+
+The service applies them at startup unless the file is already stamped with
+the current schema version. To migrate and compact a file offline, for example
+before deploying:
+
+    python migrations.py cache.db
+"""
+import argparse
+import logging
+import os
+from typing import Optional, Union
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+from content_store import key_hash
+from database import add_missing_columns, create_sqlite_engine, transaction
+from models import SCHEMA_VERSION, CacheEntry
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_ROWS = 10_000
+STAMP_COLUMNS = ("created_at", "last_access", "hits")
+
+
+def migrate_cache_entry_keys(bind: Union[Engine, Connection], batch_rows: int = MIGRATION_BATCH_ROWS) -> Optional[int]:
+    """Rebuild a CacheEntry table keyed by id and a unique input_text into the hash-keyed layout
+
+    Returns the number of rows copied, or None if there is nothing to migrate.
+    Everything runs in one transaction, so a failure leaves the old table as it was.
+    """
+    table = CacheEntry.__tablename__
+    legacy = f"{table}_legacy"
+    with transaction(bind) as connection:
+        columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if not columns or "input_hash" in columns:
+            return None
+
+        # Indexes keep their names through a rename and would clash with the new table's
+        for row in connection.exec_driver_sql(f"PRAGMA index_list({table})").fetchall():
+            if row[3] == "c":
+                connection.exec_driver_sql(f'DROP INDEX "{row[1]}"')
+        connection.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {legacy}")
+        CacheEntry.__table__.create(connection)
+
+        stamps = [name for name in STAMP_COLUMNS if name in columns]
+        query = (
+            f"SELECT rowid, input_text, transformed_text{''.join(', ' + name for name in stamps)} "
+            f"FROM {legacy} WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        )
+        statement = sqlite_insert(CacheEntry).on_conflict_do_nothing(index_elements=["input_hash"])
+        last_rowid = -(2 ** 63)
+        copied = 0
+        while True:
+            rows = connection.exec_driver_sql(query, (last_rowid, batch_rows)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            connection.execute(statement, [
+                {
+                    "input_hash": key_hash(input_text),
+                    "input_text": input_text,
+                    "transformed_text": transformed_text,
+                    **dict(zip(stamps, values)),
+                }
+                for _, input_text, transformed_text, *values in rows
+            ])
+            copied += len(rows)
+        connection.exec_driver_sql(f"DROP TABLE {legacy}")
+
+    logger.info("migrated cache entries to hash keys", extra={"fields": {"rows": copied}})
+    return copied
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """Create or upgrade the tables unless the database is stamped with SCHEMA_VERSION
+
+    The upgrade holds the write lock from the start (BEGIN IMMEDIATE), so
+    workers starting together run it once: the others wait, find the stamp and
+    skip it. Returns whether anything ran.
+    """
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION:
+            return False
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            if connection.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION:
+                connection.rollback()
+                return False
+            migrate_cache_entry_keys(connection)
+            SQLModel.metadata.create_all(connection)
+            # Databases created by earlier versions lack newer columns and indexes
+            for table in SQLModel.metadata.sorted_tables:
+                add_missing_columns(connection, table)
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+    logger.info("database schema up to date", extra={"fields": {"schema_version": SCHEMA_VERSION}})
+    return True
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", help="Path to the SQLite database file")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip the final VACUUM")
+    args = parser.parse_args()
+
+    size_before = os.path.getsize(args.database)
+    engine = create_sqlite_engine(f"sqlite:///{args.database}")
+    copied = migrate_cache_entry_keys(engine)
+    print("cache entries already hash-keyed" if copied is None else f"cache entries migrated: {copied}")
+    print("schema upgraded" if ensure_schema(engine) else "schema already current")
+
+    if not args.no_vacuum:
+        # Rewrites the file, so it can also switch on incremental vacuum
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+    engine.dispose()
+    print(f"size: {size_before / 1e6:.2f} MB -> {os.path.getsize(args.database) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main_cli()
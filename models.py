@@ -0,0 +1,80 @@
+"""SQLModel tables of the cache database"""
+from typing import Optional
+
+from sqlalchemy import Index, text
+from sqlmodel import Field, SQLModel
+
+# Stamped into PRAGMA user_version once a database matches these models; bump it
+# whenever a table, column or index changes so existing files get upgraded
+SCHEMA_VERSION = 5
+
+
+class Payload(SQLModel, table=True):
+    # Covers conditional GETs: the ETag is read from the index, never from the row
+    __table_args__ = (Index("ix_payload_id_etag", "id", "etag"),)
+
+    id: Optional[str] = Field(primary_key=True)
+    output: str
+    created_at: str = Field(index=True)
+    # Set at write time when output needs no JSON escaping, so reads can frame
+    # the stored bytes as a response without encoding them again
+    json_ready: bool = Field(default=False, sa_column_kwargs={"server_default": text("0")})
+    # content_digest of output, computed at write time and served as a strong
+    # ETag; NULL for rows written before ETags existed
+    etag: Optional[str] = None
+    # The response document compressed at write time (settings.payload_store_encoding)
+    compressed: Optional[bytes] = None
+    compressed_encoding: Optional[str] = None
+
+
+class CacheEntry(SQLModel, table=True):
+    # A 64-bit hash of input_text is the rowid, so lookups need no secondary
+    # index and each input is stored once; readers compare input_text to rule
+    # out collisions (see content_store.key_hash)
+    input_hash: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    input_text: str
+    transformed_text: str
+    # Eviction bookkeeping: write time (epoch seconds) plus access stamps that
+    # maintenance flushes in batches; the server defaults cover migrated rows
+    created_at: float = Field(default=0.0, sa_column_kwargs={"server_default": text("0")})
+    last_access: float = Field(default=0.0, index=True, sa_column_kwargs={"server_default": text("0")})
+    hits: int = Field(default=0, index=True, sa_column_kwargs={"server_default": text("0")})
+
+
+# Content-addressed payload storage: each distinct output is stored once, and
+# its content_hash doubles as the ETag of every payload referencing it
+class PayloadBlob(SQLModel, table=True):
+    content_hash: str = Field(primary_key=True)
+    output: str
+    json_ready: bool = Field(default=False, sa_column_kwargs={"server_default": text("0")})
+    compressed: Optional[bytes] = None
+    compressed_encoding: Optional[str] = None
+
+
+class PayloadDigest(SQLModel, table=True):
+    request_hash: str = Field(primary_key=True)
+    content_hash: str
+
+
+class PayloadRef(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    content_hash: str = Field(index=True)
+    created_at: str = Field(index=True)
+
+
+# Payloads ingested as a stream are stored as ordered output chunks; the header
+# row is written last, so a payload only becomes visible once it is complete.
+# Chunks of an ingest that never finished are swept once they are old enough.
+class PayloadChunk(SQLModel, table=True):
+    payload_id: str = Field(primary_key=True)
+    seq: int = Field(primary_key=True)
+    output: str
+    created_at: str = Field(default="", sa_column_kwargs={"server_default": text("''")})
+
+
+class ChunkedPayload(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    chunk_count: int
+    total_bytes: int
+    etag: Optional[str] = None
+    created_at: str = Field(index=True)
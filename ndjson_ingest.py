@@ -0,0 +1,60 @@
+"""Incremental parsing of NDJSON list pairs for streaming payload ingestion"""
+from typing import AsyncIterator, List, Tuple
+
+import fast_json
+
+Pair = Tuple[str, str]
+
+
+class IngestError(ValueError):
+    """Raised when a line of the NDJSON body is not a valid pair"""
+
+
+def parse_pair(line: bytes, line_number: int) -> Pair:
+    """Parse one ``["list_1 item", "list_2 item"]`` line"""
+    try:
+        # orjson also rejects lone surrogates, which could not be encoded to UTF-8 later
+        value = fast_json.loads(line)
+    except ValueError as error:
+        raise IngestError(f"Line {line_number}: invalid JSON ({getattr(error, 'msg', error)})") from None
+    if (
+        not isinstance(value, list)
+        or len(value) != 2
+        or not isinstance(value[0], str)
+        or not isinstance(value[1], str)
+    ):
+        raise IngestError(f"Line {line_number}: expected a JSON array of two strings")
+    return value[0], value[1]
+
+
+async def iter_pair_chunks(
+    body: AsyncIterator[bytes],
+    chunk_pairs: int = 1000,
+    max_line_bytes: int = 1024 * 1024,
+) -> AsyncIterator[List[Pair]]:
+    """Yield lists of up to ``chunk_pairs`` pairs as the request body arrives
+
+    Only the current chunk and one partial line are held in memory.
+    """
+    buffer = b""
+    line_number = 0
+    pairs: List[Pair] = []
+
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > max_line_bytes:
+            raise IngestError(f"Line {line_number + len(lines) + 1}: exceeds {max_line_bytes} bytes")
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            pairs.append(parse_pair(line, line_number))
+            if len(pairs) >= chunk_pairs:
+                yield pairs
+                pairs = []
+
+    if buffer.strip():
+        pairs.append(parse_pair(buffer, line_number + 1))
+    if pairs:
+        yield pairs
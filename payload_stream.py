@@ -0,0 +1,113 @@
+"""Chunked reads of stored payload outputs through SQLite incremental blob I/O"""
+import codecs
+import json
+from typing import Optional
+
+import fast_json
+
+JSON_PREFIX = b'{"output":"'
+JSON_SUFFIX = b'"}'
+
+
+def output_document(data: bytes, json_ready: bool) -> bytes:
+    """The ``{"output": ...}`` document for a stored UTF-8 output
+
+    Outputs flagged ``json_ready`` at write time are framed as they are.
+    """
+    if json_ready:
+        return JSON_PREFIX + data + JSON_SUFFIX
+    return fast_json.dumps({"output": data.decode("utf-8")})
+
+
+class JSONStringEncoder:
+    """Turns UTF-8 byte chunks into the escaped body of a JSON string
+
+    Chunk boundaries may split a multi-byte character, so decoding is incremental.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def encode(self, chunk: bytes, final: bool = False) -> bytes:
+        text = self._decoder.decode(chunk, final)
+        if not text:
+            return b""
+        return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+class BlobReader:
+    """Reads one TEXT column value in fixed-size chunks without loading it whole
+
+    Holds a pooled DBAPI connection (and with it a consistent read snapshot)
+    until ``close`` is called. Values stored ``json_ready`` need no escaping.
+    """
+
+    def __init__(
+        self, raw_connection, table: str, column: str, rowid: int, chunk_size: int = 64 * 1024, json_ready: bool = False
+    ):
+        self._raw_connection = raw_connection
+        self._blob = raw_connection.driver_connection.blobopen(table, column, rowid, readonly=True)
+        self.size = len(self._blob)
+        self.chunk_size = chunk_size
+        self.json_ready = json_ready
+        self._encoder = JSONStringEncoder()
+
+    def read_all(self) -> str:
+        """Read the whole value as text (for values small enough not to stream)"""
+        return self._blob.read().decode("utf-8")
+
+    def read_document(self) -> bytes:
+        """Read the whole value as a complete ``{"output": ...}`` document"""
+        return output_document(self._blob.read(), self.json_ready)
+
+    def read_json_chunk(self) -> Optional[bytes]:
+        """Return the next escaped JSON chunk, or None once the value is exhausted"""
+        chunk = self._blob.read(self.chunk_size)
+        if self.json_ready:
+            return chunk or None
+        if not chunk:
+            tail = self._encoder.encode(b"", final=True)
+            return tail or None
+        return self._encoder.encode(chunk)
+
+    def close(self) -> None:
+        """Release the blob handle and return the connection to the pool"""
+        try:
+            self._blob.close()
+        finally:
+            self._raw_connection.close()
+
+
+class ChunkReader:
+    """Reads a payload stored as ordered chunk rows, one row at a time"""
+
+    def __init__(self, raw_connection, table: str, payload_id: str, chunk_count: int, size: int):
+        self._raw_connection = raw_connection
+        self._query = f"SELECT output FROM {table} WHERE payload_id = ? AND seq = ?"
+        self._payload_id = payload_id
+        self._chunk_count = chunk_count
+        self._next_seq = 0
+        self.size = size
+
+    def _read_row(self, seq: int) -> str:
+        cursor = self._raw_connection.cursor()
+        try:
+            return cursor.execute(self._query, (self._payload_id, seq)).fetchone()[0]
+        finally:
+            cursor.close()
+
+    def read_all(self) -> str:
+        return "".join(self._read_row(seq) for seq in range(self._chunk_count))
+
+    def read_document(self) -> bytes:
+        return fast_json.dumps({"output": self.read_all()})
+
+    def read_json_chunk(self) -> Optional[bytes]:
+        if self._next_seq >= self._chunk_count:
+            return None
+        text = self._read_row(self._next_seq)
+        self._next_seq += 1
+        return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+
+    def close(self) -> None:
+        self._raw_connection.close()
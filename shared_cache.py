@@ -0,0 +1,178 @@
+"""Cross-process hot-key cache: a fixed-size hash table in a memory-mapped file
+
+Every worker process on a host maps the same file, so a string transformed by
+one worker is a hit for all of them without a database round trip. The file
+starts with a header recording the layout, followed by buckets of WAYS slots.
+A slot holds one entry:
+
+    seq (u32) | key hash (i64) | expires_at (f64) | key length (u16) | value length (u16) | key | value
+
+An all-zero file is a valid empty table. Readers take no locks: ``seq`` is odd
+while a writer is changing the slot, so a reader that sees it odd or changed
+after copying the slot treats it as a miss. Writers exclude each other with a
+thread lock and an fcntl lock on the bucket. Entries that do not fit a slot
+are not cached, and a full bucket overwrites a random entry.
+"""
+import fcntl
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from content_store import key_hash
+
+MAGIC = b"FCSHM01\0"
+FILE_HEADER = struct.Struct("<8sII")
+HEADER_BYTES = 64
+SLOT_HEADER = struct.Struct("<IqdHH")
+SEQ = struct.Struct("<I")
+WAYS = 4
+
+
+class SharedHotCache:
+    """Fixed-size cache of transformed strings shared by processes through one file"""
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 65_536,
+        slot_bytes: int = 256,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if slot_bytes <= SLOT_HEADER.size:
+            raise ValueError(f"slot_bytes must be larger than {SLOT_HEADER.size}")
+        self.path = path
+        self.buckets = max(1, -(-slots // WAYS))
+        self.slot_bytes = slot_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.oversized = 0
+
+        size = HEADER_BYTES + self.buckets * WAYS * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Every process sizes the file the same way, so racing opens agree
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        magic, buckets, stored_slot_bytes = FILE_HEADER.unpack_from(self._map, 0)
+        if magic == b"\0" * len(MAGIC):
+            FILE_HEADER.pack_into(self._map, 0, MAGIC, self.buckets, slot_bytes)
+        elif (magic, buckets, stored_slot_bytes) != (MAGIC, self.buckets, slot_bytes):
+            self.close()
+            raise ValueError(f"{path} holds a shared cache with a different layout")
+
+    def _bucket_offset(self, hashed: int) -> int:
+        return HEADER_BYTES + (hashed % self.buckets) * WAYS * self.slot_bytes
+
+    def _read(self, offset: int, hashed: int, key: bytes) -> Optional[str]:
+        seq, slot_hash, expires_at, key_length, value_length = SLOT_HEADER.unpack_from(self._map, offset)
+        if seq & 1 or slot_hash != hashed or key_length != len(key):
+            return None
+        start = offset + SLOT_HEADER.size
+        data = self._map[start:start + key_length + value_length]
+        if SEQ.unpack_from(self._map, offset)[0] != seq or data[:key_length] != key:
+            return None
+        if expires_at and expires_at <= self._clock():
+            return None
+        return data[key_length:].decode("utf-8")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss"""
+        hashed = key_hash(key)
+        encoded = key.encode("utf-8")
+        bucket = self._bucket_offset(hashed)
+        for way in range(WAYS):
+            value = self._read(bucket + way * self.slot_bytes, hashed, encoded)
+            if value is not None:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Look up many keys; misses are left out"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: str) -> bool:
+        """Store an entry; returns False when it does not fit a slot"""
+        hashed = key_hash(key)
+        encoded_key = key.encode("utf-8")
+        encoded_value = value.encode("utf-8")
+        if SLOT_HEADER.size + len(encoded_key) + len(encoded_value) > self.slot_bytes:
+            self.oversized += 1
+            return False
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else 0.0
+
+        bucket = self._bucket_offset(hashed)
+        bucket_bytes = WAYS * self.slot_bytes
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, bucket_bytes, bucket, os.SEEK_SET)
+            try:
+                offset = self._choose_slot(bucket, hashed, encoded_key)
+                seq = SEQ.unpack_from(self._map, offset)[0]
+                SEQ.pack_into(self._map, offset, seq + 1)
+                SLOT_HEADER.pack_into(
+                    self._map, offset, seq + 1, hashed, expires_at, len(encoded_key), len(encoded_value)
+                )
+                start = offset + SLOT_HEADER.size
+                self._map[start:start + len(encoded_key) + len(encoded_value)] = encoded_key + encoded_value
+                SEQ.pack_into(self._map, offset, seq + 2)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, bucket_bytes, bucket, os.SEEK_SET)
+            self.writes += 1
+        return True
+
+    def _choose_slot(self, bucket: int, hashed: int, key: bytes) -> int:
+        """The slot holding ``key``, else an empty one, else a random victim (caller holds the bucket lock)"""
+        empty = None
+        for way in range(WAYS):
+            offset = bucket + way * self.slot_bytes
+            _, slot_hash, _, key_length, value_length = SLOT_HEADER.unpack_from(self._map, offset)
+            if slot_hash == hashed and key_length == len(key):
+                start = offset + SLOT_HEADER.size
+                if self._map[start:start + key_length] == key:
+                    return offset
+            if empty is None and key_length == 0 and value_length == 0:
+                empty = offset
+        if empty is not None:
+            return empty
+        return bucket + random.randrange(WAYS) * self.slot_bytes
+
+    def set_many(self, items: Dict[str, str]) -> int:
+        """Store many entries; returns how many fit"""
+        return sum(self.set(key, value) for key, value in items.items())
+
+    def stats(self) -> Dict[str, int]:
+        """Counters of this process and the table's capacity"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "oversized": self.oversized,
+            "slots": self.buckets * WAYS,
+            "slot_bytes": self.slot_bytes,
+        }
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
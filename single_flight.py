@@ -0,0 +1,58 @@
+"""Single-flight coordination so each missing key is computed by one caller at a time"""
+import threading
+from concurrent.futures import Future
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+class SingleFlight:
+    """Tracks in-flight computations per key and lets concurrent callers share the result
+
+    A caller ``claim``s the keys it is missing. Keys nobody else is computing are
+    returned as owned and the caller must later ``complete`` or ``fail`` them;
+    keys already in flight come back as futures to wait on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, Future]]:
+        """Split keys into those this caller now owns and those already in flight"""
+        owned: List[Hashable] = []
+        waiting: Dict[Hashable, Future] = {}
+        with self._lock:
+            for key in keys:
+                future = self._calls.get(key)
+                if future is None:
+                    self._calls[key] = Future()
+                    owned.append(key)
+                else:
+                    waiting[key] = future
+            self.leaders += len(owned)
+            self.coalesced += len(waiting)
+        return owned, waiting
+
+    def complete(self, results: Dict[Hashable, object]) -> None:
+        """Publish results for owned keys and release them"""
+        with self._lock:
+            futures = [(self._calls.pop(key), value) for key, value in results.items()]
+        for future, value in futures:
+            future.set_result(value)
+
+    def fail(self, keys: Iterable[Hashable], error: BaseException) -> None:
+        """Propagate an error to everyone waiting on the given owned keys"""
+        with self._lock:
+            futures = [self._calls.pop(key) for key in keys if key in self._calls]
+        for future in futures:
+            future.set_exception(error)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of computations started and calls that piggybacked on one"""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -1,27 +1,33 @@
 """Pytest configuration and shared fixtures"""
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import SQLModel
+
+import main
 from main import app
 
-# Create test database
+# Test database
 TEST_DATABASE_URL = "sqlite:///./test_cache.db"
-test_engine = create_engine(TEST_DATABASE_URL, echo=False)
+
+@pytest.fixture(scope="session", autouse=True)
+def service():
+    """Build the service's engine and cache tiers once, against the test database"""
+    main.init_resources(TEST_DATABASE_URL)
+    yield
+    main.close_resources()
 
 @pytest.fixture(scope="function")
 def test_db():
     """Create a fresh test database for each test"""
     # Create tables
-    SQLModel.metadata.create_all(test_engine)
-    
-    # Override the engine in main module
-    import main
-    main.engine = test_engine
+    SQLModel.metadata.create_all(main.engine)
+    main.l1_cache.clear()
+    main.response_cache.clear()
     
-    yield test_engine
+    yield main.engine
     
     # Clean up
-    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.drop_all(main.engine)
 
 @pytest.fixture
 def client(test_db):
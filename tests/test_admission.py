@@ -0,0 +1,126 @@
+"""Tests for cache admission policies and trace replay"""
+import pytest
+from sqlmodel import Session, select
+
+import main
+from admission import CountMinSketch, Doorkeeper, TraceRecorder, create_policy, replay
+from content_store import key_hash
+from main import CacheEntry
+from warmup import read_keys
+
+class TestSketches:
+    """Test the frequency structures behind TinyLFU"""
+    
+    def test_count_min_sketch(self):
+        """Test that counts saturate at 15 and halve on reset"""
+        sketch = CountMinSketch(width=1000)
+        assert sketch.width == 1024
+        hashed = key_hash("hot")
+        for _ in range(20):
+            sketch.add(hashed)
+        assert sketch.estimate(hashed) == 15
+        assert sketch.estimate(key_hash("cold")) == 0
+        sketch.halve()
+        assert sketch.estimate(hashed) == 7
+    
+    def test_doorkeeper(self):
+        """Test that the first sighting is reported as new and later ones as seen"""
+        doorkeeper = Doorkeeper(4096)
+        assert not doorkeeper.add(key_hash("a"))
+        assert doorkeeper.add(key_hash("a"))
+        doorkeeper.clear()
+        assert not doorkeeper.add(key_hash("a"))
+
+class TestPolicies:
+    """Test admission decisions"""
+    
+    def test_tinylfu_admits_on_repeat(self):
+        """Test that a string is admitted only from its configured sighting on"""
+        policy = create_policy("tinylfu", min_sightings=3, width=1024)
+        assert [policy.decide("a", "A") for _ in range(4)] == ["rejected", "rejected", "admitted", "admitted"]
+        assert policy.stats()["rejected"] == 2
+    
+    def test_size_limits_and_bypass(self):
+        """Test that oversized entries are refused and short inputs bypass the cache"""
+        policy = create_policy("always", max_key_bytes=8, max_value_bytes=4, bypass_max_chars=1)
+        assert policy.decide("short", "SHRT") == "admitted"
+        assert policy.decide("very long key", "X") == "too_large"
+        assert policy.decide("key", "LONG VALUE") == "too_large"
+        assert policy.bypass("a") and not policy.bypass("ab")
+    
+    def test_unknown_policy(self):
+        """Test that an unknown policy name is refused"""
+        with pytest.raises(ValueError):
+            create_policy("lru")
+
+class TestReplay:
+    """Test offline trace replay"""
+    
+    def test_one_hit_wonders_do_not_evict_hot_keys(self):
+        """Test that TinyLFU keeps a hot set that a scan of one-off keys flushes out of a plain LRU"""
+        trace = []
+        for round_ in range(50):
+            trace += ["hot1", "hot2"] + [f"once{round_}-{i}" for i in range(4)]
+        policies = {"always": create_policy("always"), "tinylfu": create_policy("tinylfu", width=1024)}
+        results = replay(trace, policies, capacity=3)
+        
+        assert results["always"]["hit_ratio"] == 0
+        assert results["tinylfu"]["hits"] == 96
+        assert results["tinylfu"]["admitted"] == 2
+    
+    def test_recorded_trace(self, tmp_path):
+        """Test that recorded keys read back in order, skipping keys with line breaks"""
+        path = str(tmp_path / "trace.txt")
+        recorder = TraceRecorder(path)
+        recorder.record(["a", "two\nlines", "b"])
+        recorder.record(["a"])
+        recorder.close()
+        assert list(read_keys(path)) == ["a", "b", "a"]
+
+class TestServiceAdmission:
+    """Test admission in the lookup path"""
+    
+    def cached_keys(self, test_db):
+        with Session(test_db) as session:
+            return sorted(entry.input_text for entry in session.exec(select(CacheEntry)))
+    
+    def test_tinylfu_in_service(self, test_db, monkeypatch):
+        """Test that one-off strings are returned but stored only once seen again"""
+        monkeypatch.setattr(main, "admission", create_policy("tinylfu", width=1024))
+        assert main.get_cached_results(["once", "twice"]) == {"once": "ONCE", "twice": "TWICE"}
+        assert self.cached_keys(test_db) == []
+        
+        main.get_cached_results(["twice"])
+        assert self.cached_keys(test_db) == ["twice"]
+        assert main.l1_cache.get("twice") == "TWICE"
+        assert main.admission.stats()["hit_ratio"] == 0
+    
+    def test_bypass_and_size_limit(self, test_db, monkeypatch):
+        """Test that short inputs skip every tier and oversized values are not stored"""
+        monkeypatch.setattr(main, "admission", create_policy("always", max_value_bytes=10, bypass_max_chars=2))
+        stats = main.ResolveStats()
+        results = main.get_cached_results(["ab", "fits", "far too long to keep"], stats)
+        
+        assert results["ab"] == "AB"
+        assert stats.bypassed == 1
+        assert stats.misses == 2
+        assert self.cached_keys(test_db) == ["fits"]
+    
+    def test_preload_ignores_policy(self, test_db, monkeypatch, tmp_path):
+        """Test that warm-up strings are stored on first sight and not traced"""
+        monkeypatch.setattr(main, "admission", create_policy("tinylfu", width=1024))
+        recorder = TraceRecorder(str(tmp_path / "trace.txt"))
+        monkeypatch.setattr(main, "trace_recorder", recorder)
+        main.get_cached_results(["warm"], preload=True)
+        main.get_cached_results(["traced"])
+        recorder.close()
+        
+        assert self.cached_keys(test_db) == ["warm"]
+        assert list(read_keys(recorder.path)) == ["traced"]
+    
+    def test_stats_endpoint(self, client):
+        """Test that the admission policy is reported in /cache/stats"""
+        client.post("/payload", json={"list_1": ["hello"], "list_2": ["world"]})
+        admission = client.get("/cache/stats").json()["admission"]
+        assert admission["policy"] == "always"
+        assert admission["admitted"] >= 2
@@ -1,4 +1,6 @@
 """Tests for API endpoints"""
+import main
+from content_store import content_digest
 
 class TestAPIEndpoints:
     """Test API endpoints"""
@@ -79,3 +81,66 @@ class TestAPIEndpoints:
         response = client.get("/payload/invalid-uuid")
         assert response.status_code == 404
         assert "not found" in response.json()["detail"]
+
+class TestPayloadHTTPCaching:
+    """Test ETags, conditional GETs and the response cache"""
+    
+    def create(self, client, list_1=("hello", "world"), list_2=("foo", "bar")):
+        return client.post("/payload", json={"list_1": list(list_1), "list_2": list(list_2)}).json()["id"]
+    
+    def test_etag_and_cache_control(self, client, test_db):
+        """Test that responses carry the write-time content digest and an immutable Cache-Control"""
+        payload_id = self.create(client)
+        response = client.get(f"/payload/{payload_id}")
+        
+        assert response.headers["etag"] == f'"{content_digest("HELLO, FOO, WORLD, BAR")}"'
+        assert "immutable" in response.headers["cache-control"]
+    
+    def test_conditional_get_skips_output(self, client, test_db, monkeypatch):
+        """Test that a matching If-None-Match gets a 304 without the output being read"""
+        payload_id = self.create(client)
+        etag = client.get(f"/payload/{payload_id}").headers["etag"]
+        main.response_cache.clear()
+        def fail(*args):
+            raise AssertionError("output was read")
+        monkeypatch.setattr(main, "open_payload_reader", fail)
+        monkeypatch.setattr(main, "load_payload_output", fail)
+        
+        for header in (etag, f'"other", W/{etag}', "*"):
+            response = client.get(f"/payload/{payload_id}", headers={"If-None-Match": header})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+    
+    def test_stale_etag_gets_body(self, client, test_db):
+        """Test that a non-matching If-None-Match gets the full body"""
+        payload_id = self.create(client)
+        response = client.get(f"/payload/{payload_id}", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+        assert response.json() == {"output": "HELLO, FOO, WORLD, BAR"}
+    
+    def test_response_cache(self, client, test_db, monkeypatch):
+        """Test that a repeat read is served from the response cache, 304s included"""
+        payload_id = self.create(client)
+        first = client.get(f"/payload/{payload_id}")
+        def fail(*args):
+            raise AssertionError("database was queried")
+        monkeypatch.setattr(main, "open_payload_reader", fail)
+        monkeypatch.setattr(main, "load_payload_etag", fail)
+        
+        second = client.get(f"/payload/{payload_id}")
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+        assert client.get(f"/payload/{payload_id}", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+        assert main.response_cache.stats()["hits"] == 2
+    
+    def test_etag_is_layout_independent(self, client, test_db, monkeypatch):
+        """Test that plain, deduplicated and streamed payloads with one output share an ETag"""
+        plain = client.get(f"/payload/{self.create(client)}").headers["etag"]
+        monkeypatch.setattr(main, "payload_dedup", True)
+        deduplicated = client.get(f"/payload/{self.create(client)}").headers["etag"]
+        body = '["hello", "foo"]\n["world", "bar"]\n'
+        streamed_id = client.post("/payload/stream", content=body).json()["id"]
+        streamed = client.get(f"/payload/{streamed_id}").headers["etag"]
+        
+        assert plain == deduplicated == streamed
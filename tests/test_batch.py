@@ -0,0 +1,101 @@
+"""Tests for the batch payload endpoints"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+class TestBatchEndpoints:
+    """Test creating and fetching many payloads per request"""
+    
+    def test_create_and_fetch_batch(self, client, test_db):
+        """Test that a batch round-trips in request order"""
+        batch = {"payloads": [
+            {"list_1": ["hello", "world"], "list_2": ["foo", "bar"]},
+            {"list_1": ["hello"], "list_2": ["baz"]},
+            {"list_1": [], "list_2": []},
+        ]}
+        
+        response = client.post("/payloads:batch", json=batch)
+        assert response.status_code == 200
+        ids = response.json()["ids"]
+        assert len(ids) == 3
+        
+        response = client.get("/payloads", params={"ids": ",".join(ids)})
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["payloads"]] == ids
+        assert [item["output"] for item in data["payloads"]] == ["HELLO, FOO, WORLD, BAR", "HELLO, BAZ", ""]
+        assert data["missing"] == []
+    
+    def test_union_resolved_once(self, client, test_db, monkeypatch):
+        """Test that strings shared across payloads are transformed once"""
+        calls = []
+        
+        def counting_transformer(text):
+            calls.append(text)
+            return text.upper()
+        
+        monkeypatch.setattr(main, "transformer_function", counting_transformer)
+        batch = {"payloads": [{"list_1": ["a", "b"], "list_2": ["b", "c"]}, {"list_1": ["c"], "list_2": ["a"]}]}
+        
+        assert client.post("/payloads:batch", json=batch).status_code == 200
+        assert sorted(calls) == ["a", "b", "c"]
+    
+    def test_unequal_lists_rejected(self, client, test_db):
+        """Test that a mismatched pair rejects the whole batch with its index"""
+        batch = {"payloads": [{"list_1": ["a"], "list_2": ["b"]}, {"list_1": ["a"], "list_2": []}]}
+        
+        response = client.post("/payloads:batch", json=batch)
+        assert response.status_code == 400
+        assert "payload 1" in response.json()["detail"]
+    
+    def test_batch_size_limit(self, client, test_db, monkeypatch):
+        """Test that oversized batches are rejected"""
+        monkeypatch.setattr(main.settings, "batch_max_payloads", 2)
+        batch = {"payloads": [{"list_1": ["a"], "list_2": ["b"]}] * 3}
+        
+        assert client.post("/payloads:batch", json=batch).status_code == 400
+        assert client.get("/payloads", params={"ids": "a,b,c"}).status_code == 400
+    
+    @pytest.mark.parametrize("query", ["", "?ids=", "?ids=,"])
+    def test_no_ids_rejected(self, test_db, query):
+        """Test that a read without ids is a client error, not a server error"""
+        client = TestClient(main.app, raise_server_exceptions=False)
+        response = client.get(f"/payloads{query}")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "At least one payload id is required"
+    
+    def test_missing_ids_reported(self, client, test_db):
+        """Test that unknown ids are listed instead of failing the request"""
+        payload_id = client.post("/payload", json={"list_1": ["x"], "list_2": ["y"]}).json()["id"]
+        
+        response = client.get(f"/payloads?ids={payload_id}&ids=unknown")
+        data = response.json()
+        assert [item["output"] for item in data["payloads"]] == ["X, Y"]
+        assert data["missing"] == ["unknown"]
+    
+    def test_batch_with_dedup_and_streamed_payloads(self, client, test_db, monkeypatch):
+        """Test that referenced and chunked payloads are fetched alongside plain ones"""
+        plain_id = client.post("/payload", json={"list_1": ["p"], "list_2": ["q"]}).json()["id"]
+        streamed_id = client.post("/payload/stream", content='["s", "t"]\n["u", "v"]\n').json()["id"]
+        
+        monkeypatch.setattr(main, "payload_dedup", True)
+        batch = {"payloads": [{"list_1": ["d"], "list_2": ["e"]}, {"list_1": ["d"], "list_2": ["e"]}]}
+        dedup_ids = client.post("/payloads:batch", json=batch).json()["ids"]
+        
+        response = client.get("/payloads", params={"ids": [plain_id, streamed_id, *dedup_ids]})
+        outputs = {item["id"]: item["output"] for item in response.json()["payloads"]}
+        assert outputs == {plain_id: "P, Q", streamed_id: "S, T, U, V", dedup_ids[0]: "D, E", dedup_ids[1]: "D, E"}
+    
+    def test_batch_with_write_behind(self, client, test_db, monkeypatch):
+        """Test that a deferred batch is readable before its group commit"""
+        buffer = main.WriteBehindBuffer(main.flush_buffered_rows, max_rows=10_000, max_delay_ms=60_000)
+        monkeypatch.setattr(main, "write_buffer", buffer)
+        monkeypatch.setattr(main, "write_durability", "deferred")
+        batch = {"payloads": [{"list_1": ["w"], "list_2": ["b"]}]}
+        
+        ids = client.post("/payloads:batch", json=batch).json()["ids"]
+        assert client.get("/payloads", params={"ids": ids}).json()["payloads"][0]["output"] == "W, B"
+        
+        buffer.close()
+        assert client.get("/payloads", params={"ids": ids}).json()["payloads"][0]["output"] == "W, B"
@@ -0,0 +1,174 @@
+"""Tests for the pluggable cache backends"""
+import socketserver
+import threading
+import time
+
+import pytest
+
+import main
+from cache_backends import MemoryCacheBackend, RedisCacheBackend, RedisError, SQLiteCacheBackend
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """Minimal in-process Redis-protocol server: GET/MGET/SET/MSET with expiry, AUTH and SELECT"""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.commands = []
+        self.lock = threading.Lock()
+    
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+    
+    def lookup(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        return value
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+    
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            with server.lock:
+                server.commands.append(name)
+                if name in ("PING", "AUTH", "SELECT"):
+                    reply = b"+OK\r\n"
+                elif name in ("GET", "MGET"):
+                    values = [server.lookup(key) for key in args[1:]]
+                    encoded = [b"$-1\r\n" if v is None else b"$%d\r\n%s\r\n" % (len(v), v) for v in values]
+                    reply = encoded[0] if name == "GET" else b"*%d\r\n" % len(values) + b"".join(encoded)
+                elif name == "MSET":
+                    for key, value in zip(args[1::2], args[2::2]):
+                        server.data[key] = (value, None)
+                    reply = b"+OK\r\n"
+                elif name == "SET":
+                    expires_at = None
+                    if len(args) == 5 and args[3].upper() == b"PX":
+                        expires_at = time.monotonic() + int(args[4]) / 1000
+                    server.data[args[1]] = (args[2], expires_at)
+                    reply = b"+OK\r\n"
+                else:
+                    reply = b"-ERR unknown command '%s'\r\n" % args[0]
+            self.wfile.write(reply)
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class TestMemoryBackend:
+    """Test the per-process backend"""
+    
+    def test_round_trip_and_bound(self):
+        """Test that entries round-trip and the entry bound evicts the oldest"""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set_many({"a": "A", "b": "B"})
+        assert backend.get_many(["a", "b", "c"]) == {"a": "A", "b": "B"}
+        
+        backend.set_many({"c": "C"})
+        assert backend.get_many(["a", "b", "c"]) == {"b": "B", "c": "C"}
+
+class TestSQLiteBackend:
+    """Test the CacheEntry-table backend"""
+    
+    def test_round_trip(self, test_db):
+        """Test that entries round-trip through the table and existing rows are kept"""
+        backend = SQLiteCacheBackend(lambda: test_db, chunk_size=2)
+        backend.set_many({"a": "A", "b": "B", "c": "C"})
+        backend.set_many({"a": "changed"})
+        assert backend.get_many(["a", "b", "c", "d"]) == {"a": "A", "b": "B", "c": "C"}
+
+class TestRedisBackend:
+    """Test the Redis-protocol backend against an in-process stand-in server"""
+    
+    def test_round_trip(self, resp_server):
+        """Test that entries, including non-ASCII ones, round-trip and misses are left out"""
+        backend = RedisCacheBackend(resp_server.url)
+        backend.set_many({"hello": "HELLO", "grüße": "GRÜSSE"})
+        
+        assert backend.get_many(["hello", "grüße", "missing"]) == {"hello": "HELLO", "grüße": "GRÜSSE"}
+        assert b"cache:hello" in resp_server.data
+        backend.close()
+    
+    def test_batches_are_pipelined(self, resp_server):
+        """Test that a batch spanning several chunks costs one round trip each way"""
+        backend = RedisCacheBackend(resp_server.url, chunk_size=500)
+        items = {f"key{i}": f"KEY{i}" for i in range(1200)}
+        
+        backend.set_many(items)
+        assert backend.get_many(list(items)) == items
+        
+        assert backend.stats()["round_trips"] == 2
+        assert backend.stats()["connections_opened"] == 1
+        assert resp_server.commands.count("MSET") == 3
+        assert resp_server.commands.count("MGET") == 3
+        backend.close()
+    
+    def test_ttl(self, resp_server):
+        """Test that entries are written with an expiry when a TTL is set"""
+        backend = RedisCacheBackend(resp_server.url, ttl_seconds=0.05)
+        backend.set_many({"a": "A", "b": "B"})
+        assert resp_server.commands == ["SET", "SET"]
+        assert backend.get_many(["a", "b"]) == {"a": "A", "b": "B"}
+        
+        time.sleep(0.1)
+        assert backend.get_many(["a", "b"]) == {}
+        backend.close()
+    
+    def test_auth_and_database_selection(self, resp_server):
+        """Test that credentials and a database number in the URL are sent on connect"""
+        url = resp_server.url.replace("redis://", "redis://:secret@").replace("/0", "/2")
+        backend = RedisCacheBackend(url)
+        backend.get_many(["a"])
+        assert resp_server.commands == ["AUTH", "SELECT", "MGET"]
+        backend.close()
+    
+    def test_error_reply_keeps_connection(self, resp_server):
+        """Test that an error reply raises and the pooled connection stays usable"""
+        backend = RedisCacheBackend(resp_server.url)
+        with pytest.raises(RedisError):
+            backend.pipeline([["PING"], ["NOPE"]])
+        
+        backend.set_many({"a": "A"})
+        assert backend.get_many(["a"]) == {"a": "A"}
+        assert backend.stats()["connections_opened"] == 1
+        backend.close()
+    
+    def test_workers_share_entries(self, test_db, resp_server, monkeypatch):
+        """Test that a string transformed by one worker is a hit for another"""
+        monkeypatch.setattr(main, "cache_backend", RedisCacheBackend(resp_server.url))
+        assert main.get_cached_results(["hello", "world"]) == {"hello": "HELLO", "world": "WORLD"}
+        
+        # A second process: its own backend connection and an empty L1
+        monkeypatch.setattr(main, "cache_backend", RedisCacheBackend(resp_server.url))
+        main.l1_cache.clear()
+        def transformer_function(text):
+            raise AssertionError("shared entry was recomputed")
+        monkeypatch.setattr(main, "transformer_function", transformer_function)
+        
+        stats = main.ResolveStats()
+        assert main.get_cached_results(["hello", "world"], stats) == {"hello": "HELLO", "world": "WORLD"}
+        assert stats.db_hits == 2
@@ -1,5 +1,7 @@
 """Tests for caching functionality"""
+from sqlalchemy import event
 from sqlmodel import Session, select
+import main
 from main import get_cached_result, CacheEntry
 
 class TestCaching:
@@ -58,3 +60,53 @@ class TestCaching:
         with Session(test_db) as session:
             cached_entries = session.exec(select(CacheEntry).where(CacheEntry.input_text == "persistent")).all()
             assert len(cached_entries) == 1
+    
+    def test_l1_hit_skips_database(self, test_db):
+        """Test that a warm key is served from the in-process tier"""
+        get_cached_result("warm")
+        
+        # Remove the persistent entry; the L1 tier should still answer
+        with Session(test_db) as session:
+            entry = session.exec(select(CacheEntry).where(CacheEntry.input_text == "warm")).first()
+            session.delete(entry)
+            session.commit()
+        
+        hits_before = main.l1_cache.hits
+        assert get_cached_result("warm") == "WARM"
+        assert main.l1_cache.hits == hits_before + 1
+    
+    def test_get_cached_results_deduplicates(self, test_db, monkeypatch):
+        """Test that a batch transforms each distinct miss exactly once"""
+        calls = []
+        monkeypatch.setattr(main, "transformer_function", lambda text: calls.append(text) or text.upper())
+        
+        results = main.get_cached_results(["a", "b", "a", "c", "b"])
+        assert results == {"a": "A", "b": "B", "c": "C"}
+        assert sorted(calls) == ["a", "b", "c"]
+        
+        with Session(test_db) as session:
+            assert len(session.exec(select(CacheEntry)).all()) == 3
+    
+    def test_get_cached_results_chunked_lookup(self, test_db, monkeypatch):
+        """Test that lookups spanning several IN (...) chunks resolve from the database"""
+        # The backend holds its own copy of LOOKUP_CHUNK_SIZE from init_resources
+        monkeypatch.setattr(main.cache_backend, "chunk_size", 2)
+        texts = [f"key{i}" for i in range(5)]
+        main.get_cached_results(texts)
+        main.l1_cache.clear()
+        
+        lookups = []
+        def count_lookups(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "cacheentry" in statement.lower():
+                lookups.append(statement)
+        event.listen(main.engine, "before_cursor_execute", count_lookups)
+        calls = []
+        monkeypatch.setattr(main, "transformer_function", lambda text: calls.append(text) or text.upper())
+        try:
+            results = main.get_cached_results(texts + ["fresh"])
+        finally:
+            event.remove(main.engine, "before_cursor_execute", count_lookups)
+        
+        assert results["key4"] == "KEY4"
+        assert calls == ["fresh"]
+        assert len(lookups) == 3
@@ -0,0 +1,132 @@
+"""Tests for the CLI load-generation and batch modes"""
+import asyncio
+import io
+
+import httpx
+import pytest
+
+import cli as cli_module
+import main
+from cli import CacheCLI, LoadStats
+from main import app
+from workloads import KeySampler
+
+class TestLoadStats:
+    """Test latency aggregation and reporting"""
+    
+    def test_summary_percentiles(self):
+        """Test request counts, throughput and percentiles"""
+        stats = LoadStats()
+        for ms in range(1, 101):
+            stats.record(ms / 1000, ok=ms != 100)
+        
+        summary = stats.summary(elapsed=2.0)
+        assert summary["requests"] == 100
+        assert summary["errors"] == 1
+        assert summary["requests_per_s"] == 50.0
+        assert summary["p50_ms"] == 50.0
+        assert summary["p99_ms"] == 99.0
+        assert summary["max_ms"] == 100.0
+    
+    def test_histogram_buckets(self):
+        """Test that latencies land in the bucket of their upper bound"""
+        stats = LoadStats()
+        stats.record(0.0005, ok=True)
+        stats.record(0.015, ok=True)
+        stats.record(9.0, ok=True)
+        
+        counts = dict(stats.histogram())
+        assert counts["<= 1 ms"] == 1
+        assert counts["<= 20 ms"] == 1
+        assert counts["> 5000 ms"] == 1
+    
+    def test_report_output(self):
+        """Test that the report prints the histogram and summary lines"""
+        stats = LoadStats()
+        stats.record(0.003, ok=True)
+        output = io.StringIO()
+        stats.report(1.0, output)
+        
+        text = output.getvalue()
+        assert "Latency histogram" in text
+        assert "Throughput: 1.0 req/s" in text
+
+class TestLoadMode:
+    """Test load generation against the app in-process"""
+    
+    def test_fixed_request_count(self, test_db):
+        """Test that exactly the requested number of requests is sent"""
+        cli = CacheCLI("http://test")
+        sampler = KeySampler(cardinality=20, distribution="zipf", seed=1)
+        
+        stats, elapsed = asyncio.run(cli.load(
+            sampler, pairs=3, concurrency=4, requests=25, read_back=True,
+            transport=httpx.ASGITransport(app=app),
+        ))
+        
+        assert len(stats.latencies) == 25
+        assert stats.errors == 0
+        assert elapsed > 0
+    
+    def test_duration_limit(self, test_db):
+        """Test that a duration-bound run stops on time"""
+        cli = CacheCLI("http://test")
+        sampler = KeySampler(cardinality=10, seed=1)
+        
+        stats, elapsed = asyncio.run(cli.load(
+            sampler, pairs=1, concurrency=2, duration=0.2,
+            transport=httpx.ASGITransport(app=app),
+        ))
+        
+        assert len(stats.latencies) > 0
+        assert elapsed < 2.0
+
+class TestBatchMode:
+    """Test the CLI batch requests"""
+    
+    def test_batch_round_trip(self, client, monkeypatch):
+        """Test that batch fetches are split into several GET requests"""
+        monkeypatch.setattr(cli_module, "BATCH_GET_IDS", 2)
+        cli = CacheCLI("http://testserver")
+        cli._client = client
+        payloads = [{"list_1": [f"a{i}"], "list_2": [f"b{i}"]} for i in range(5)]
+        
+        payload_ids = cli.create_payload_batch(payloads)
+        result = cli.get_payloads(payload_ids)
+        
+        assert [item["id"] for item in result["payloads"]] == payload_ids
+        assert result["payloads"][4]["output"] == "A4, B4"
+        assert result["missing"] == []
+    
+    def test_large_batch_is_split(self, client, monkeypatch):
+        """Test that batches above the server limit go out in several requests, ids kept in order"""
+        monkeypatch.setattr(main.settings, "batch_max_payloads", 2)
+        monkeypatch.setattr(cli_module, "BATCH_POST_PAYLOADS", 2)
+        monkeypatch.setattr(cli_module, "BATCH_GET_IDS", 2)
+        cli = CacheCLI("http://testserver")
+        cli._client = client
+        payloads = [{"list_1": [f"a{i}"], "list_2": [f"b{i}"]} for i in range(5)]
+        
+        payload_ids = cli.create_payload_batch(payloads)
+        assert len(payload_ids) == 5
+        assert [item["output"] for item in cli.get_payloads(payload_ids)["payloads"]] == [
+            f"A{i}, B{i}" for i in range(5)
+        ]
+    
+    def test_rejected_batch_exits_cleanly(self, client, monkeypatch, capsys):
+        """Test that a non-2xx answer prints the server's message instead of a traceback"""
+        monkeypatch.setattr(main.settings, "batch_max_payloads", 1)
+        cli = CacheCLI("http://testserver")
+        cli._client = client
+        
+        with pytest.raises(SystemExit) as exited:
+            cli.create_payload_batch([{"list_1": ["a"], "list_2": ["b"]}] * 2)
+        assert exited.value.code == 1
+        assert "HTTP 400: At most 1 payloads per batch" in capsys.readouterr().err
+    
+    def test_batch_input_formats(self):
+        """Test that bare arrays and wrapped arrays are both accepted"""
+        items = [{"list_1": ["a"], "list_2": ["b"]}]
+        
+        assert CacheCLI.validate_batch_input(items) == items
+        assert CacheCLI.validate_batch_input({"payloads": items}) == items
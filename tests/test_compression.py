@@ -0,0 +1,111 @@
+"""Tests for response compression and content negotiation"""
+import gzip
+
+import pytest
+from sqlalchemy import text
+
+import main
+from compression import compress, compressor, negotiate
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation"""
+    
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.1, gzip;q=0.2", "gzip"),
+        ("identity", None),
+        ("GZIP;Q=0.8", "gzip"),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test that q-values are honoured and ties follow the server's order"""
+        assert negotiate(header, ["br", "gzip"]) == expected
+
+class TestCompressors:
+    """Test the compressor interface"""
+    
+    def test_gzip_whole_and_streamed(self):
+        """Test that whole and chunk-by-chunk compression both decode to the input"""
+        data = b", ".join(b"HELLO WORLD %d" % i for i in range(2000))
+        assert gzip.decompress(compress(data, "gzip")) == data
+        
+        streaming = compressor("gzip", {"gzip": 1})
+        pieces = [streaming.compress(data[start:start + 1000]) for start in range(0, len(data), 1000)]
+        assert gzip.decompress(b"".join(pieces) + streaming.flush()) == data
+
+class TestCompressedResponses:
+    """Test compressed GET /payload/{id} responses"""
+    
+    LIST_1 = [f"hello world {i}" for i in range(200)]
+    LIST_2 = [f"foo bar {i}" for i in range(200)]
+    
+    @pytest.fixture(autouse=True)
+    def gzip_only(self, monkeypatch):
+        monkeypatch.setattr(main, "response_encodings", ["gzip"])
+    
+    def create(self, client):
+        return client.post("/payload", json={"list_1": self.LIST_1, "list_2": self.LIST_2}).json()["id"]
+    
+    def expected(self):
+        return {"output": ", ".join(item.upper() for pair in zip(self.LIST_1, self.LIST_2) for item in pair)}
+    
+    def test_large_body_is_compressed(self, client, test_db):
+        """Test that a body above the threshold is gzipped with its own ETag"""
+        payload_id = self.create(client)
+        response = client.get(f"/payload/{payload_id}", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert int(response.headers["content-length"]) < len(response.content) / 4
+        assert response.json() == self.expected()
+        
+        conditional = client.get(
+            f"/payload/{payload_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+        )
+        assert conditional.status_code == 304
+    
+    def test_identity_and_small_bodies(self, client, test_db):
+        """Test that clients not accepting gzip, and bodies under the threshold, are sent as they are"""
+        payload_id = self.create(client)
+        response = client.get(f"/payload/{payload_id}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == self.expected()
+        
+        small_id = client.post("/payload", json={"list_1": ["a"], "list_2": ["b"]}).json()["id"]
+        response = client.get(f"/payload/{small_id}", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    
+    def test_streamed_body_is_compressed(self, client, test_db, monkeypatch):
+        """Test that streamed outputs are compressed chunk by chunk"""
+        monkeypatch.setattr(main.settings, "stream_min_bytes", 16)
+        monkeypatch.setattr(main.settings, "stream_chunk_bytes", 500)
+        payload_id = self.create(client)
+        response = client.get(f"/payload/{payload_id}", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.json() == self.expected()
+    
+    @pytest.mark.parametrize("dedup", [False, True])
+    def test_stored_compressed(self, client, test_db, monkeypatch, dedup):
+        """Test that outputs stored compressed at write time are served without reading the output"""
+        monkeypatch.setattr(main.settings, "payload_store_encoding", "gzip")
+        monkeypatch.setattr(main, "payload_dedup", dedup)
+        payload_id = self.create(client)
+        table = "payloadblob" if dedup else "payload"
+        with test_db.connect() as connection:
+            stored = connection.execute(text(f"SELECT compressed_encoding FROM {table}")).scalar()
+        assert stored == "gzip"
+        
+        def fail(*args):
+            raise AssertionError("output was read")
+        monkeypatch.setattr(main, "open_payload_reader", fail)
+        response = client.get(f"/payload/{payload_id}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == self.expected()
@@ -0,0 +1,71 @@
+"""Load tests for the non-blocking request path"""
+import asyncio
+import time
+
+import httpx
+
+import main
+
+SLOW_TRANSFORM_SECONDS = 0.2
+
+class TestConcurrency:
+    """Test that concurrent requests overlap instead of serializing"""
+    
+    def test_concurrent_payloads_overlap(self, test_db, monkeypatch):
+        """Test that slow cache misses do not block other in-flight requests"""
+        def slow_transformer(text):
+            time.sleep(SLOW_TRANSFORM_SECONDS)
+            return text.upper()
+        
+        monkeypatch.setattr(main, "transformer_function", slow_transformer)
+        concurrency = 8
+        
+        async def run_load():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                requests = [
+                    client.post("/payload", json={"list_1": [f"left{i}"], "list_2": [f"right{i}"]})
+                    for i in range(concurrency)
+                ]
+                return await asyncio.gather(*requests)
+        
+        start = time.perf_counter()
+        responses = asyncio.run(run_load())
+        elapsed = time.perf_counter() - start
+        
+        assert all(response.status_code == 200 for response in responses)
+        # Serialized execution would take concurrency * 2 * SLOW_TRANSFORM_SECONDS
+        assert elapsed < concurrency * 2 * SLOW_TRANSFORM_SECONDS / 2
+    
+    def test_concurrent_misses_coalesce(self, test_db, monkeypatch):
+        """Test that concurrent misses on one string run the transformer once"""
+        calls = []
+        
+        def slow_transformer(text):
+            calls.append(text)
+            time.sleep(SLOW_TRANSFORM_SECONDS)
+            return text.upper()
+        
+        monkeypatch.setattr(main, "transformer_function", slow_transformer)
+        coalesced_before = main.cache_flights.coalesced
+        l1_before = main.l1_cache.stats()
+        
+        async def run_load():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                requests = [
+                    client.post("/payload", json={"list_1": ["shared"], "list_2": ["shared"]})
+                    for _ in range(5)
+                ]
+                return await asyncio.gather(*requests)
+        
+        responses = asyncio.run(run_load())
+        
+        assert all(response.status_code == 200 for response in responses)
+        assert calls == ["shared"]
+        assert main.cache_flights.coalesced - coalesced_before == 4
+        
+        # One L1 miss per request for the cold key, not a second one from the owner's re-check
+        l1_after = main.l1_cache.stats()
+        assert l1_after["misses"] - l1_before["misses"] == 5
+        assert l1_after["hits"] == l1_before["hits"]
@@ -0,0 +1,51 @@
+"""Tests for content-addressed payload storage"""
+from sqlmodel import Session, select
+
+import main
+from content_store import content_digest, request_digest
+from main import PayloadBlob, PayloadRef
+
+class TestDigests:
+    """Test request and content digests"""
+    
+    def test_request_digest_is_unambiguous(self):
+        """Test that list boundaries are part of the digest"""
+        assert request_digest(["ab"], ["c"]) != request_digest(["a"], ["bc"])
+        assert request_digest(["a", "b"], ["c", "d"]) == request_digest(["a", "b"], ["c", "d"])
+    
+    def test_content_digest(self):
+        """Test that the content digest is a fixed-width hex string"""
+        assert len(content_digest("HELLO, FOO")) == 32
+        assert content_digest("A") != content_digest("B")
+
+class TestPayloadDeduplication:
+    """Test payloads stored as references to shared blobs"""
+    
+    def test_identical_payloads_share_one_blob(self, client, test_db, monkeypatch):
+        """Test that repeat requests reuse the stored output without interleaving"""
+        monkeypatch.setattr(main, "payload_dedup", True)
+        payload_data = {"list_1": ["same", "data"], "list_2": ["test", "case"]}
+        
+        payload_id1 = client.post("/payload", json=payload_data).json()["id"]
+        
+        def fail_interleave(list_1, list_2):
+            raise AssertionError("repeat request should not interleave")
+        
+        monkeypatch.setattr(main, "interleave_outputs", fail_interleave)
+        payload_id2 = client.post("/payload", json=payload_data).json()["id"]
+        
+        assert payload_id1 != payload_id2
+        assert client.get(f"/payload/{payload_id1}").json()["output"] == "SAME, TEST, DATA, CASE"
+        assert client.get(f"/payload/{payload_id2}").json()["output"] == "SAME, TEST, DATA, CASE"
+        
+        with Session(test_db) as session:
+            assert len(session.exec(select(PayloadBlob)).all()) == 1
+            assert len(session.exec(select(PayloadRef)).all()) == 2
+    
+    def test_plain_payloads_still_readable(self, client, test_db, monkeypatch):
+        """Test that payloads stored before enabling dedup remain readable"""
+        payload_id = client.post("/payload", json={"list_1": ["old"], "list_2": ["row"]}).json()["id"]
+        
+        monkeypatch.setattr(main, "payload_dedup", True)
+        assert client.get(f"/payload/{payload_id}").json()["output"] == "OLD, ROW"
+        assert client.get("/payload/missing").status_code == 404
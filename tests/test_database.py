@@ -0,0 +1,42 @@
+"""Tests for the SQLite engine profile"""
+from sqlalchemy import text
+
+import main
+from database import SQLiteProfile, create_sqlite_engine
+
+class TestSQLiteProfile:
+    """Test per-connection PRAGMA configuration"""
+    
+    def test_profile_applied_to_connections(self, tmp_path):
+        """Test that every pooled connection gets the tuned PRAGMAs"""
+        engine = create_sqlite_engine(
+            f"sqlite:///{tmp_path}/profile.db",
+            SQLiteProfile(busy_timeout_ms=1234),
+        )
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert connection.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        engine.dispose()
+    
+    def test_unset_fields_keep_defaults(self, tmp_path):
+        """Test that None leaves SQLite's default in place"""
+        profile = SQLiteProfile(journal_mode=None, synchronous=None, mmap_size=None,
+                                cache_size=None, temp_store=None, busy_timeout_ms=None)
+        assert profile.pragmas() == []
+        
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/plain.db", profile)
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        engine.dispose()
+    
+    def test_launcher_migration_uses_service_profile(self, tmp_path):
+        """Test that a database created by the multi-worker launcher gets incremental auto-vacuum"""
+        main.migrate_database(f"sqlite:///{tmp_path}/launched.db")
+        
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/launched.db")
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA auto_vacuum")).scalar() == 2  # INCREMENTAL
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        engine.dispose()
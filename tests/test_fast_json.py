@@ -0,0 +1,91 @@
+"""Tests for fast JSON request parsing and pre-encoded payload responses"""
+import json
+
+import pytest
+from sqlalchemy import text
+
+import fast_json
+from fast_json import ShapeError, is_json_ready, parse_list_pair, parse_list_pairs
+
+class TestShapeChecks:
+    """Test request-body shape checks"""
+    
+    def test_valid_bodies(self):
+        """Test that well-formed bodies return their lists unchanged"""
+        assert parse_list_pair({"list_1": ["a"], "list_2": ["b"]}) == (["a"], ["b"])
+        assert parse_list_pairs({"payloads": [{"list_1": [], "list_2": []}]}) == [([], [])]
+    
+    @pytest.mark.parametrize("document, loc, error_type", [
+        ([], (), "dict_type"),
+        ({"list_1": []}, ("list_2",), "missing"),
+        ({"list_1": "abc", "list_2": []}, ("list_1",), "list_type"),
+        ({"list_1": ["a", 1], "list_2": []}, ("list_1", 1), "string_type"),
+        ({"list_1": [], "list_2": [None]}, ("list_2", 0), "string_type"),
+    ])
+    def test_rejected_pairs(self, document, loc, error_type):
+        """Test that the first offending field or element is reported"""
+        with pytest.raises(ShapeError) as raised:
+            parse_list_pair(document)
+        assert raised.value.loc == loc
+        assert raised.value.error_type == error_type
+    
+    def test_rejected_batch_element(self):
+        """Test that errors inside a batch carry the payload index"""
+        with pytest.raises(ShapeError) as raised:
+            parse_list_pairs({"payloads": [{"list_1": [], "list_2": []}, {"list_1": [2], "list_2": []}]})
+        assert raised.value.errors()[0]["loc"] == ("body", "payloads", 1, "list_1", 0)
+
+class TestEncoding:
+    """Test JSON encoding helpers"""
+    
+    def test_json_ready(self):
+        """Test that only text needing no escapes is flagged"""
+        assert is_json_ready("HELLO, GRÜSSE, 日本")
+        assert not is_json_ready('say "hi"')
+        assert not is_json_ready("back\\slash")
+        assert not is_json_ready("line\nbreak")
+    
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        """Test that the stdlib path produces the same documents as orjson"""
+        value = {"output": 'grüße "x"\n', "ids": [1, 2]}
+        encoded = fast_json.dumps(value)
+        monkeypatch.setattr(fast_json, "orjson", None)
+        assert fast_json.dumps(value) == encoded
+        assert fast_json.loads(encoded) == value
+        assert json.loads(fast_json.dumps(value, indent=True)) == value
+
+class TestEndpoints:
+    """Test the endpoints on the fast path"""
+    
+    def test_invalid_bodies_are_422(self, client):
+        """Test that malformed and mis-shaped bodies fail like model validation does"""
+        response = client.post("/payload", json={"list_1": ["a", 1], "list_2": ["b", "c"]})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "list_1", 1]
+        
+        response = client.post("/payload", content=b"{not json", headers={"content-type": "application/json"})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+        
+        assert client.post("/payloads:batch", json={"payloads": {}}).status_code == 422
+    
+    def test_stored_bytes_are_served(self, client, test_db):
+        """Test that outputs needing no escapes are flagged at write time and framed on read"""
+        payload_id = client.post("/payload", json={"list_1": ["grüße"], "list_2": ["x"]}).json()["id"]
+        with test_db.connect() as connection:
+            assert connection.execute(text("SELECT json_ready FROM payload")).scalar() == 1
+        
+        response = client.get(f"/payload/{payload_id}")
+        assert response.content == '{"output":"GRÜSSE, X"}'.encode("utf-8")
+        assert response.headers["content-type"] == "application/json"
+    
+    def test_outputs_needing_escapes(self, client, test_db):
+        """Test that outputs with quotes, and rows written before the flag existed, are encoded on read"""
+        payload_id = client.post("/payload", json={"list_1": ['"a"'], "list_2": ["b\n"]}).json()["id"]
+        assert client.get(f"/payload/{payload_id}").json() == {"output": '"A", B\n'}
+        
+        with test_db.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO payload (id, output, created_at) VALUES ('legacy', 'OLD \"ROW\"', '2024-01-01')"
+            ))
+        assert client.get("/payload/legacy").json() == {"output": 'OLD "ROW"'}
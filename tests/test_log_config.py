@@ -0,0 +1,47 @@
+"""Tests for structured, sampled logging"""
+import json
+import logging
+
+import log_config
+from log_config import StructuredFormatter, debug_sampled, preview
+
+class TestLogConfig:
+    """Test the logging subsystem"""
+    
+    def test_structured_formatter_merges_fields(self):
+        """Test that summary fields become top-level JSON keys"""
+        record = logging.LogRecord("main", logging.INFO, __file__, 1, "payload created", (), None)
+        record.fields = {"payload_id": "abc", "misses": 2}
+        
+        entry = json.loads(StructuredFormatter().format(record))
+        assert entry["message"] == "payload created"
+        assert entry["payload_id"] == "abc"
+        assert entry["misses"] == 2
+    
+    def test_debug_sampling(self, monkeypatch):
+        """Test that per-key debug records follow the sample rate and level"""
+        logger = logging.getLogger("tests.sampling")
+        logger.setLevel(logging.DEBUG)
+        
+        monkeypatch.setattr(log_config, "_debug_sample_rate", 0.0)
+        assert not debug_sampled(logger)
+        
+        monkeypatch.setattr(log_config, "_debug_sample_rate", 1.0)
+        assert debug_sampled(logger)
+        
+        logger.setLevel(logging.INFO)
+        assert not debug_sampled(logger)
+    
+    def test_preview_truncates_user_text(self):
+        """Test that long inputs are shortened in debug records"""
+        assert preview("short") == "short"
+        assert len(preview("x" * 1000)) == log_config.PREVIEW_CHARS + 1
+    
+    def test_payload_request_logs_one_summary(self, client, test_db, caplog):
+        """Test that creating a payload emits one summary record, not one per string"""
+        with caplog.at_level(logging.INFO, logger="main"):
+            client.post("/payload", json={"list_1": [f"a{i}" for i in range(50)], "list_2": [f"b{i}" for i in range(50)]})
+        
+        records = [record for record in caplog.records if record.name == "main"]
+        assert [record.getMessage() for record in records] == ["payload created"]
+        assert records[0].fields["misses"] == 100
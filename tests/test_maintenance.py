@@ -0,0 +1,275 @@
+"""Tests for cache eviction, payload retention and storage maintenance"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, text
+from sqlmodel import Session, select
+
+import main
+from database import SQLiteProfile, add_missing_columns, create_sqlite_engine
+from admission import create_policy
+from main import CacheEntry, Payload, PayloadBlob, PayloadChunk, PayloadDigest
+from maintenance import (
+    AccessTracker,
+    MaintenanceWorker,
+    acquire_process_lock,
+    delete_in_batches,
+    incremental_vacuum,
+    table_text_bytes,
+)
+
+class TestAccessTracker:
+    """Test in-memory access stamp collection"""
+    
+    def test_touch_and_drain(self):
+        """Test that accesses are counted per key and cleared on drain"""
+        now = [100.0]
+        tracker = AccessTracker(clock=lambda: now[0])
+        tracker.touch(["a", "b"])
+        now[0] = 105.0
+        tracker.touch(["a"])
+        
+        assert tracker.drain() == {"a": (105.0, 2), "b": (100.0, 1)}
+        assert tracker.drain() == {}
+    
+    def test_bounded_keys(self):
+        """Test that keys beyond the limit are dropped, not stored"""
+        tracker = AccessTracker(max_keys=2)
+        tracker.touch(["a", "b", "c"])
+        
+        assert len(tracker) == 2
+        assert tracker.dropped == 1
+
+class TestStorageHelpers:
+    """Test batch deletes, vacuum and schema migration"""
+    
+    def test_delete_in_batches_respects_limit(self, tmp_path):
+        """Test that deletion stops after the requested number of rows"""
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/batches.db")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO t (id) VALUES (:id)"), [{"id": i} for i in range(25)])
+        
+        statement = "DELETE FROM t WHERE id IN (SELECT id FROM t ORDER BY id LIMIT :batch)"
+        assert delete_in_batches(engine, statement, batch_size=4, limit=10, pause=0) == 10
+        assert delete_in_batches(engine, statement, batch_size=4, pause=0) == 15
+        engine.dispose()
+    
+    def test_process_lock_has_one_owner(self, tmp_path):
+        """Test that the maintenance lock is held by one owner at a time"""
+        path = str(tmp_path / "cache.db-maintenance.lock")
+        owner = acquire_process_lock(path)
+        assert owner is not None
+        assert acquire_process_lock(path) is None
+        
+        os.close(owner)
+        second = acquire_process_lock(path)
+        assert second is not None
+        os.close(second)
+    
+    def test_incremental_vacuum_releases_pages(self, tmp_path):
+        """Test that free pages are returned on an auto_vacuum=INCREMENTAL database"""
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/vacuum.db", SQLiteProfile(auto_vacuum="INCREMENTAL"))
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT)"))
+            connection.execute(text("INSERT INTO t (body) VALUES (:body)"), [{"body": "x" * 4000}] * 200)
+            connection.execute(text("DELETE FROM t"))
+        
+        assert incremental_vacuum(engine, 1000) > 0
+        engine.dispose()
+    
+    def test_add_missing_columns(self, tmp_path):
+        """Test that a table from an older version gains new columns and indexes"""
+        metadata = MetaData()
+        widgets = Table(
+            "widgets", metadata,
+            Column("id", Integer, primary_key=True),
+            Column("hits", Integer, nullable=False, server_default=text("0"), index=True),
+        )
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/old.db")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE widgets (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO widgets (id) VALUES (1)"))
+        
+        assert add_missing_columns(engine, widgets) == ["hits"]
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT hits FROM widgets")).scalar() == 0
+            indexes = {row[1] for row in connection.execute(text("PRAGMA index_list(widgets)"))}
+        assert "ix_widgets_hits" in indexes
+        assert add_missing_columns(engine, widgets) == []
+        engine.dispose()
+
+class TestMaintenancePass:
+    """Test eviction and retention against the service tables"""
+    
+    def cache_keys(self, engine):
+        with Session(engine) as session:
+            return set(session.exec(select(CacheEntry.input_text)))
+    
+    def test_lru_keeps_recently_used(self, client, test_db, monkeypatch):
+        """Test that the row bound evicts the least recently used entries"""
+        monkeypatch.setattr(main.settings, "cache_max_rows", 2)
+        monkeypatch.setattr(main, "access_tracker", AccessTracker())
+        client.post("/payload", json={"list_1": ["a", "b"], "list_2": ["c", "d"]})
+        
+        main.l1_cache.clear()
+        main.access_tracker.touch(["a", "c"])
+        result = main.run_maintenance()
+        
+        assert result["cache_evicted"] == 2
+        assert self.cache_keys(test_db) == {"a", "c"}
+    
+    def test_lfu_keeps_frequently_used(self, client, test_db, monkeypatch):
+        """Test that LFU eviction keeps the entries with the most hits"""
+        monkeypatch.setattr(main.settings, "cache_max_rows", 1)
+        monkeypatch.setattr(main.settings, "cache_eviction_policy", "lfu")
+        monkeypatch.setattr(main, "access_tracker", AccessTracker())
+        client.post("/payload", json={"list_1": ["hot"], "list_2": ["cold"]})
+        
+        for _ in range(3):
+            main.access_tracker.touch(["hot"])
+        main.access_tracker.touch(["cold"])
+        main.run_maintenance()
+        
+        assert self.cache_keys(test_db) == {"hot"}
+    
+    def test_byte_bound_counts_cache_entries_only(self, client, test_db, monkeypatch):
+        """Test that large payloads do not empty the cache, and the byte bound evicts down to the limit"""
+        keys = [f"key{i:04d}" for i in range(300)]
+        main.get_cached_results(keys)
+        big = ["x" * 1000] * 300
+        main.build_payload("big", big, big)
+        
+        # 300 entries of 7 + 7 bytes and one of 2000, far below the limit though the payload is ~600 KB
+        monkeypatch.setattr(main.settings, "cache_max_bytes", 200_000)
+        assert main.evict_cache_entries()["cache_evicted"] == 0
+        assert len(self.cache_keys(test_db)) == 301
+        
+        monkeypatch.setattr(main.settings, "cache_max_bytes", 3000)
+        monkeypatch.setattr(main.settings, "maintenance_batch_rows", 10)
+        evicted = main.evict_cache_entries()["cache_evicted"]
+        remaining = table_text_bytes(test_db, "cacheentry", main.CACHE_ENTRY_TEXT_COLUMNS)
+        assert 0 < evicted < 301
+        # Eviction stops within one batch of the limit
+        assert 3000 - 2000 - 10 * 14 < remaining <= 3000
+    
+    @pytest.mark.parametrize("bound, limit, expected", [("cache_max_rows", 1000, 1000), ("cache_max_bytes", 14_000, 1000)])
+    def test_concurrent_passes_do_not_over_evict(self, test_db, monkeypatch, bound, limit, expected):
+        """Test that two eviction passes at once, as from two worker processes, stop at the bound"""
+        main.get_cached_results([f"key{i:04d}" for i in range(2000)])  # 7 + 7 bytes each
+        monkeypatch.setattr(main.settings, bound, limit)
+        monkeypatch.setattr(main.settings, "maintenance_batch_rows", 100)
+        
+        start = threading.Barrier(2)
+        evicted = []
+        def run_pass():
+            start.wait()
+            evicted.append(main.evict_cache_entries()["cache_evicted"])
+        threads = [threading.Thread(target=run_pass) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(self.cache_keys(test_db)) == expected
+        assert sum(evicted) == 2000 - expected
+    
+    def test_other_workers_only_flush_stamps(self, client, test_db, monkeypatch):
+        """Test that a worker without the maintenance lock leaves eviction to the one holding it"""
+        monkeypatch.setattr(main.settings, "cache_max_rows", 0)
+        monkeypatch.setattr(main, "owns_maintenance", False)
+        client.post("/payload", json={"list_1": ["a"], "list_2": ["b"]})
+        
+        assert main.run_maintenance() == {"access_stamps": 0}
+        assert self.cache_keys(test_db) == {"a", "b"}
+    
+    def test_hits_are_tracked(self, client, test_db, monkeypatch):
+        """Test that cache hits are recorded and flushed as access stamps"""
+        monkeypatch.setattr(main, "access_tracker", AccessTracker())
+        client.post("/payload", json={"list_1": ["x"], "list_2": ["y"]})
+        client.post("/payload", json={"list_1": ["x"], "list_2": ["y"]})
+        
+        assert main.run_maintenance()["access_stamps"] == 2
+        with Session(test_db) as session:
+            assert session.exec(select(CacheEntry.hits).where(CacheEntry.input_text == "x")).one() == 1
+    
+    def test_only_cache_hits_are_touched(self, test_db, monkeypatch):
+        """Test that bypassed and freshly transformed keys are not recorded as accesses"""
+        monkeypatch.setattr(main, "admission", create_policy("always", bypass_max_chars=1))
+        main.get_cached_results(["l1", "db"])
+        main.l1_cache.clear()
+        main.l1_cache.set("l1", "L1")
+        monkeypatch.setattr(main, "access_tracker", AccessTracker())
+        
+        main.get_cached_results(["l1", "db", "new", "x"])
+        
+        assert set(main.access_tracker.drain()) == {"l1", "db"}
+    
+    def test_cache_ttl(self, client, test_db, monkeypatch):
+        """Test that entries older than the TTL are removed"""
+        client.post("/payload", json={"list_1": ["old"], "list_2": ["entry"]})
+        monkeypatch.setattr(main.settings, "cache_ttl_seconds", -1.0)
+        
+        assert main.run_maintenance()["cache_expired"] == 2
+        assert self.cache_keys(test_db) == set()
+    
+    def test_payload_retention(self, client, test_db, monkeypatch):
+        """Test that expired plain, streamed and referenced payloads are removed with unused blobs"""
+        plain_id = client.post("/payload", json={"list_1": ["p"], "list_2": ["q"]}).json()["id"]
+        streamed_id = client.post("/payload/stream", content='["s", "t"]\n').json()["id"]
+        monkeypatch.setattr(main, "payload_dedup", True)
+        dedup_id = client.post("/payload", json={"list_1": ["d"], "list_2": ["e"]}).json()["id"]
+        
+        monkeypatch.setattr(main.settings, "payload_ttl_seconds", -1.0)
+        result = main.run_maintenance()
+        
+        assert result["payloads_expired"] == 3
+        assert result["blobs_collected"] == 1
+        for payload_id in (plain_id, streamed_id, dedup_id):
+            assert client.get(f"/payload/{payload_id}").status_code == 404
+        with Session(test_db) as session:
+            assert session.exec(select(Payload)).all() == []
+            assert session.exec(select(PayloadBlob)).all() == []
+            assert session.exec(select(PayloadDigest)).all() == []
+    
+    def test_orphan_chunks_swept(self, client, test_db, monkeypatch):
+        """Test that chunks of an abandoned ingest are deleted while published and recent ones stay"""
+        streamed_id = client.post("/payload/stream", content='["s", "t"]\n').json()["id"]
+        stale = (datetime.now() - timedelta(hours=2)).isoformat()
+        with Session(test_db) as session:
+            session.add(PayloadChunk(payload_id="abandoned", seq=0, output="A", created_at=stale))
+            session.add(PayloadChunk(payload_id="abandoned", seq=1, output=", B", created_at=stale))
+            session.add(PayloadChunk(payload_id="slow", seq=0, output="C", created_at=stale))
+            session.add(PayloadChunk(payload_id="slow", seq=1, output=", D", created_at=datetime.now().isoformat()))
+            session.execute(text("UPDATE payloadchunk SET created_at = :stale WHERE payload_id = :id"),
+                            {"stale": stale, "id": streamed_id})
+            session.commit()
+        
+        assert main.run_maintenance()["chunks_orphaned"] == 2
+        with Session(test_db) as session:
+            remaining = {chunk.payload_id for chunk in session.exec(select(PayloadChunk))}
+        assert remaining == {streamed_id, "slow"}
+        assert client.get(f"/payload/{streamed_id}").json()["output"] == "S, T"
+    
+    def test_repeat_after_blob_collected(self, client, test_db, monkeypatch):
+        """Test that a repeated dedup request stores a fresh blob once the old one is gone"""
+        monkeypatch.setattr(main, "payload_dedup", True)
+        body = {"list_1": ["r"], "list_2": ["s"]}
+        client.post("/payload", json=body)
+        with Session(test_db) as session:
+            session.exec(text("DELETE FROM payloadref"))
+            session.commit()
+        main.collect_orphan_blobs()
+        
+        payload_id = client.post("/payload", json=body).json()["id"]
+        assert client.get(f"/payload/{payload_id}").json()["output"] == "R, S"
+    
+    def test_worker_totals(self):
+        """Test that the worker accumulates per-pass counts"""
+        worker = MaintenanceWorker(lambda: {"evicted": 2}, interval=60)
+        worker.run_once()
+        worker.run_once()
+        
+        assert worker.stats() == {"runs": 2, "errors": 0, "evicted": 4}
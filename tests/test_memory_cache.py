@@ -0,0 +1,95 @@
+"""Tests for the in-process LRU/TTL cache"""
+from memory_cache import LRUCache, ResponseCache
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class TestLRUCache:
+    """Test the L1 cache tier"""
+    
+    def test_get_and_set(self):
+        """Test basic hit and miss accounting"""
+        cache = LRUCache()
+        assert cache.get("hello") is None
+        
+        cache.set("hello", "HELLO")
+        assert cache.get("hello") == "HELLO"
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+    
+    def test_peek_leaves_counters_and_order(self):
+        """Test that peek neither counts nor refreshes an entry"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        assert cache.peek("a") == "A"
+        assert cache.peek("missing") is None
+        cache.set("c", "C")
+        
+        assert "a" not in cache
+        assert cache.stats()["hits"] == 0
+        assert cache.stats()["misses"] == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the entry limit evicts the least recently used key"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", "C")
+        
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+    
+    def test_byte_limit(self):
+        """Test that the byte limit bounds total size"""
+        cache = LRUCache(max_bytes=10)
+        cache.set("abc", "ABC")  # 6 bytes
+        cache.set("de", "DE")    # 4 bytes
+        cache.set("f", "F")      # 2 bytes -> evicts "abc"
+        
+        assert "abc" not in cache
+        assert cache.stats()["bytes"] == 6
+        
+        # Values larger than the whole budget are never cached
+        cache.set("toolarge", "TOOLARGE")
+        assert "toolarge" not in cache
+    
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL"""
+        clock = FakeClock()
+        cache = LRUCache(ttl_seconds=5, clock=clock)
+        cache.set("hello", "HELLO")
+        
+        clock.now = 4.9
+        assert cache.get("hello") == "HELLO"
+        
+        clock.now = 5.0
+        assert cache.get("hello") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+class TestResponseCache:
+    """Test the cache of encoded response bodies"""
+    
+    def test_sized_by_body(self):
+        """Test that entries are sized by id, ETag and body bytes"""
+        cache = ResponseCache(max_bytes=20)
+        cache.set("a", ("e1", "gzip", b"0123456789"))  # 13 bytes
+        assert cache.get("a") == ("e1", "gzip", b"0123456789")
+        assert cache.stats()["bytes"] == 13
+        
+        cache.set("b", (None, None, b"0123456"))  # 8 bytes -> evicts "a"
+        assert "a" not in cache
+        assert cache.get("b") == (None, None, b"0123456")
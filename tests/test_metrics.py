@@ -0,0 +1,55 @@
+"""Tests for metrics collection and the /metrics endpoint"""
+import metrics
+from metrics import Counter, Histogram, Registry
+
+class TestRegistry:
+    """Test metric families and text exposition"""
+    
+    def test_counter_and_histogram_render(self):
+        """Test Prometheus text output for labelled metrics"""
+        registry = Registry()
+        counter = Counter(registry, "lookups_total", "Lookups", ["tier"])
+        histogram = Histogram(registry, "latency_seconds", "Latency", buckets=(0.1, 1.0))
+        counter.inc("l1", amount=3)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        
+        text = registry.render()
+        assert 'lookups_total{tier="l1"} 3' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+        assert "latency_seconds_count 2" in text
+    
+    def test_disabled_registry_records_nothing(self):
+        """Test that recording is a no-op while metrics are off"""
+        registry = Registry(enabled=False)
+        counter = Counter(registry, "lookups_total", "Lookups")
+        histogram = Histogram(registry, "latency_seconds", "Latency")
+        counter.inc()
+        with histogram.time():
+            pass
+        
+        assert counter.value() == 0
+        assert histogram.count() == 0
+
+class TestMetricsEndpoint:
+    """Test the service metrics"""
+    
+    def test_metrics_cover_cache_and_requests(self, client, test_db):
+        """Test that cache counters and request latencies are exposed"""
+        misses_before = metrics.CACHE_LOOKUPS.value("db", "miss")
+        client.post("/payload", json={"list_1": ["metric"], "list_2": ["metric"]})
+        client.post("/payload", json={"list_1": ["metric"], "list_2": ["other"]})
+        
+        assert metrics.CACHE_LOOKUPS.value("db", "miss") - misses_before == 2
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'cache_lookups_total{tier="l1",result="hit"}' in response.text
+        assert 'http_request_duration_seconds_count{method="POST",route="/payload",status="200"}' in response.text
+        assert 'service_resource_usage{resource="l1_entries"}' in response.text
+    
+    def test_metrics_disabled(self, client, monkeypatch):
+        """Test that /metrics is unavailable when metrics are off"""
+        monkeypatch.setattr(metrics.registry, "enabled", False)
+        assert client.get("/metrics").status_code == 404
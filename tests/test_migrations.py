@@ -0,0 +1,94 @@
+"""Tests for the hash-keyed CacheEntry layout and its migration"""
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+import cache_backends
+import main
+from content_store import key_hash
+from database import create_sqlite_engine
+from migrations import ensure_schema, migrate_cache_entry_keys
+from models import SCHEMA_VERSION, CacheEntry
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE cacheentry (id INTEGER PRIMARY KEY, input_text VARCHAR NOT NULL UNIQUE, "
+    "transformed_text VARCHAR NOT NULL, last_access FLOAT NOT NULL DEFAULT 0)"
+)
+
+class TestKeyHash:
+    """Test the cache key hash"""
+    
+    def test_fixed_width_signed(self):
+        """Test that hashes are stable and fit a signed 64-bit rowid"""
+        assert key_hash("hello") == key_hash("hello")
+        assert key_hash("hello") != key_hash("hellp")
+        for value in ("", "a", "ü" * 1000):
+            assert -(2 ** 63) <= key_hash(value) < 2 ** 63
+
+class TestHashKeyedLookups:
+    """Test collision verification on lookups"""
+    
+    def test_collision_is_a_miss(self, test_db, monkeypatch):
+        """Test that a row stored for another string with the same hash is never returned"""
+        monkeypatch.setattr(cache_backends, "key_hash", lambda value: 42)
+        
+        assert main.get_cached_result("first") == "FIRST"
+        main.l1_cache.clear()
+        assert main.get_cached_result("second") == "SECOND"
+        
+        # Only the first string could be stored under the shared key
+        with Session(test_db) as session:
+            assert session.exec(select(CacheEntry.input_text)).all() == ["first"]
+        main.l1_cache.clear()
+        assert main.get_cached_results(["first", "second"]) == {"first": "FIRST", "second": "SECOND"}
+
+class TestMigration:
+    """Test moving an id-keyed CacheEntry table to hash keys"""
+    
+    def test_migrates_rows_and_stamps(self, tmp_path):
+        """Test that rows and access stamps survive the rebuild"""
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/legacy.db")
+        with engine.begin() as connection:
+            connection.execute(text(LEGACY_SCHEMA))
+            connection.execute(text("CREATE INDEX ix_cacheentry_last_access ON cacheentry (last_access)"))
+            connection.execute(
+                text("INSERT INTO cacheentry (input_text, transformed_text, last_access) VALUES (:i, :t, :a)"),
+                [{"i": f"key{n}", "t": f"KEY{n}", "a": float(n)} for n in range(25)],
+            )
+        
+        assert migrate_cache_entry_keys(engine, batch_rows=10) == 25
+        assert migrate_cache_entry_keys(engine) is None
+        
+        with Session(engine) as session:
+            entry = session.get(CacheEntry, key_hash("key7"))
+            assert (entry.input_text, entry.transformed_text, entry.last_access, entry.hits) == ("key7", "KEY7", 7.0, 0)
+            assert len(session.exec(select(CacheEntry)).all()) == 25
+        with engine.connect() as connection:
+            tables = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            indexes = {row[1] for row in connection.execute(text("PRAGMA index_list(cacheentry)"))}
+        assert "cacheentry_legacy" not in tables
+        assert "ix_cacheentry_last_access" in indexes
+        engine.dispose()
+    
+    def test_nothing_to_migrate(self, tmp_path):
+        """Test that a missing table is left for create_all"""
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/empty.db")
+        assert migrate_cache_entry_keys(engine) is None
+        engine.dispose()
+    
+    def test_ensure_schema_stamps_version(self, tmp_path):
+        """Test that a legacy file is upgraded once and later starts skip all DDL"""
+        engine = create_sqlite_engine(f"sqlite:///{tmp_path}/legacy.db")
+        with engine.begin() as connection:
+            connection.execute(text(LEGACY_SCHEMA))
+            connection.execute(text("INSERT INTO cacheentry (input_text, transformed_text) VALUES ('a', 'A')"))
+        
+        assert ensure_schema(engine) is True
+        assert ensure_schema(engine) is False
+        
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+            tables = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        assert {"cacheentry", "payload", "payloadblob"} <= tables
+        with Session(engine) as session:
+            assert session.get(CacheEntry, key_hash("a")).transformed_text == "A"
+        engine.dispose()
@@ -0,0 +1,71 @@
+"""Tests for streaming NDJSON payload ingestion"""
+import asyncio
+
+import pytest
+from sqlmodel import Session, select
+
+import main
+from main import PayloadChunk
+from ndjson_ingest import IngestError, iter_pair_chunks
+
+async def collect(chunks, chunk_pairs):
+    """Run the parser over a list of body chunks"""
+    async def body():
+        for chunk in chunks:
+            yield chunk
+    return [pairs async for pairs in iter_pair_chunks(body(), chunk_pairs)]
+
+class TestPairParser:
+    """Test incremental NDJSON parsing"""
+    
+    def test_lines_split_across_chunks(self):
+        """Test that lines spanning body chunks are reassembled and grouped"""
+        chunks = [b'["a", "b"]\n["c", ', b'"d"]\n\n["e", "f"]']
+        result = asyncio.run(collect(chunks, chunk_pairs=2))
+        assert result == [[("a", "b"), ("c", "d")], [("e", "f")]]
+    
+    def test_invalid_line(self):
+        """Test that a malformed line reports its line number"""
+        with pytest.raises(IngestError, match="Line 2"):
+            asyncio.run(collect([b'["a", "b"]\n["c"]\n'], chunk_pairs=10))
+
+    def test_lone_surrogate(self):
+        """Test that a string that cannot be encoded to UTF-8 is rejected like malformed JSON"""
+        with pytest.raises(IngestError, match="Line 1: invalid JSON"):
+            asyncio.run(collect([b'["\\ud800", "x"]\n'], chunk_pairs=10))
+
+class TestStreamEndpoint:
+    """Test POST /payload/stream"""
+    
+    def test_streamed_payload_matches_regular_payload(self, client, test_db, monkeypatch):
+        """Test that chunked ingestion produces the same output as POST /payload"""
+        monkeypatch.setattr(main.settings, "ingest_chunk_pairs", 2)
+        list_1 = ["hello", "world", "test"]
+        list_2 = ["foo", "bar", "data"]
+        body = "".join(f'["{a}", "{b}"]\n' for a, b in zip(list_1, list_2))
+        
+        response = client.post("/payload/stream", content=body, headers={"content-type": "application/x-ndjson"})
+        assert response.status_code == 200
+        payload_id = response.json()["id"]
+        
+        expected = client.post("/payload", json={"list_1": list_1, "list_2": list_2}).json()["id"]
+        assert client.get(f"/payload/{payload_id}").json() == client.get(f"/payload/{expected}").json()
+        
+        monkeypatch.setattr(main.settings, "stream_min_bytes", 1)
+        assert client.get(f"/payload/{payload_id}").json()["output"] == "HELLO, FOO, WORLD, BAR, TEST, DATA"
+    
+    def test_invalid_body_leaves_no_chunks(self, client, test_db, monkeypatch):
+        """Test that a rejected stream removes the chunks already stored"""
+        monkeypatch.setattr(main.settings, "ingest_chunk_pairs", 1)
+        response = client.post("/payload/stream", content='["a", "b"]\nnot json\n')
+        
+        assert response.status_code == 400
+        assert "Line 2" in response.json()["detail"]
+        with Session(test_db) as session:
+            assert session.exec(select(PayloadChunk)).all() == []
+    
+    def test_lone_surrogate_is_400(self, client, test_db):
+        """Test that a lone surrogate is a client error, as it is for POST /payload"""
+        response = client.post("/payload/stream", content=b'["\\ud800", "x"]\n')
+        assert response.status_code == 400
+        assert "Line 1" in response.json()["detail"]
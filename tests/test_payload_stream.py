@@ -0,0 +1,42 @@
+"""Tests for streaming payload responses"""
+import json
+
+import main
+from payload_stream import JSONStringEncoder
+
+class TestJSONStringEncoder:
+    """Test chunked JSON string escaping"""
+    
+    def test_split_multibyte_character(self):
+        """Test that a character split across chunks is escaped once it is complete"""
+        encoder = JSONStringEncoder()
+        data = 'é"\n'.encode("utf-8")
+        pieces = [encoder.encode(data[:1]), encoder.encode(data[1:]), encoder.encode(b"", final=True)]
+        assert b"".join(pieces) == 'é\\"\\n'.encode("utf-8")
+
+class TestStreamingResponse:
+    """Test GET /payload/{id} streaming from storage"""
+    
+    def test_large_payload_is_streamed(self, client, test_db, monkeypatch):
+        """Test that outputs above the threshold stream in chunks and decode intact"""
+        monkeypatch.setattr(main.settings, "stream_min_bytes", 16)
+        monkeypatch.setattr(main.settings, "stream_chunk_bytes", 7)
+        list_1 = [f'héllo "{i}"' for i in range(50)]
+        list_2 = [f"wörld {i}" for i in range(50)]
+        
+        payload_id = client.post("/payload", json={"list_1": list_1, "list_2": list_2}).json()["id"]
+        response = client.get(f"/payload/{payload_id}")
+        
+        expected = ", ".join(item.upper() for pair in zip(list_1, list_2) for item in pair)
+        assert response.status_code == 200
+        assert "content-length" not in response.headers
+        assert json.loads(response.content) == {"output": expected}
+    
+    def test_streamed_deduplicated_payload(self, client, test_db, monkeypatch):
+        """Test streaming an output stored as a content-addressed blob"""
+        monkeypatch.setattr(main.settings, "stream_min_bytes", 1)
+        monkeypatch.setattr(main, "payload_dedup", True)
+        
+        payload_id = client.post("/payload", json={"list_1": ["a", "b"], "list_2": ["c", "d"]}).json()["id"]
+        assert client.get(f"/payload/{payload_id}").json() == {"output": "A, C, B, D"}
+        assert client.get("/payload/missing").status_code == 404
@@ -0,0 +1,113 @@
+"""Tests for the cross-process hot-key cache"""
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+import main
+from cache_backends import MemoryCacheBackend
+from shared_cache import SharedHotCache
+
+ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture
+def table(tmp_path):
+    cache = SharedHotCache(str(tmp_path / "hot.shm"), slots=64, slot_bytes=128)
+    yield cache
+    cache.close()
+
+class TestSharedHotCache:
+    """Test the memory-mapped table"""
+    
+    def test_round_trip(self, table):
+        """Test that entries are read back, replaced in place and missed when absent"""
+        assert table.set("hello", "HELLO")
+        assert table.set_many({"grüße": "GRÜSSE", "x": "X"}) == 2
+        assert table.get("hello") == "HELLO"
+        assert table.get_many(["grüße", "x", "missing"]) == {"grüße": "GRÜSSE", "x": "X"}
+        
+        table.set("hello", "HI")
+        assert table.get("hello") == "HI"
+        assert table.stats()["hits"] == 4
+        assert table.stats()["misses"] == 1
+    
+    def test_oversized_entries_are_skipped(self, table):
+        """Test that an entry larger than a slot is not stored"""
+        assert not table.set("big", "B" * 200)
+        assert table.get("big") is None
+        assert table.stats()["oversized"] == 1
+    
+    def test_full_buckets_keep_working(self, table):
+        """Test that writing more keys than slots evicts entries without corrupting others"""
+        items = {f"key{i}": f"KEY{i}" for i in range(500)}
+        table.set_many(items)
+        found = table.get_many(items)
+        assert 0 < len(found) <= 64
+        assert all(items[key] == value for key, value in found.items())
+    
+    def test_ttl(self, tmp_path):
+        """Test that entries expire after the TTL"""
+        now = [1000.0]
+        cache = SharedHotCache(str(tmp_path / "ttl.shm"), slots=8, ttl_seconds=10, clock=lambda: now[0])
+        cache.set("a", "A")
+        now[0] += 11
+        assert cache.get("a") is None
+        cache.close()
+    
+    def test_layout_mismatch(self, table):
+        """Test that a file sized for another layout is refused"""
+        with pytest.raises(ValueError):
+            SharedHotCache(table.path, slots=64, slot_bytes=256)
+    
+    def test_visible_across_processes(self, table):
+        """Test that an entry written by another process is a hit here"""
+        code = (
+            "from shared_cache import SharedHotCache; "
+            f"SharedHotCache({table.path!r}, slots=64, slot_bytes=128).set('child', 'CHILD')"
+        )
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        assert table.get("child") == "CHILD"
+    
+    def test_concurrent_writers(self, table):
+        """Test that readers never see a torn value while threads overwrite the same keys"""
+        errors = []
+        
+        def write(worker):
+            for i in range(300):
+                table.set(f"key{i % 8}", f"value{i % 8}-{worker}")
+        
+        def read():
+            for i in range(2000):
+                value = table.get(f"key{i % 8}")
+                if value is not None and not value.startswith(f"value{i % 8}-"):
+                    errors.append(value)
+        
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)] + [threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+class TestSharedTier:
+    """Test the shared tier in the lookup path"""
+    
+    def test_other_worker_hits(self, test_db, table, monkeypatch):
+        """Test that a string resolved by one worker is served to another without its backend"""
+        monkeypatch.setattr(main, "shared_cache", table)
+        main.get_cached_results(["alpha", "beta"])
+        
+        # Another worker: its own L1 and nothing in its backend
+        main.l1_cache.clear()
+        monkeypatch.setattr(main, "cache_backend", MemoryCacheBackend())
+        monkeypatch.setattr(main, "write_buffer", None)
+        def fail(text):
+            raise AssertionError("transformed again")
+        monkeypatch.setattr(main, "transformer_function", fail)
+        
+        stats = main.ResolveStats()
+        assert main.get_cached_results(["alpha", "beta"], stats) == {"alpha": "ALPHA", "beta": "BETA"}
+        assert stats.shared_hits == 2
+        assert main.l1_cache.get("alpha") == "ALPHA"
@@ -0,0 +1,39 @@
+"""Tests for single-flight miss coalescing"""
+import pytest
+
+from single_flight import SingleFlight
+
+class TestSingleFlight:
+    """Test the single-flight coordinator"""
+    
+    def test_claim_splits_owned_and_waiting(self):
+        """Test that a key already in flight is returned as a future"""
+        flights = SingleFlight()
+        owned, waiting = flights.claim(["a", "b"])
+        assert owned == ["a", "b"]
+        assert waiting == {}
+        
+        owned2, waiting2 = flights.claim(["b", "c"])
+        assert owned2 == ["c"]
+        assert list(waiting2) == ["b"]
+        
+        flights.complete({"a": "A", "b": "B"})
+        assert waiting2["b"].result(timeout=1) == "B"
+        
+        stats = flights.stats()
+        assert stats["leaders"] == 3
+        assert stats["coalesced"] == 1
+        assert stats["in_flight"] == 1
+    
+    def test_fail_propagates_to_waiters(self):
+        """Test that waiters see the leader's error and the key is released"""
+        flights = SingleFlight()
+        flights.claim(["a"])
+        _, waiting = flights.claim(["a"])
+        
+        flights.fail(["a"], RuntimeError("transformer down"))
+        with pytest.raises(RuntimeError):
+            waiting["a"].result(timeout=1)
+        
+        owned, _ = flights.claim(["a"])
+        assert owned == ["a"]
@@ -0,0 +1,85 @@
+"""Tests for pluggable transformer backends"""
+import asyncio
+import time
+
+import pytest
+
+import main
+from transformer_backends import (
+    FakeTransformerService,
+    TransformerBackend,
+    TransformerClient,
+    load_backend,
+)
+
+class FlakyTransformer(TransformerBackend):
+    """Hangs on the first call, then answers immediately"""
+    
+    def __init__(self):
+        self.attempts = 0
+    
+    async def transform(self, text):
+        self.attempts += 1
+        if self.attempts == 1:
+            await asyncio.sleep(10)
+        return text.upper()
+
+class TestTransformerBackends:
+    """Test transformer backends and the client"""
+    
+    def test_load_backend(self):
+        """Test loading backends by registry name and dotted path"""
+        assert isinstance(load_backend("fake", latency=0), FakeTransformerService)
+        assert isinstance(load_backend("tests.test_transformer_backends:FlakyTransformer"), FlakyTransformer)
+        with pytest.raises(ValueError):
+            load_backend("missing")
+    
+    def test_cold_batch_takes_one_round_trip(self):
+        """Test that 500 cold strings cost about one service latency"""
+        backend = FakeTransformerService(latency=0.2)
+        client = TransformerClient(backend, batch_size=100)
+        texts = [f"text{i}" for i in range(500)]
+        
+        start = time.perf_counter()
+        results = client.transform_many(texts)
+        elapsed = time.perf_counter() - start
+        client.close()
+        
+        assert results == [text.upper() for text in texts]
+        assert backend.calls == 5
+        assert elapsed < 0.2 * 2
+    
+    def test_concurrency_cap(self):
+        """Test that unbatched calls respect the concurrency limit"""
+        backend = FakeTransformerService(latency=0.05, supports_batch=False)
+        client = TransformerClient(backend, max_concurrency=4)
+        
+        start = time.perf_counter()
+        client.transform_many([f"text{i}" for i in range(8)])
+        elapsed = time.perf_counter() - start
+        client.close()
+        
+        # Eight calls through four slots take at least two rounds
+        assert elapsed >= 0.1
+        assert backend.calls == 8
+    
+    def test_timeout_is_retried(self):
+        """Test that a timed-out call is retried after backoff"""
+        client = TransformerClient(FlakyTransformer(), timeout=0.05, retries=1, backoff=0.01)
+        assert client.transform_many(["hello"]) == ["HELLO"]
+        stats = client.stats()
+        client.close()
+        
+        assert stats["timeouts"] == 1
+        assert stats["retried"] == 1
+        assert stats["failures"] == 0
+    
+    def test_cache_uses_configured_backend(self, test_db, monkeypatch):
+        """Test that cache misses go through the transformer client"""
+        backend = FakeTransformerService(latency=0)
+        client = TransformerClient(backend)
+        monkeypatch.setattr(main, "transformer_client", client)
+        
+        assert main.get_cached_results(["a", "b", "a"]) == {"a": "A", "b": "B"}
+        assert backend.calls == 1
+        client.close()
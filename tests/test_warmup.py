@@ -0,0 +1,124 @@
+"""Tests for cache snapshots and the startup warm-up"""
+import pytest
+from sqlalchemy import text
+
+import main
+import metrics
+from warmup import WarmupTask, read_snapshot, write_snapshot
+
+class TestSnapshots:
+    """Test the binary snapshot format"""
+    
+    def test_round_trip(self, tmp_path):
+        """Test that entries, including empty and non-ASCII ones, come back in order"""
+        path = str(tmp_path / "cache.snapshot")
+        entries = [("hello", "HELLO"), ("", ""), ("grüße", "GRÜSSE"), ("x" * 100_000, "X" * 100_000)]
+        
+        assert write_snapshot(path, iter(entries)) == 4
+        assert list(read_snapshot(path)) == entries
+    
+    def test_rejects_other_files(self, tmp_path):
+        """Test that foreign and truncated files are refused"""
+        foreign = tmp_path / "foreign"
+        foreign.write_bytes(b"not a snapshot at all")
+        with pytest.raises(ValueError):
+            list(read_snapshot(str(foreign)))
+        
+        path = tmp_path / "truncated"
+        write_snapshot(str(path), [("hello", "HELLO")])
+        path.write_bytes(path.read_bytes()[:-2])
+        with pytest.raises(ValueError):
+            list(read_snapshot(str(path)))
+
+class TestWarmupTask:
+    """Test running warm-up steps"""
+    
+    def test_runs_steps_and_counts_progress(self):
+        """Test that steps run in order, a failure does not stop the rest and progress is reported"""
+        calls = []
+        def load(task):
+            calls.append("load")
+            task.report("rows", 3)
+        def broken(task):
+            raise RuntimeError("boom")
+        def more(task):
+            calls.append("more")
+            task.report("rows", 2)
+        reported = []
+        
+        task = WarmupTask([("load", load), ("broken", broken), ("more", more)], lambda *args: reported.append(args))
+        task.run()
+        
+        assert calls == ["load", "more"]
+        assert reported == [("rows", 3), ("rows", 2)]
+        stats = task.stats()
+        assert stats["state"] == "done"
+        assert stats["rows"] == 5
+        assert stats["failed_steps"] == ["broken"]
+    
+    def test_close_stops_between_steps(self):
+        """Test that later steps are skipped once the task is closed"""
+        task = WarmupTask([("first", lambda task: task.close()), ("second", lambda task: task.report("rows", 1))])
+        task.run()
+        assert task.state == "stopped"
+        assert "rows" not in task.stats()
+
+class TestStartupWarmup:
+    """Test the warm-up steps of the service"""
+    
+    def test_preload_hot_entries(self, test_db, monkeypatch):
+        """Test that the most used rows are loaded into L1"""
+        main.get_cached_results(["cold", "warm", "hot"])
+        with test_db.begin() as connection:
+            connection.execute(text("UPDATE cacheentry SET hits = 5 WHERE input_text = 'warm'"))
+            connection.execute(text("UPDATE cacheentry SET hits = 9 WHERE input_text = 'hot'"))
+        main.l1_cache.clear()
+        monkeypatch.setattr(main.settings, "warmup_top_n", 2)
+        
+        WarmupTask([("hot_rows", main.preload_hot_entries)]).run()
+        
+        # Hottest last, so it is the last to be evicted
+        assert main.l1_cache.items() == [("warm", "WARM"), ("hot", "HOT")]
+    
+    def test_snapshot_save_and_import(self, test_db, tmp_path, monkeypatch):
+        """Test that a snapshot saved on shutdown warms L1 and the backend on the next start"""
+        monkeypatch.setattr(main.settings, "warmup_snapshot_path", str(tmp_path / "cache.snapshot"))
+        main.get_cached_results(["hello", "world"])
+        assert main.save_cache_snapshot() == 2
+        
+        main.l1_cache.clear()
+        with test_db.begin() as connection:
+            connection.execute(text("DELETE FROM cacheentry"))
+        before = metrics.WARMUP_ENTRIES.value("snapshot")
+        task = WarmupTask(
+            [("snapshot", main.import_cache_snapshot)],
+            lambda source, count: metrics.WARMUP_ENTRIES.inc(source, amount=count),
+        )
+        task.run()
+        
+        assert task.stats()["snapshot"] == 2
+        assert metrics.WARMUP_ENTRIES.value("snapshot") - before == 2
+        assert "hello" in main.l1_cache
+        assert main.cache_backend.get_many(["hello", "world"]) == {"hello": "HELLO", "world": "WORLD"}
+    
+    def test_missing_snapshot_is_skipped(self, test_db, tmp_path, monkeypatch):
+        """Test that a first start without a snapshot file is not an error"""
+        monkeypatch.setattr(main.settings, "warmup_snapshot_path", str(tmp_path / "missing"))
+        task = WarmupTask([("snapshot", main.import_cache_snapshot)])
+        task.run()
+        assert task.stats()["failed_steps"] == []
+    
+    def test_precompute_keys(self, test_db, tmp_path, monkeypatch):
+        """Test that listed strings are transformed ahead of time, in parallel batches"""
+        keys = tmp_path / "keys.txt"
+        keys.write_text("\n".join(f"key{i}" for i in range(50)) + "\n\n")
+        monkeypatch.setattr(main.settings, "warmup_keys_path", str(keys))
+        monkeypatch.setattr(main.settings, "warmup_batch_size", 8)
+        main.get_cached_results(["key0"])
+        
+        task = WarmupTask([("keys", main.precompute_keys)])
+        task.run()
+        
+        assert task.stats()["keys"] == 50
+        assert task.stats()["keys_transformed"] == 49
+        assert main.cache_backend.get_many(["key49"]) == {"key49": "KEY49"}
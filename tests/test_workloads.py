@@ -0,0 +1,46 @@
+"""Tests for the synthetic key workloads"""
+from collections import Counter
+
+import pytest
+
+from workloads import KeySampler
+
+class TestKeySampler:
+    """Test key sampling distributions"""
+    
+    def test_uniform_stays_in_key_space(self):
+        """Test that uniform draws only return keys from the space"""
+        sampler = KeySampler(cardinality=50, seed=1)
+        keys = set(sampler.all_keys())
+        
+        assert len(keys) == 50
+        assert set(sampler.sample(1000)) <= keys
+    
+    def test_zipf_favours_low_ranks(self):
+        """Test that the hottest Zipf key is drawn far more often than a cold one"""
+        sampler = KeySampler(cardinality=1000, distribution="zipf", seed=1)
+        counts = Counter(sampler.sample(20000))
+        
+        assert counts["key-0"] > 20 * max(counts["key-999"], 1)
+    
+    def test_unique_never_repeats(self):
+        """Test that the unique distribution produces only fresh keys"""
+        sampler = KeySampler(distribution="unique")
+        keys = sampler.sample(100) + sampler.sample(100)
+        
+        assert len(set(keys)) == 200
+        with pytest.raises(ValueError):
+            sampler.all_keys()
+    
+    def test_seed_is_reproducible(self):
+        """Test that equal seeds give equal payloads"""
+        first = KeySampler(distribution="zipf", seed=7).payload(10)
+        second = KeySampler(distribution="zipf", seed=7).payload(10)
+        
+        assert first == second
+        assert len(first["list_1"]) == len(first["list_2"]) == 10
+    
+    def test_rejects_unknown_distribution(self):
+        """Test that an unknown distribution name is rejected"""
+        with pytest.raises(ValueError):
+            KeySampler(distribution="pareto")
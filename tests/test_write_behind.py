@@ -0,0 +1,88 @@
+"""Tests for the write-behind buffer"""
+
+from sqlmodel import Session, select
+
+import main
+from main import CacheEntry, Payload
+from write_behind import WriteBehindBuffer
+
+class RecordingFlush:
+    """Flush function that records each group commit"""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def __call__(self, payload_rows, cache_rows):
+        self.batches.append((payload_rows, cache_rows))
+
+class TestWriteBehindBuffer:
+    """Test group commits and pending reads"""
+    
+    def test_flushes_when_row_limit_reached(self):
+        """Test that N queued rows trigger one group commit"""
+        flush = RecordingFlush()
+        buffer = WriteBehindBuffer(flush, max_rows=3, max_delay_ms=10_000)
+        futures = [buffer.add_payload({"id": str(i), "output": "X"}) for i in range(3)]
+        
+        for future in futures:
+            future.result(timeout=1)
+        assert len(flush.batches) == 1
+        assert len(flush.batches[0][0]) == 3
+        buffer.close()
+    
+    def test_flushes_after_interval(self):
+        """Test that a partial batch is committed after the interval"""
+        flush = RecordingFlush()
+        buffer = WriteBehindBuffer(flush, max_rows=100, max_delay_ms=20)
+        future = buffer.add_cache_entries([{"input_text": "a", "transformed_text": "A"}])
+        
+        assert buffer.pending_cache_entry("a") == "A"
+        future.result(timeout=1)
+        assert buffer.pending_cache_entry("a") is None
+        assert buffer.stats()["rows_flushed"] == 1
+        buffer.close()
+    
+    def test_close_flushes_pending_rows(self):
+        """Test that shutdown commits everything still queued"""
+        flush = RecordingFlush()
+        buffer = WriteBehindBuffer(flush, max_rows=100, max_delay_ms=60_000)
+        buffer.add_payload({"id": "p1", "output": "X"})
+        assert buffer.pending_payload("p1") is not None
+        
+        buffer.close()
+        assert flush.batches == [([{"id": "p1", "output": "X"}], [])]
+    
+    def test_failed_flush_keeps_rows(self):
+        """Test that rows survive a failed commit and are retried"""
+        attempts = []
+        
+        def flaky_flush(payload_rows, cache_rows):
+            attempts.append(len(payload_rows))
+            if len(attempts) == 1:
+                raise RuntimeError("disk full")
+        
+        buffer = WriteBehindBuffer(flaky_flush, max_rows=100, max_delay_ms=10)
+        future = buffer.add_payload({"id": "p1", "output": "X"})
+        future.result(timeout=1)
+        
+        assert attempts == [1, 1]
+        assert buffer.stats()["flush_errors"] == 1
+        buffer.close()
+    
+    def test_deferred_payload_readable_before_commit(self, client, test_db, monkeypatch):
+        """Test that GET serves a payload from memory until it is durable"""
+        buffer = WriteBehindBuffer(main.flush_buffered_rows, max_rows=1000, max_delay_ms=60_000)
+        monkeypatch.setattr(main, "write_buffer", buffer)
+        monkeypatch.setattr(main, "write_durability", "deferred")
+        
+        response = client.post("/payload", json={"list_1": ["late"], "list_2": ["write"]})
+        payload_id = response.json()["id"]
+        
+        with Session(test_db) as session:
+            assert session.exec(select(Payload)).all() == []
+        assert client.get(f"/payload/{payload_id}").json()["output"] == "LATE, WRITE"
+        
+        buffer.close()
+        with Session(test_db) as session:
+            assert session.get(Payload, payload_id).output == "LATE, WRITE"
+            assert len(session.exec(select(CacheEntry)).all()) == 2
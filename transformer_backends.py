@@ -0,0 +1,165 @@
+"""Pluggable transformer backends and a client that bounds, times out and retries their calls"""
+import asyncio
+import importlib
+import threading
+from typing import Dict, List, Optional, Type
+
+
+class TransformerBackend:
+    """Base class for transformer implementations
+
+    Subclasses implement ``transform``; backends whose service accepts many
+    strings per call set ``supports_batch`` and override ``transform_batch``.
+    """
+
+    supports_batch = False
+
+    async def transform(self, text: str) -> str:
+        raise NotImplementedError
+
+    async def transform_batch(self, texts: List[str]) -> List[str]:
+        return [await self.transform(text) for text in texts]
+
+
+class LocalTransformer(TransformerBackend):
+    """In-process transformer with no I/O"""
+
+    supports_batch = True
+
+    async def transform(self, text: str) -> str:
+        return text.upper()
+
+    async def transform_batch(self, texts: List[str]) -> List[str]:
+        return [text.upper() for text in texts]
+
+
+class FakeTransformerService(TransformerBackend):
+    """Local stand-in for the external service that adds a fixed latency per call"""
+
+    def __init__(self, latency: float = 0.05, supports_batch: bool = True):
+        self.latency = latency
+        self.supports_batch = supports_batch
+        self.calls = 0
+
+    async def transform(self, text: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return text.upper()
+
+    async def transform_batch(self, texts: List[str]) -> List[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [text.upper() for text in texts]
+
+
+TRANSFORMER_BACKENDS: Dict[str, Type[TransformerBackend]] = {
+    "local": LocalTransformer,
+    "fake": FakeTransformerService,
+}
+
+
+def load_backend(name: str, **options) -> TransformerBackend:
+    """Instantiate a backend by registry name or ``module:ClassName`` path"""
+    if name in TRANSFORMER_BACKENDS:
+        backend_class = TRANSFORMER_BACKENDS[name]
+    elif ":" in name:
+        module_name, class_name = name.split(":", 1)
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+    else:
+        raise ValueError(f"Unknown transformer backend '{name}'")
+    return backend_class(**options)
+
+
+class TransformerClient:
+    """Drives a backend with a concurrency cap, per-call timeouts and retry with backoff
+
+    Cache misses are resolved from worker threads, so the client runs the async
+    backend on its own event loop thread and exposes a blocking ``transform_many``.
+    """
+
+    def __init__(
+        self,
+        backend: TransformerBackend,
+        max_concurrency: int = 16,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        batch_size: int = 100,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.calls = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="transformer-client", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def transform_many(self, texts: List[str]) -> List[str]:
+        """Transform strings in order, blocking the calling thread until all are done"""
+        if not texts:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self.transform_many_async(texts), self._ensure_loop())
+        return future.result()
+
+    async def transform_many_async(self, texts: List[str]) -> List[str]:
+        """Transform strings concurrently, in batches when the backend supports it"""
+        if self.backend.supports_batch:
+            chunks = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+            batches = await asyncio.gather(*(self._call(self.backend.transform_batch, chunk) for chunk in chunks))
+            return [result for batch in batches for result in batch]
+        return list(await asyncio.gather(*(self._call(self.backend.transform, text) for text in texts)))
+
+    async def _call(self, func, argument):
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                self.calls += 1
+                try:
+                    return await asyncio.wait_for(func(argument), self.timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    if attempt == self.retries:
+                        self.failures += 1
+                        raise
+                except Exception:
+                    if attempt == self.retries:
+                        self.failures += 1
+                        raise
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def close(self) -> None:
+        """Stop the client's event loop thread"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "retried": self.retried,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+        }
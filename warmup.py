@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Startup cache warm-up: binary snapshots of cache entries and a background warm-up task
+
+A snapshot is the magic bytes followed by one record per entry: the UTF-8
+lengths of key and value as two little-endian uint32s, then both strings.
+Entries are written least used first, so importing them in file order leaves
+the hottest ones most recently used. Snapshots are read through mmap and never
+loaded into memory as a whole. To export the hottest rows of a database:
+
+    python warmup.py cache.db snapshot.bin --top 100000
+"""
+import argparse
+import itertools
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, col, select
+
+from database import create_sqlite_engine
+from models import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"FCSNAP1\n"
+RECORD_HEADER = struct.Struct("<II")
+
+
+def write_snapshot(path: str, entries: Iterable[Tuple[str, str]]) -> int:
+    """Write entries to ``path``, replacing it atomically; returns the number written"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    count = 0
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(SNAPSHOT_MAGIC)
+            for key, value in entries:
+                key_bytes = key.encode("utf-8")
+                value_bytes = value.encode("utf-8")
+                handle.write(RECORD_HEADER.pack(len(key_bytes), len(value_bytes)))
+                handle.write(key_bytes)
+                handle.write(value_bytes)
+                count += 1
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return count
+
+
+def read_snapshot(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield the entries of a snapshot in file order"""
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size < len(SNAPSHOT_MAGIC):
+            raise ValueError(f"{path} is not a cache snapshot")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a cache snapshot")
+            offset = len(SNAPSHOT_MAGIC)
+            while offset < size:
+                if offset + RECORD_HEADER.size > size:
+                    raise ValueError(f"Truncated cache snapshot {path}")
+                key_length, value_length = RECORD_HEADER.unpack_from(view, offset)
+                key_end = offset + RECORD_HEADER.size + key_length
+                value_end = key_end + value_length
+                if value_end > size:
+                    raise ValueError(f"Truncated cache snapshot {path}")
+                yield (
+                    view[offset + RECORD_HEADER.size:key_end].decode("utf-8"),
+                    view[key_end:value_end].decode("utf-8"),
+                )
+                offset = value_end
+
+
+def read_keys(path: str) -> Iterator[str]:
+    """Yield the non-empty lines of a key list, one input string per line"""
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            key = line.rstrip("\r\n")
+            if key:
+                yield key
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most ``size`` items"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def hot_entries(engine: Engine, limit: int) -> List[Tuple[str, str]]:
+    """The ``limit`` most used CacheEntry rows, least used first"""
+    statement = (
+        select(CacheEntry.input_text, CacheEntry.transformed_text)
+        .order_by(col(CacheEntry.hits).desc(), col(CacheEntry.last_access).desc())
+        .limit(limit)
+    )
+    with Session(engine) as session:
+        rows = session.exec(statement).all()
+    return [(input_text, transformed_text) for input_text, transformed_text in reversed(rows)]
+
+
+WarmupStep = Callable[["WarmupTask"], None]
+
+
+class WarmupTask:
+    """Runs warm-up steps in order on a daemon thread, counting the entries each one loads
+
+    Steps receive the task, call ``report`` as they make progress and check
+    ``stopped`` between batches so shutdown does not wait for a long warm-up.
+    A failing step is logged and the remaining steps still run.
+    """
+
+    def __init__(self, steps: List[Tuple[str, WarmupStep]], on_progress: Optional[Callable[[str, int], None]] = None):
+        self._steps = steps
+        self._on_progress = on_progress
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "pending"
+        self.progress: Dict[str, int] = {}
+        self.failed: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        """Run every step now, on the calling thread"""
+        self.state = "running"
+        self.started_at = time.monotonic()
+        for name, step in self._steps:
+            if self.stopped:
+                break
+            try:
+                step(self)
+            except Exception:
+                logger.exception("Warm-up step %s failed", name)
+                self.failed.append(name)
+        self.finished_at = time.monotonic()
+        self.state = "stopped" if self.stopped else "done"
+        logger.info("cache warm-up finished", extra={"fields": self.stats()})
+
+    def report(self, source: str, count: int) -> None:
+        """Add ``count`` entries loaded from ``source``"""
+        with self._lock:
+            self.progress[source] = self.progress.get(source, 0) + count
+        if self._on_progress is not None:
+            self._on_progress(source, count)
+
+    def close(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        with self._lock:
+            progress = dict(self.progress)
+        return {
+            "state": self.state,
+            "seconds": round(end - self.started_at, 3) if self.started_at is not None else 0.0,
+            "failed_steps": list(self.failed),
+            **progress,
+        }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", help="Path to the SQLite database file")
+    parser.add_argument("snapshot", help="Snapshot file to write")
+    parser.add_argument("--top", type=int, default=100_000, help="Most used entries to export")
+    args = parser.parse_args()
+
+    engine = create_sqlite_engine(f"sqlite:///{args.database}")
+    count = write_snapshot(args.snapshot, hot_entries(engine, args.top))
+    engine.dispose()
+    print(f"exported {count} entries to {args.snapshot} ({os.path.getsize(args.snapshot) / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,57 @@
+"""Synthetic key workloads for benchmarks and load generation"""
+import itertools
+import random
+from typing import Dict, List, Optional
+
+DISTRIBUTIONS = ("uniform", "zipf", "unique")
+
+
+class KeySampler:
+    """Draws input strings from a key space with a chosen popularity distribution
+
+    - ``uniform``: every one of ``cardinality`` keys is equally likely
+    - ``zipf``: key of rank r has weight 1 / r**zipf_s, so a few keys are very hot
+    - ``unique``: every draw is a key never returned before (an all-miss workload)
+    """
+
+    def __init__(
+        self,
+        cardinality: int = 10_000,
+        distribution: str = "uniform",
+        zipf_s: float = 1.1,
+        seed: Optional[int] = None,
+        prefix: str = "key",
+    ):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'")
+        if cardinality < 1:
+            raise ValueError("Cardinality must be at least 1")
+        self.cardinality = cardinality
+        self.distribution = distribution
+        self.prefix = prefix
+        self._random = random.Random(seed)
+        self._counter = itertools.count()
+        self._ranks = range(cardinality)
+        self._cum_weights = None
+        if distribution == "zipf":
+            self._cum_weights = list(itertools.accumulate(1 / (rank + 1) ** zipf_s for rank in self._ranks))
+
+    def sample(self, count: int) -> List[str]:
+        """Draw ``count`` keys"""
+        if self.distribution == "unique":
+            return [f"{self.prefix}-u{next(self._counter)}" for _ in range(count)]
+        if self.distribution == "zipf":
+            ranks = self._random.choices(self._ranks, cum_weights=self._cum_weights, k=count)
+        else:
+            ranks = [self._random.randrange(self.cardinality) for _ in range(count)]
+        return [f"{self.prefix}-{rank}" for rank in ranks]
+
+    def all_keys(self) -> List[str]:
+        """Every key in the space (not defined for the unique distribution)"""
+        if self.distribution == "unique":
+            raise ValueError("The unique distribution has no finite key space")
+        return [f"{self.prefix}-{rank}" for rank in self._ranks]
+
+    def payload(self, pairs: int) -> Dict[str, List[str]]:
+        """A POST /payload body with ``pairs`` keys in each list"""
+        return {"list_1": self.sample(pairs), "list_2": self.sample(pairs)}
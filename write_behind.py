@@ -0,0 +1,156 @@
+"""Write-behind buffer that group-commits payload and cache-entry inserts"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FlushFunction = Callable[[List[dict], List[dict]], None]
+
+
+class WriteBehindBuffer:
+    """Queues rows in memory and flushes them in one transaction every N rows or M milliseconds
+
+    Rows stay readable through ``pending_payload``/``pending_cache_entry`` until
+    the flush that contains them has committed. Each ``add_*`` call returns a
+    future that resolves once its rows are durable, so callers can pick their
+    own durability level by waiting on it or not.
+    """
+
+    def __init__(self, flush: FlushFunction, max_rows: int = 500, max_delay_ms: int = 50):
+        self._flush_rows = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._payloads: Dict[str, dict] = {}
+        self._entries: Dict[str, dict] = {}
+        self._waiters: List[Future] = []
+        self._first_pending_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, table: Dict[str, dict], key_field: str, rows: List[dict]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind buffer is closed")
+            self._ensure_started()
+            for row in rows:
+                table[row[key_field]] = row
+            self._waiters.append(future)
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            self._cond.notify()
+        return future
+
+    def add_payload(self, row: dict) -> Future:
+        """Queue a Payload row keyed by its id"""
+        return self._enqueue(self._payloads, "id", [row])
+
+    def add_payloads(self, rows: List[dict]) -> Future:
+        """Queue several Payload rows under one durability future"""
+        return self._enqueue(self._payloads, "id", rows)
+
+    def add_cache_entries(self, rows: List[dict]) -> Future:
+        """Queue CacheEntry rows keyed by input text"""
+        return self._enqueue(self._entries, "input_text", rows)
+
+    def pending_payload(self, payload_id: str) -> Optional[dict]:
+        """Return a queued Payload row that is not durable yet"""
+        with self._cond:
+            return self._payloads.get(payload_id)
+
+    def pending_cache_entry(self, text: str) -> Optional[str]:
+        """Return the transformed text of a queued CacheEntry row"""
+        with self._cond:
+            row = self._entries.get(text)
+        return row["transformed_text"] if row is not None else None
+
+    def pending_rows(self) -> int:
+        with self._cond:
+            return len(self._payloads) + len(self._entries)
+
+    def flush(self) -> None:
+        """Commit everything queued so far in a single transaction"""
+        with self._flush_lock:
+            with self._cond:
+                payloads = dict(self._payloads)
+                entries = dict(self._entries)
+                waiters, self._waiters = self._waiters, []
+                self._first_pending_at = None
+            if not payloads and not entries:
+                for waiter in waiters:
+                    waiter.set_result(None)
+                return
+
+            try:
+                self._flush_rows(list(payloads.values()), list(entries.values()))
+            except Exception:
+                # Keep the rows queued and retry them with the next flush
+                logger.exception("Write-behind flush failed; rows stay queued")
+                with self._cond:
+                    self.flush_errors += 1
+                    self._waiters = waiters + self._waiters
+                    if self._first_pending_at is None:
+                        self._first_pending_at = time.monotonic()
+                return
+
+            with self._cond:
+                # Rows replaced while the flush ran stay queued for the next one
+                for key, row in payloads.items():
+                    if self._payloads.get(key) is row:
+                        del self._payloads[key]
+                for key, row in entries.items():
+                    if self._entries.get(key) is row:
+                        del self._entries[key]
+                self.flushes += 1
+                self.rows_flushed += len(payloads) + len(entries)
+            for waiter in waiters:
+                waiter.set_result(None)
+
+    def _due(self) -> bool:
+        if len(self._payloads) + len(self._entries) >= self.max_rows:
+            return True
+        return self._first_pending_at is not None and time.monotonic() - self._first_pending_at >= self.max_delay
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = None
+                    if self._first_pending_at is not None:
+                        timeout = max(0.0, self._first_pending_at + self.max_delay - time.monotonic())
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background flusher and commit whatever is still queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "pending_rows": len(self._payloads) + len(self._entries),
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+                "flush_errors": self.flush_errors,
+            }